@@ -0,0 +1,240 @@
+import io
+import random
+from typing import Dict, List, Optional
+
+import docx
+
+CITIES = ["Mumbai", "New Delhi", "Bengaluru", "Chennai", "Hyderabad", "Kolkata", "Pune", "Ahmedabad"]
+STATES = ["Maharashtra", "Delhi", "Karnataka", "Tamil Nadu", "Telangana", "West Bengal", "Gujarat"]
+COMPANIES = [
+    "Shakti Infratech Private Limited", "Vayu Logistics LLP", "Ganga Textiles Limited",
+    "Nilgiri Software Services Private Limited", "Sahyadri Agro Exports Limited",
+    "Kaveri Pharmaceuticals Private Limited", "Indus Fintech Solutions LLP", "Aravalli Constructions Limited"
+]
+
+# Clause templates by category; {placeholders} are filled from the generator's random source
+CLAUSE_TEMPLATES: Dict[str, List[str]] = {
+    "confidentiality": [
+        "The Receiving Party shall keep all Confidential Information of the Disclosing Party strictly "
+        "confidential and shall not disclose it to any third party without prior written consent for a "
+        "period of {years} years from the Effective Date.",
+        "Each party shall use the confidential information solely for the purposes of this Agreement and "
+        "shall protect it with at least the degree of care it uses for its own proprietary information.",
+    ],
+    "termination": [
+        "Either party may terminate this Agreement by giving {days} days written notice to the other party "
+        "if the other party commits a material breach which remains uncured after such notice.",
+        "The Company may terminate this Agreement with immediate effect if the Service Provider becomes "
+        "insolvent or is admitted into corporate insolvency resolution under the Insolvency and Bankruptcy Code, 2016.",
+    ],
+    "liability": [
+        "The Service Provider shall be liable for all direct losses suffered by the Client arising out of "
+        "negligence, wilful misconduct or breach of this Agreement by its personnel.",
+    ],
+    "indemnification": [
+        "The Vendor shall indemnify and hold harmless the Purchaser, its directors and employees against all "
+        "claims, damages, penalties and costs arising from any breach of applicable law, including the "
+        "Goods and Services Tax laws, by the Vendor.",
+    ],
+    "intellectual_property": [
+        "All intellectual property rights, including copyright under the Copyright Act, 1957 and trade marks "
+        "under the Trade Marks Act, 1999, in the deliverables shall vest exclusively in the Client upon payment.",
+    ],
+    "governing_law": [
+        "This Agreement shall be governed by and construed in accordance with the laws of India, including "
+        "the Indian Contract Act, 1872.",
+    ],
+    "payment_terms": [
+        "The Client shall pay the consideration of INR {amount} lakhs within {days} days of receipt of a valid "
+        "tax invoice, subject to deduction of tax at source under the Income Tax Act, 1961.",
+        "All amounts payable under this Agreement are exclusive of Goods and Services Tax, which shall be "
+        "charged at the applicable rate and paid by the Client against a GST compliant invoice.",
+    ],
+    "warranties": [
+        "The Supplier represents and warrants that the goods shall be free from defects in material and "
+        "workmanship and shall conform to the specifications for a period of {months} months from delivery.",
+    ],
+    "limitation_of_liability": [
+        "Notwithstanding anything contained herein, the aggregate liability of either party under this "
+        "Agreement shall not exceed the total fees paid in the {months} months preceding the claim, and "
+        "neither party shall be liable for indirect or consequential losses.",
+    ],
+    "dispute_resolution": [
+        "Any dispute arising out of this Agreement shall be referred to arbitration by a sole arbitrator "
+        "under the Arbitration and Conciliation Act, 1996. The seat of arbitration shall be {city} and the "
+        "language of the proceedings shall be English.",
+        "The parties shall first attempt to resolve any dispute through mediation at the {city} Centre for "
+        "Mediation and Conciliation before commencing arbitration proceedings.",
+    ],
+    "jurisdiction": [
+        "Subject to the arbitration clause, the courts at {city} shall have exclusive jurisdiction over all "
+        "matters arising out of this Agreement.",
+    ],
+    "force_majeure": [
+        "Neither party shall be liable for delay caused by force majeure events including acts of God, flood, "
+        "epidemic, war, strikes or orders of the Government of India, provided notice is given within {days} days.",
+    ],
+    "non_compete": [
+        "During the term and for {months} months thereafter, the Employee shall not engage in any competing "
+        "business in {state}, subject to Section 27 of the Indian Contract Act, 1872.",
+    ],
+    "severability": [
+        "If any provision of this Agreement is held invalid or unenforceable by a court of competent "
+        "jurisdiction, the remaining provisions shall continue in full force and effect.",
+    ],
+    "assignment": [
+        "Neither party shall assign or transfer its rights or obligations under this Agreement without the "
+        "prior written consent of the other party, except to an affiliate under common control.",
+    ],
+    "stamp_duty": [
+        "This Agreement shall be executed on non-judicial stamp paper of appropriate value and the stamp duty "
+        "payable under the {state} Stamp Act shall be borne by the {payer}.",
+        "The parties acknowledge that this Agreement is duly stamped under the Indian Stamp Act, 1899 and "
+        "registered with the Sub-Registrar at {city} where registration is required.",
+    ],
+}
+
+
+class ContractGenerator:
+    """Deterministic synthetic Indian contracts for benchmarks.
+
+    The same seed always yields the same documents. ``clause_mix`` weights the
+    categories in CLAUSE_TEMPLATES; categories left out are never drawn.
+    """
+
+    def __init__(self, seed: int = 0, clause_mix: Optional[Dict[str, float]] = None):
+        self.seed = seed
+        mix = clause_mix or {category: 1.0 for category in CLAUSE_TEMPLATES}
+        unknown = set(mix) - set(CLAUSE_TEMPLATES)
+        if unknown:
+            raise ValueError(f"Unknown clause categories: {', '.join(sorted(unknown))}")
+        self.categories = list(mix)
+        self.weights = [mix[category] for category in self.categories]
+
+    def _fill(self, template: str, rng: random.Random) -> str:
+        return template.format(
+            years=rng.choice([2, 3, 5]), days=rng.choice([15, 30, 45, 60, 90]),
+            months=rng.choice([6, 12, 18, 24]), amount=rng.randint(5, 500),
+            city=rng.choice(CITIES), state=rng.choice(STATES), payer=rng.choice(["Client", "Vendor", "Lessee"])
+        )
+
+    def clauses(self, index: int, clause_count: int) -> List[Dict[str, str]]:
+        """Numbered clauses of document ``index`` as {"category", "text"} dicts."""
+        rng = random.Random(f"{self.seed}:{index}")
+        clauses = []
+        for _ in range(clause_count):
+            category = rng.choices(self.categories, self.weights)[0]
+            clauses.append({"category": category, "text": self._fill(rng.choice(CLAUSE_TEMPLATES[category]), rng)})
+        return clauses
+
+    def payment_schedule(self, index: int, clause_count: int) -> List[List[str]]:
+        """Header row plus one milestone row per ten clauses, as DOCX contracts usually carry in a table."""
+        rng = random.Random(f"{self.seed}:{index}:schedule")
+        rows = [["Milestone", "Deliverable", "Amount (INR)", "Due within"]]
+        for number in range(1, max(1, clause_count // 10) + 1):
+            rows.append([
+                f"M{number}", rng.choice(["Design approval", "Site handover", "Go-live", "Acceptance testing"]),
+                f"{rng.randint(1, 99)},{rng.randint(10, 99)},000", f"{rng.choice([15, 30, 45])} days of invoice"
+            ])
+        return rows
+
+    def document_lines(self, index: int, clause_count: int) -> List[str]:
+        rng = random.Random(f"{self.seed}:{index}:parties")
+        first, second = rng.sample(COMPANIES, 2)
+        lines = [
+            "SERVICES AGREEMENT",
+            f"This Agreement is made at {rng.choice(CITIES)} between {first}, a company incorporated under the "
+            f"Companies Act, 2013, and {second}, together the parties.",
+        ]
+        lines.extend(
+            f"{number}. {clause['text']}"
+            for number, clause in enumerate(self.clauses(index, clause_count), 1)
+        )
+        lines.append("IN WITNESS WHEREOF the parties have executed this Agreement on the date first written above.")
+        lines.append("SCHEDULE 1: PAYMENT SCHEDULE")
+        lines.extend(" | ".join(row) for row in self.payment_schedule(index, clause_count))
+        return lines
+
+    def text(self, index: int, clause_count: int) -> str:
+        return "\n\n".join(self.document_lines(index, clause_count))
+
+    def render(self, index: int, clause_count: int, file_format: str) -> bytes:
+        lines = self.document_lines(index, clause_count)
+        if file_format == "txt":
+            return "\n\n".join(lines).encode("utf-8")
+        if file_format == "docx":
+            schedule = self.payment_schedule(index, clause_count)
+            return _render_docx(lines[:-len(schedule)], schedule)
+        if file_format == "pdf":
+            return _render_pdf(lines)
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+CONTENT_TYPES = {
+    "txt": "text/plain",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf"
+}
+
+
+def _render_docx(lines: List[str], table_rows: List[List[str]]) -> bytes:
+    document = docx.Document()
+    document.add_heading(lines[0], level=1)
+    for line in lines[1:]:
+        document.add_paragraph(line)
+    table = document.add_table(rows=len(table_rows), cols=len(table_rows[0]))
+    for row, values in zip(table.rows, table_rows):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _wrap(line: str, width: int) -> List[str]:
+    wrapped, current = [], ""
+    for word in line.split():
+        if current and len(current) + 1 + len(word) > width:
+            wrapped.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    wrapped.append(current)
+    return wrapped
+
+
+def _render_pdf(lines: List[str], lines_per_page: int = 60, width: int = 95) -> bytes:
+    # A minimal single-font PDF; enough for PyPDF2 to extract the text back
+    page_lines = []
+    for line in lines:
+        page_lines.extend(_wrap(line, width))
+        page_lines.append("")
+    pages = [page_lines[i:i + lines_per_page] for i in range(0, len(page_lines), lines_per_page)]
+
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", b""]
+    kids = []
+    for page in pages:
+        escaped = [
+            line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+            for line in page
+        ]
+        stream = b"BT /F1 9 Tf 40 800 Td 12 TL " + b" ".join(b"(" + line + b") '" for line in escaped) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 1 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return bytes(out)
@@ -0,0 +1,128 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+# Keyword -> label, checked in order; the first match wins
+_LABEL_KEYWORDS = [
+    ("arbitrat", "dispute_resolution"), ("confidential", "confidentiality"), ("terminat", "termination"),
+    ("indemnif", "indemnification"), ("intellectual property", "intellectual_property"),
+    ("governed by", "governing_law"), ("invoice", "payment_terms"), ("warrant", "warranties"),
+    ("aggregate liability", "limitation_of_liability"), ("jurisdiction", "jurisdiction"),
+    ("force majeure", "force_majeure"), ("compet", "non_compete"), ("invalid", "severability"),
+    ("assign", "assignment"), ("liable", "liability")
+]
+
+
+def _label_for(text: str) -> str:
+    text_lower = text.lower()
+    for keyword, label in _LABEL_KEYWORDS:
+        if keyword in text_lower:
+            return label
+    return "LABEL_0"
+
+
+class MockInferenceServer:
+    """Local stand-in for the HF inference API with configurable latency and errors.
+
+    Answers POST /models/<model> like the hosted API: a text classification
+    prediction list per input, or ``generated_text`` when the payload has
+    "parameters" (the /ask path). Each request sleeps ``latency`` seconds
+    plus up to ``jitter``, and fails with a 503 with probability
+    ``error_rate``. Point HF_API_URL at ``url`` before importing the app.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/models/"
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                delay, failed = mock._next_outcome()
+                time.sleep(delay)
+                if failed:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                data = json.dumps(mock.respond(body)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _next_outcome(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    @staticmethod
+    def respond(body: Dict[str, Any]) -> List[Any]:
+        inputs = body.get("inputs", "")
+        if "parameters" in body:
+            return [{"generated_text": "The agreement may be terminated by written notice as set out in the contract."}]
+
+        def predictions(text: str) -> List[Dict[str, Any]]:
+            return [{"label": _label_for(text), "score": 0.91}, {"label": "LABEL_1", "score": 0.09}]
+
+        if isinstance(inputs, list):
+            return [predictions(text) for text in inputs]
+        return predictions(inputs)
+
+    def start(self) -> "MockInferenceServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the mock HF inference API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockInferenceServer(args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, port=args.port).start()
+    print(f"Mock inference API at {server.url} (set HF_API_URL to this)")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,300 @@
+"""Benchmark the analysis pipeline stage by stage against a stored baseline.
+
+Run from legal_backend:
+
+    python -m benchmarks.run                      # compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline      # record a new baseline
+    python -m benchmarks.run --latency-ms 200 --error-rate 0.1 --fail-on-regression
+
+Documents come from the deterministic ContractGenerator and inference calls
+go to a local MockInferenceServer, so runs are repeatable and offline. Each
+stage is timed over repeated passes (at least --min-seconds of samples,
+after one warm-up run) and its peak traced memory measured in a separate
+pass, since tracemalloc would distort the timings. Baselines are machine specific;
+record one on the machine the comparison runs on.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import CONTENT_TYPES, ContractGenerator
+from benchmarks.mock_inference import MockInferenceServer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+FORMATS = ("txt", "docx", "pdf")
+MAX_SAMPLES = 20000
+
+
+class Stage:
+    """A named benchmark stage: ``run(item)`` is timed per item, ``reset()`` runs untimed before each."""
+
+    def __init__(self, name: str, unit: str, items: List[Any], run: Callable[[Any], Any],
+                 reset: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.unit = unit
+        self.items = items
+        self.run = run
+        self.reset = reset
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(stage: Stage, min_seconds: float = 2.0) -> Dict[str, Any]:
+    # One untimed warm-up run so lazy imports and first-call setup are not sampled
+    if stage.reset:
+        stage.reset()
+    stage.run(stage.items[0])
+
+    # Fast stages are repeated over the items until min_seconds of samples are collected
+    latencies = []
+    elapsed = 0.0
+    while not latencies or (elapsed < min_seconds and len(latencies) < MAX_SAMPLES):
+        for item in stage.items:
+            if stage.reset:
+                stage.reset()
+            start = time.perf_counter()
+            stage.run(item)
+            latencies.append(time.perf_counter() - start)
+            elapsed += latencies[-1]
+
+    tracemalloc.start()
+    peak = 0
+    try:
+        for item in stage.items:
+            if stage.reset:
+                stage.reset()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            stage.run(item)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "unit": stage.unit,
+        "count": len(latencies),
+        "throughput": round(len(latencies) / total, 2) if total else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+
+def build_stages(generator: ContractGenerator, documents: int, clauses: int, formats: List[str],
+                 stack: ExitStack) -> List[Stage]:
+    # Imported here so HF_API_URL and JOBS_DB from the environment are picked up
+    from fastapi.testclient import TestClient
+
+    import main
+    from models.rule_engine import analyze_document_rules
+    from utils.document_processor import IndianDocumentProcessor
+
+    processor = IndianDocumentProcessor()
+    analyzer = main.legal_analyzer
+    # Entering the client runs the app lifespan, so endpoint stages share one event loop
+    client = stack.enter_context(TestClient(main.app))
+    # Keep the background warmup out of the measurements
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.01)
+
+    rendered = {
+        file_format: [generator.render(i, clauses, file_format) for i in range(documents)]
+        for file_format in formats
+    }
+    raw_texts = [generator.text(i, clauses) for i in range(documents)]
+    texts = [processor.preprocess_text(text) for text in raw_texts]
+    segmented = [processor.segment_into_clauses(text) for text in texts]
+    clause_texts = [clause["text"] for document in segmented for clause in document]
+
+    async def analyze(text: str, document_clauses: List[Dict[str, Any]]):
+        # Each asyncio.run gets a new loop, so the loop-bound HTTP client is closed with it
+        try:
+            return await analyzer.acomprehensive_analysis(text, document_clauses)
+        finally:
+            await analyzer.aclose()
+
+    def cold_caches():
+        # Every document should pay for classification, as a first upload would
+        analyzer.classification_cache.memory.clear()
+        analyzer.near_duplicates.clear()
+        main.analysis_cache.memory.clear()
+
+    def cold_exact_caches():
+        # Templated clauses seen in earlier documents are still resolved by similarity
+        analyzer.classification_cache.memory.clear()
+        main.analysis_cache.memory.clear()
+
+    extractors = {
+        "txt": processor.extract_text_from_txt,
+        "docx": processor.extract_text_from_docx,
+        "pdf": processor.extract_text_from_pdf
+    }
+    stages = [
+        Stage(f"extraction_{file_format}", "documents", rendered[file_format], extractors[file_format])
+        for file_format in formats
+    ]
+    if "docx" in rendered:
+        # The python-docx path the streaming extractor replaced, for comparison
+        stages.append(Stage(
+            "extraction_docx_object_model", "documents", rendered["docx"],
+            processor.extract_text_from_docx_object_model
+        ))
+    stages += [
+        Stage("preprocess", "documents", raw_texts, processor.preprocess_text),
+        Stage("segmentation", "documents", texts, processor.segment_into_clauses),
+        Stage("rule_classification", "clauses", clause_texts, analyzer._rule_based_classification),
+        Stage("near_duplicate_lookup", "clauses", clause_texts, analyzer.near_duplicates.lookup),
+        Stage("document_rules", "documents", texts, analyze_document_rules),
+        Stage(
+            "analysis", "documents", list(zip(texts, segmented)),
+            lambda item: asyncio.run(analyze(*item)), cold_caches
+        ),
+        Stage(
+            "analysis_near_duplicates", "documents", list(zip(texts, segmented)),
+            lambda item: asyncio.run(analyze(*item)), cold_exact_caches
+        ),
+        Stage(
+            "endpoint_analyze_text", "documents", raw_texts,
+            lambda text: _expect_ok(client.post("/analyze-text", json={"text": text})), cold_caches
+        )
+    ]
+    stages += [
+        Stage(
+            f"endpoint_analyze_{file_format}", "documents", rendered[file_format],
+            lambda content, file_format=file_format: _expect_ok(client.post(
+                "/analyze", files={"file": (f"contract.{file_format}", content, CONTENT_TYPES[file_format])}
+            )),
+            cold_caches
+        )
+        for file_format in formats
+    ]
+    return stages
+
+
+def _expect_ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url.path} returned {response.status_code}: {response.text[:200]}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond ``tolerance`` (a fraction) in p95 latency, throughput or peak memory."""
+    regressions = []
+    for name, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous is None:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput']} -> {current['throughput']} {current['unit']}/s")
+        if previous["peak_kb"] and current["peak_kb"] > previous["peak_kb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {previous['peak_kb']}KB -> {current['peak_kb']}KB")
+    return regressions
+
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    header = f"{'stage':<30}{'unit':<10}{'thr/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KB':>10}{'p95 vs base':>13}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in results["stages"].items():
+        previous = (baseline or {}).get("stages", {}).get(name)
+        change = ""
+        if previous and previous["p95_ms"]:
+            change = f"{(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:+.1f}%"
+        print(f"{name:<30}{stats['unit']:<10}{stats['throughput']:>10}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['peak_kb']:>10}{change:>13}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--clauses", type=int, default=60, help="clauses per document")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=50, help="mock inference latency")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock inference 503 rate")
+    parser.add_argument("--min-seconds", type=float, default=2.0, help="minimum timed samples per stage")
+    parser.add_argument("--stages", default="", help="comma-separated stage names to run (default all)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    formats = [file_format for file_format in args.formats.split(",") if file_format]
+    mock = MockInferenceServer(args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.seed).start()
+    workdir = tempfile.mkdtemp(prefix="legal-bench-")
+    os.environ["HF_API_URL"] = mock.url
+    os.environ["JOBS_DB"] = os.path.join(workdir, "jobs.db")
+
+    try:
+        with ExitStack() as stack:
+            stages = build_stages(ContractGenerator(args.seed), args.documents, args.clauses, formats, stack)
+            logging.getLogger().setLevel(logging.WARNING)
+            selected = set(filter(None, args.stages.split(",")))
+            results = {
+                "config": {
+                    "documents": args.documents, "clauses": args.clauses, "formats": formats, "seed": args.seed,
+                    "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+                    "min_seconds": args.min_seconds
+                },
+                "stages": {}
+            }
+            for stage in stages:
+                if not selected or stage.name in selected:
+                    results["stages"][stage.name] = measure(stage, args.min_seconds)
+        results["mock_calls"] = mock.calls
+        results["mock_errors"] = mock.errors
+    finally:
+        mock.stop()
+        from utils.document_processor import shutdown_page_pool
+        shutdown_page_pool()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
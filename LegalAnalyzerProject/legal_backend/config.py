@@ -3,14 +3,146 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-HF_API_URL = "https://api-inference.huggingface.co/models/"
+# Bump when rules or response shape change so cached analyses are invalidated
+ANALYZER_VERSION = "1.2.1"
+
+HF_API_URL = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models/")
 HF_TOKEN = os.getenv("HF_TOKEN", "insertyourhuggingfacetokenhere")
 
+# Outbound HTTP settings for the async classification path
+CLASSIFICATION_CONCURRENCY = int(os.getenv("CLASSIFICATION_CONCURRENCY", "8"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+CLASSIFICATION_TIMEOUT = float(os.getenv("CLASSIFICATION_TIMEOUT", "30"))
+
+# Clauses packed into a single inference request
+CLASSIFICATION_BATCH_SIZE = int(os.getenv("CLASSIFICATION_BATCH_SIZE", "16"))
+CLASSIFICATION_BATCH_MAX_CHARS = int(os.getenv("CLASSIFICATION_BATCH_MAX_CHARS", "8000"))
+
+# Clauses from concurrent requests are coalesced for up to this long before a batch is sent
+CLASSIFICATION_BATCH_MAX_WAIT_MS = float(os.getenv("CLASSIFICATION_BATCH_MAX_WAIT_MS", "10"))
+# "huggingface" for the hosted model, "local" for the in-process rule-based stand-in
+CLASSIFICATION_BACKEND = os.getenv("CLASSIFICATION_BACKEND", "huggingface")
+# "remote" sends every clause to the backend; "hybrid" keeps clauses the rule engine is
+# sure about (confidence and lead over the runner-up category) and escalates the rest
+CLASSIFICATION_MODE = os.getenv("CLASSIFICATION_MODE", "remote")
+HYBRID_MIN_CONFIDENCE = float(os.getenv("HYBRID_MIN_CONFIDENCE", "0.6"))
+HYBRID_MIN_MARGIN = float(os.getenv("HYBRID_MIN_MARGIN", "0.2"))
+
+# Circuit breakers around the inference API: open when the failure rate over the last
+# BREAKER_WINDOW calls reaches BREAKER_FAILURE_RATE, probe again after BREAKER_OPEN_SECONDS.
+# Timeouts track the observed latency percentile times a multiplier, capped at the stage maximum.
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+ADAPTIVE_TIMEOUT_PERCENTILE = float(os.getenv("ADAPTIVE_TIMEOUT_PERCENTILE", "95"))
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "3"))
+ADAPTIVE_TIMEOUT_MIN = float(os.getenv("ADAPTIVE_TIMEOUT_MIN", "2"))
+QA_TIMEOUT = float(os.getenv("QA_TIMEOUT", "45"))
+
+# Inference API calls share a token bucket set to the provider's rate limit: OUTBOUND_RATE_PER_SECOND
+# calls per second in bursts of up to OUTBOUND_BURST (a rate of 0 disables it). Queued clauses are
+# batched round-robin across requests, or across API keys for requests carrying FAIR_QUEUE_KEY_HEADER,
+# and new analysis requests get 429 while OUTBOUND_MAX_QUEUED clauses are waiting (0 = no limit).
+# Batches leave OUTBOUND_INTERACTIVE_RESERVE tokens for /ask, which waits up to
+# OUTBOUND_INTERACTIVE_MAX_WAIT seconds for one before answering from the fallback
+OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "0"))
+OUTBOUND_BURST = int(os.getenv("OUTBOUND_BURST", "10"))
+OUTBOUND_INTERACTIVE_RESERVE = int(os.getenv("OUTBOUND_INTERACTIVE_RESERVE", "2"))
+OUTBOUND_INTERACTIVE_MAX_WAIT = float(os.getenv("OUTBOUND_INTERACTIVE_MAX_WAIT", "5"))
+OUTBOUND_MAX_QUEUED = int(os.getenv("OUTBOUND_MAX_QUEUED", "5000"))
+FAIR_QUEUE_KEY_HEADER = os.getenv("FAIR_QUEUE_KEY_HEADER", "X-API-Key")
+
+# /ask context: the top-k BM25-ranked clauses that fit in the character budget
+QA_CONTEXT_CHARS = int(os.getenv("QA_CONTEXT_CHARS", "1000"))
+QA_CONTEXT_TOP_K = int(os.getenv("QA_CONTEXT_TOP_K", "5"))
+RETRIEVAL_INDEX_CACHE_SIZE = int(os.getenv("RETRIEVAL_INDEX_CACHE_SIZE", "64"))
+
+# Clause classification cache (TTL of 0 disables expiry, empty DB path disables the SQLite tier)
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+CLASSIFICATION_CACHE_TTL = float(os.getenv("CLASSIFICATION_CACHE_TTL", "0"))
+CLASSIFICATION_CACHE_DB = os.getenv("CLASSIFICATION_CACHE_DB", "")
+CLASSIFICATION_CACHE_DB_MAX_ENTRIES = int(os.getenv("CLASSIFICATION_CACHE_DB_MAX_ENTRIES", "200000"))
+
+# Near-duplicate clause index: a clause whose estimated shingle similarity to an earlier
+# model-classified clause reaches NEAR_DUPLICATE_THRESHOLD reuses its classification
+# (0 entries disables it; each takes about 1KB). Signatures of NEAR_DUPLICATE_PERMUTATIONS
+# MinHash values are split into NEAR_DUPLICATE_BANDS LSH bands; an empty DB path keeps the
+# index in memory only
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+NEAR_DUPLICATE_INDEX_SIZE = int(os.getenv("NEAR_DUPLICATE_INDEX_SIZE", "20000"))
+NEAR_DUPLICATE_PERMUTATIONS = int(os.getenv("NEAR_DUPLICATE_PERMUTATIONS", "32"))
+NEAR_DUPLICATE_BANDS = int(os.getenv("NEAR_DUPLICATE_BANDS", "8"))
+NEAR_DUPLICATE_DB = os.getenv("NEAR_DUPLICATE_DB", "")
+NEAR_DUPLICATE_DB_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_DB_MAX_ENTRIES", "200000"))
+
+# Whole-document analysis cache for /analyze and /analyze-text
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+ANALYSIS_CACHE_DB = os.getenv("ANALYSIS_CACHE_DB", "")
+ANALYSIS_CACHE_DB_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_DB_MAX_ENTRIES", "5000"))
+
+# Analyzed documents kept for follow-up requests by document_id, bounded by approximate
+# memory use. With DOCUMENT_STORE_DB set, documents are also written there, so they outlive
+# eviction and restarts; python -m serve needs it to run more than one worker
+DOCUMENT_STORE_MAX_BYTES = int(os.getenv("DOCUMENT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+DOCUMENT_STORE_TTL = float(os.getenv("DOCUMENT_STORE_TTL", "86400"))
+DOCUMENT_STORE_DB = os.getenv("DOCUMENT_STORE_DB", "")
+DOCUMENT_STORE_DB_MAX_ENTRIES = int(os.getenv("DOCUMENT_STORE_DB_MAX_ENTRIES", "10000"))
+
+# Responses of at least GZIP_MINIMUM_SIZE bytes are gzipped for clients that accept it;
+# a mid-range level keeps CPU per response low while still shrinking JSON several-fold
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "5"))
+
 LEGAL_MODELS = {
     "classification": "law-ai/InLegalBERT",
     "qa": "law-ai/InLegalBERT",
 }
 
+# Worker pool for CPU-bound stages ("thread" or "process")
+WORKER_POOL_KIND = os.getenv("WORKER_POOL_KIND", "thread")
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", str(os.cpu_count() or 1)))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "32"))
+STAGE_TIMEOUTS = {
+    "extraction": float(os.getenv("EXTRACTION_TIMEOUT", "120")),
+    "segmentation": float(os.getenv("SEGMENTATION_TIMEOUT", "30")),
+    "rules": float(os.getenv("RULES_TIMEOUT", "30")),
+}
+
+# PDF extraction: page ranges are extracted in parallel for large documents (0 max pages = no limit)
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+
+# Upload admission, checked from Content-Length before the body is parsed: files over
+# UPLOAD_MAX_FILE_BYTES get 413 (UPLOAD_MAX_REQUEST_BYTES bounds multi-file /jobs requests),
+# and uploads beyond UPLOAD_MAX_INFLIGHT_BYTES in progress at once get 429
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(512 * 1024 * 1024)))
+# Uploads are read in chunks; files of at least UPLOAD_MMAP_MIN_BYTES are memory-mapped from
+# their spool file instead of copied into memory (thread worker pools only)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_MMAP_MIN_BYTES = int(os.getenv("UPLOAD_MMAP_MIN_BYTES", str(4 * 1024 * 1024)))
+
+# Production server (python -m serve): worker processes forked from one preloaded parent.
+# Workers only share documents through DOCUMENT_STORE_DB, so without it there is one worker.
+# Each worker warms up before GET /ready reports it; WARMUP_INFERENCE also sends one sample
+# call per inference client to open its connection and wake the hosted model. Off by default:
+# those are billed API calls on every start and every worker respawn
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1) if DOCUMENT_STORE_DB else "1"))
+WARMUP_INFERENCE = os.getenv("WARMUP_INFERENCE", "false").lower() in ("1", "true", "yes")
+
+# Background batch jobs (/jobs) drained from a persistent SQLite queue
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_MAX_DOCUMENTS = int(os.getenv("JOB_MAX_DOCUMENTS", "1000"))
+
 INDIAN_CLAUSE_CATEGORIES = [
     "confidentiality", "termination", "liability", "indemnification",
     "intellectual_property", "governing_law", "payment_terms", "warranties",
@@ -1,24 +1,170 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Callable, List, Tuple
 import uvicorn
+import asyncio
+import hashlib
+import json
 import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 
+from config import (
+    ANALYZER_VERSION, LEGAL_MODELS, INDIAN_CLAUSE_CATEGORIES,
+    CLASSIFICATION_BACKEND, CLASSIFICATION_MODE, HYBRID_MIN_CONFIDENCE, HYBRID_MIN_MARGIN,
+    ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL, ANALYSIS_CACHE_DB, ANALYSIS_CACHE_DB_MAX_ENTRIES,
+    DOCUMENT_STORE_MAX_BYTES, DOCUMENT_STORE_TTL, DOCUMENT_STORE_DB, DOCUMENT_STORE_DB_MAX_ENTRIES,
+    GZIP_MINIMUM_SIZE, GZIP_COMPRESSION_LEVEL,
+    UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_REQUEST_BYTES, UPLOAD_MAX_INFLIGHT_BYTES, UPLOAD_CHUNK_BYTES,
+    UPLOAD_MMAP_MIN_BYTES,
+    WORKER_POOL_KIND, WORKER_POOL_SIZE, WORKER_QUEUE_SIZE, STAGE_TIMEOUTS,
+    JOBS_DB, JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_MAX_DOCUMENTS,
+    OUTBOUND_MAX_QUEUED, FAIR_QUEUE_KEY_HEADER, WARMUP_INFERENCE
+)
 from models.indian_legal_analyzer import IndianLegalAnalyzer
-from utils.document_processor import IndianDocumentProcessor
+from utils.cache import TieredCache, content_hash
+from utils.document_processor import FileContent, IndianDocumentProcessor, shutdown_page_pool
+from utils.document_store import DocumentStore
+from utils.executor import StageExecutor, StageTimeoutError, WorkerPoolBusyError
+from utils.job_queue import JobStore, JobWorkerPool
+from utils.metrics import (
+    CallbackMetric, Counter, Histogram, render_metrics, server_timing_header, start_request_timings
+)
+from utils.outbound import OutboundAdmission, OutboundAdmissionMiddleware, start_flow
+from utils.readiness import Readiness
+from utils.serialization import dumps
+from utils.uploads import SpooledUpload, UploadAdmission, UploadAdmissionMiddleware, UploadTooLargeError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+document_processor = IndianDocumentProcessor()
+legal_analyzer = IndianLegalAnalyzer()
+analysis_cache = TieredCache(
+    "document_analyses",
+    max_entries=ANALYSIS_CACHE_SIZE,
+    ttl_seconds=ANALYSIS_CACHE_TTL,
+    db_path=ANALYSIS_CACHE_DB or None,
+    db_max_entries=ANALYSIS_CACHE_DB_MAX_ENTRIES
+)
+stage_executor = StageExecutor(
+    kind=WORKER_POOL_KIND,
+    max_workers=WORKER_POOL_SIZE,
+    max_queue=WORKER_QUEUE_SIZE,
+    stage_timeouts=STAGE_TIMEOUTS
+)
+document_store = DocumentStore(
+    max_bytes=DOCUMENT_STORE_MAX_BYTES,
+    ttl_seconds=DOCUMENT_STORE_TTL,
+    db_path=DOCUMENT_STORE_DB or None,
+    db_max_entries=DOCUMENT_STORE_DB_MAX_ENTRIES
+)
+job_store = JobStore(JOBS_DB, max_attempts=JOB_MAX_ATTEMPTS)
+readiness = Readiness()
+# Room for multipart boundaries and part headers around a single file
+_MULTIPART_OVERHEAD = 64 * 1024
+upload_admission = UploadAdmission(
+    {
+        "/analyze": UPLOAD_MAX_FILE_BYTES + _MULTIPART_OVERHEAD,
+        "/analyze/stream": UPLOAD_MAX_FILE_BYTES + _MULTIPART_OVERHEAD,
+        "/analyze/revision": UPLOAD_MAX_FILE_BYTES + _MULTIPART_OVERHEAD,
+        "/jobs": UPLOAD_MAX_REQUEST_BYTES
+    },
+    max_inflight_bytes=UPLOAD_MAX_INFLIGHT_BYTES
+)
+# Requests that queue clauses or questions for the inference API; background jobs are already queued
+outbound_admission = OutboundAdmission(
+    legal_analyzer.batch_scheduler,
+    legal_analyzer.rate_limiter,
+    max_queued=OUTBOUND_MAX_QUEUED,
+    paths=(
+        "/analyze", "/analyze/stream", "/analyze/revision",
+        "/analyze-text", "/analyze-text/stream", "/analyze-text/revision", "/ask"
+    ),
+    key_header=FAIR_QUEUE_KEY_HEADER
+)
+
+# Changing the analyzer version, models, classification mode or categories invalidates cached analyses
+ANALYSIS_CACHE_VERSION = content_hash(
+    ANALYZER_VERSION, json.dumps(LEGAL_MODELS, sort_keys=True), CLASSIFICATION_BACKEND,
+    CLASSIFICATION_MODE, str(HYBRID_MIN_CONFIDENCE), str(HYBRID_MIN_MARGIN), *INDIAN_CLAUSE_CATEGORIES
+)
+
+# A short contract run through every stage during warmup
+WARMUP_TEXT = (
+    "1. The Company shall pay the Consultant a fee of Rs. 50,000 within 30 days of receiving an invoice. "
+    "2. Either party may terminate this Agreement by giving thirty days written notice to the other party. "
+    "3. The Consultant shall keep all proprietary information of the Company strictly confidential. "
+    "4. This Agreement shall be governed by the laws of India and the courts of Mumbai shall have jurisdiction. "
+    "5. Any dispute arising out of this Agreement shall be referred to arbitration under the Arbitration "
+    "and Conciliation Act, 1996."
+)
+_warmed_up = False
+
+def databases() -> Tuple[Any, ...]:
+    """Everything holding a SQLite connection; serve.py closes them before forking and reopens them after."""
+    return (legal_analyzer.classification_cache, legal_analyzer.near_duplicates, analysis_cache, document_store, job_store)
+
+def warm_up():
+    """CPU-side warmup: prime the caches from SQLite and run WARMUP_TEXT through the local stages.
+
+    serve.py runs this once before forking so every worker shares the result.
+    """
+    global _warmed_up
+    if _warmed_up:
+        return
+    primed = legal_analyzer.classification_cache.prime() + analysis_cache.prime()
+    text, clauses = document_processor.prepare_clauses(WARMUP_TEXT)
+    legal_analyzer.warm_up(text, [clause["text"] for clause in clauses])
+    dumps({"clauses": clauses})
+    _warmed_up = True
+    logger.info(f"Warmed up; primed {primed} cached entries")
+
+async def _warm_up_worker():
+    """Per-process warmup, run in the background after startup; GET /ready answers 503 until it ends."""
+    start = time.perf_counter()
+    try:
+        # Also starts the stage pool's workers
+        _, clauses = await stage_executor.run("segmentation", document_processor.prepare_clauses, WARMUP_TEXT)
+        if not _warmed_up:
+            await asyncio.to_thread(warm_up)
+        await legal_analyzer.awarm_up([clause["text"] for clause in clauses], inference=WARMUP_INFERENCE)
+    except Exception as e:
+        logger.warning(f"Warmup failed, serving cold: {e}")
+    readiness.mark_ready(time.perf_counter() - start)
+    logger.info(f"Ready after {readiness.warmup_seconds * 1000:.0f}ms of warmup")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stage_executor.start()
+    # Opened here rather than on import, so importing main never creates the jobs database
+    job_store.open()
+    job_workers.start()
+    warmup = asyncio.create_task(_warm_up_worker())
+    yield
+    readiness.mark_stopping()
+    warmup.cancel()
+    await job_workers.stop()
+    stage_executor.shutdown()
+    shutdown_page_pool()
+    await legal_analyzer.aclose()
+    for database in databases():
+        database.close()
+
 app = FastAPI(
     title="Indian Legal Contract Analyzer API",
     description="AI-powered legal document analysis using InLegalBERT",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+app.add_middleware(UploadAdmissionMiddleware, admission=upload_admission)
+app.add_middleware(OutboundAdmissionMiddleware, admission=outbound_admission)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,13 +172,88 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESSION_LEVEL)
 
-document_processor = IndianDocumentProcessor()
-legal_analyzer = IndianLegalAnalyzer()
+HTTP_REQUESTS = Counter("legal_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("legal_http_request_seconds", "HTTP request latency", ("method", "route"))
+
+# Values the caches, breakers and pools already track, read at scrape time
+CallbackMetric(
+    "legal_cache_lookups_total", "Cache lookups by result", "counter", ("cache", "result"),
+    lambda: [
+        ((name, result), getattr(cache, result))
+        for name, cache in (("classification", legal_analyzer.classification_cache), ("analysis", analysis_cache))
+        for result in ("hits", "misses", "disk_hits")
+    ]
+)
+CallbackMetric(
+    "legal_circuit_open", "1 while a circuit breaker is not closed", "gauge", ("breaker",),
+    lambda: [
+        ((breaker.name,), int(breaker.stats()["state"] != "closed"))
+        for breaker in (legal_analyzer.classification_breaker, legal_analyzer.qa_breaker)
+    ]
+)
+CallbackMetric(
+    "legal_circuit_rejected_total", "Calls short-circuited by an open breaker", "counter", ("breaker",),
+    lambda: [
+        ((breaker.name,), breaker.stats()["rejected"])
+        for breaker in (legal_analyzer.classification_breaker, legal_analyzer.qa_breaker)
+    ]
+)
+CallbackMetric(
+    "legal_worker_pool_pending", "Stages pending on the worker pool", "gauge", (),
+    lambda: [((), stage_executor.stats()["pending"])]
+)
+CallbackMetric(
+    "legal_upload_inflight_bytes", "Bytes of uploads admitted and still being processed", "gauge", (),
+    lambda: [((), upload_admission.inflight_bytes)]
+)
+CallbackMetric(
+    "legal_upload_rejections_total", "Uploads turned away before parsing", "counter", ("reason",),
+    lambda: [(("too_large",), upload_admission.rejected_too_large), (("busy",), upload_admission.rejected_busy)]
+)
+CallbackMetric(
+    "legal_outbound_queued", "Clauses waiting for a classification batch", "gauge", (),
+    lambda: [((), legal_analyzer.batch_scheduler.queued)]
+)
+CallbackMetric(
+    "legal_outbound_throttled_total", "Inference calls delayed or skipped by the rate limit", "counter", (),
+    lambda: [((), legal_analyzer.rate_limiter.throttled)]
+)
+CallbackMetric(
+    "legal_outbound_rejections_total", "Requests turned away while the outbound queue was full", "counter", (),
+    lambda: [((), outbound_admission.rejected)]
+)
+CallbackMetric(
+    "legal_document_store_bytes", "Approximate size of documents held in memory", "gauge", (),
+    lambda: [((), document_store.stats()["memory_bytes"])]
+)
+
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # Label by route template, not path, so document and job ids don't explode the series
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    HTTP_REQUESTS.inc(method=request.method, route=route_path, status=response.status_code)
+    HTTP_LATENCY.observe(elapsed, method=request.method, route=route_path)
+    # Streaming responses send headers before their stages run, so they carry only what ran up front
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
 
 class AnalysisRequest(BaseModel):
-    text: str
+    text: Optional[str] = None
     question: Optional[str] = None
+    document_id: Optional[str] = None
+
+class RevisionRequest(BaseModel):
+    text: str
+    document_id: Optional[str] = None
+    previous_analysis: Optional[Dict[str, Any]] = None
 
 class AnalysisResponse(BaseModel):
     status: str
@@ -44,135 +265,632 @@ class AnalysisResponse(BaseModel):
 async def root():
     return {"message": "Indian Legal Contract Analyzer API", "version": "1.0.0"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once warmed up, 503 while warming up or shutting down."""
+    stats = readiness.stats()
+    return JSONResponse(stats, status_code=200 if stats["ready"] else 503)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "legal-analyzer"}
+    breakers = {
+        "classification": legal_analyzer.classification_breaker.stats(),
+        "qa": legal_analyzer.qa_breaker.stats()
+    }
+    # Open breakers mean answers come from the rule-based fallbacks
+    degraded = any(breaker["state"] != "closed" for breaker in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": "legal-analyzer",
+        "circuit_breakers": breakers,
+        "classification_cache": legal_analyzer.classification_cache.stats(),
+        "classification_batching": legal_analyzer.batch_scheduler.stats(),
+        "near_duplicates": legal_analyzer.near_duplicates.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "document_store": document_store.stats(),
+        "uploads": upload_admission.stats(),
+        "outbound": outbound_admission.stats(),
+        "worker_pool": stage_executor.stats(),
+        "readiness": readiness.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+SUPPORTED_FILE_TYPES = [
+    'application/pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'text/plain'
+]
+
+def _claim_cached_analysis(cache_key: str) -> Optional[Dict[str, Any]]:
+    """A cached analysis issued under a new document_id, or None.
+
+    The stored document is copied to the new id, so each client's session can
+    only be read or deleted by the client it was issued to.
+    """
+    cached = analysis_cache.get(cache_key)
+    if cached is None:
+        return None
+    # A cached response is only usable while the document it was stored with still resolves
+    document = document_store.get(cached["data"]["document_id"])
+    if document is None:
+        return None
+    document_id = _new_document_id()
+    document_store.put(document_id, document)
+    return {"data": {**cached["data"], "document_id": document_id}, "metadata": cached["metadata"]}
+
+async def _cached_analysis(cache_key: str) -> Optional[Dict[str, Any]]:
+    # The lookups and the copy may use SQLite
+    return await asyncio.to_thread(_claim_cached_analysis, cache_key)
+
+async def _cached_analysis_response(cache_key: str, start_time: datetime, message: str) -> Optional[AnalysisResponse]:
+    cached = await _cached_analysis(cache_key)
+    if cached is None:
+        return None
+
+    return AnalysisResponse(
+        status="success",
+        data=cached["data"],
+        metadata=_cache_hit_metadata(cached, start_time),
+        message=message
+    )
+
+def _cache_hit_metadata(cached: Dict[str, Any], start_time: datetime) -> Dict[str, Any]:
+    return {
+        **cached["metadata"],
+        "cache_hit": True,
+        "processing_time_seconds": round((datetime.now() - start_time).total_seconds(), 2),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def _upload_cache_key(sha256: str, content_type: str) -> str:
+    return content_hash(ANALYSIS_CACHE_VERSION, "file", content_type, sha256)
+
+def _new_document_id() -> str:
+    # Random rather than derived from the content, so it cannot be guessed by others holding the same file
+    return secrets.token_hex(16)
+
+async def _read_upload(file: UploadFile, allow_mmap: bool = True) -> SpooledUpload:
+    """Read an upload in chunks, hashing as it goes; large files are memory-mapped
+    unless the content must be bytes (process pools pickle it, jobs persist it)."""
+    if file.content_type not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    mmap_min_bytes = UPLOAD_MMAP_MIN_BYTES if allow_mmap and stage_executor.kind == "thread" else None
+    try:
+        upload = await SpooledUpload.read(file, UPLOAD_MAX_FILE_BYTES, mmap_min_bytes, UPLOAD_CHUNK_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if upload.size == 0:
+        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    return upload
+
+async def _extract_clauses(content: FileContent, content_type: str) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    """Extract, preprocess and segment an upload; returns (text, clauses, extra metadata)."""
+    page_numbers = None
+    if content_type == 'application/pdf':
+        text, page_numbers, page_offsets = await stage_executor.run(
+            "extraction", document_processor.extract_pdf_pages, content
+        )
+    elif content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+        text = await stage_executor.run("extraction", document_processor.extract_text_from_docx, content)
+    else:
+        text = await stage_executor.run("extraction", document_processor.extract_text_from_txt, content)
+
+    if not text or len(text.strip()) < 50:
+        raise HTTPException(status_code=400, detail="Document too short for analysis")
+
+    text, clauses = await stage_executor.run("segmentation", document_processor.prepare_clauses, text)
+
+    extra_metadata = {"file_type": content_type}
+    if page_numbers is not None:
+        for clause in clauses:
+            clause["page"] = document_processor.page_for_offset(page_numbers, page_offsets, clause["start"])
+        extra_metadata["pages_with_text"] = len(page_numbers)
+    return text, clauses, extra_metadata
+
+def _analysis_metadata(text: str, clauses: List[Dict[str, Any]], start_time: datetime,
+                       analysis_result: Dict[str, Any], extra_metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    processing_time = (datetime.now() - start_time).total_seconds()
+    metadata = dict(extra_metadata or {})
+    metadata.update({
+        "text_length": len(text),
+        "clauses_identified": len(clauses),
+        "classification": analysis_result["classification_summary"],
+        "processing_time_seconds": round(processing_time, 2),
+        "timestamp": datetime.now().isoformat(),
+        "cache_hit": False
+    })
+    return metadata
+
+def _analysis_response_data(text: str, clauses: List[Dict[str, Any]], analysis_result: Dict[str, Any],
+                            summary_message: str, document_id: str) -> Dict[str, Any]:
+    return {
+        "document_id": document_id,
+        "summary": {
+            "message": summary_message,
+            "total_clauses": len(clauses),
+            "categories_identified": len(analysis_result['provisions_by_category']),
+            "risk_level": analysis_result["risk_assessment"]["risk_level"]
+        },
+        "clauses": analysis_result["provisions_by_category"],
+        "compliance": analysis_result["compliance_analysis"],
+        "risk": analysis_result["risk_assessment"],
+        "document_stats": {
+            "total_words": len(text.split()),
+            "total_clauses": len(clauses),
+            "risk_level": analysis_result["risk_assessment"]["risk_level"]
+        }
+    }
+
+async def _finish_analysis(cache_key: str, text: str, clauses: List[Dict[str, Any]], analysis_result: Dict[str, Any],
+                           start_time: datetime, extra_metadata: Dict[str, Any],
+                           summary_message: Callable, cache: bool = True) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Build (response data, metadata), then cache the response and keep the document for follow-ups.
+
+    cache=False keeps the document but leaves the shared analysis cache alone. Analyses with
+    rule-based fallbacks for clauses the model could not answer are not cached either, so the
+    document is classified properly once the model is back. Storing runs off the event loop,
+    since it encodes the document and may write it to SQLite.
+    """
+    document_id = _new_document_id()
+    metadata = _analysis_metadata(text, clauses, start_time, analysis_result, extra_metadata)
+    response_data = _analysis_response_data(
+        text, clauses, analysis_result, summary_message(clauses, analysis_result), document_id
+    )
+    
+    # Clauses are kept as spans into the text rather than copies of it
+    document = {
+        "text": text,
+        "clauses": [
+            {key: value for key, value in clause.items() if key != "text"}
+            for clause in analysis_result["provisions_analysis"]
+        ],
+        "compliance": analysis_result["compliance_analysis"],
+        "risk": analysis_result["risk_assessment"],
+        "metadata": metadata
+    }
+    cache = cache and not analysis_result["classification_summary"].get("fallback")
+    await asyncio.to_thread(
+        _store_analysis, document_id, document, cache_key if cache else None, {"data": response_data, "metadata": metadata}
+    )
+    return response_data, metadata
+
+def _store_analysis(document_id: str, document: Dict[str, Any], cache_key: Optional[str], cached: Dict[str, Any]):
+    document_store.put(document_id, document)
+    if cache_key is not None:
+        analysis_cache.set(cache_key, cached)
+
+def _stored_clause_texts(document: Dict[str, Any]) -> List[str]:
+    text = document["text"]
+    return [text[clause["start"]:clause["end"]] for clause in document["clauses"]]
+
+_PREVIOUS_CATEGORIES = frozenset(INDIAN_CLAUSE_CATEGORIES) | {"other"}
+
+def _valid_previous_clause(clause: Any) -> bool:
+    """A clause from client-supplied previous_analysis with the fields revision reuse relies on."""
+    return (
+        isinstance(clause, dict)
+        and isinstance(clause.get("id"), str)
+        and isinstance(clause.get("text"), str)
+        and type(clause.get("start")) is int
+        and clause.get("category") in _PREVIOUS_CATEGORIES
+        and isinstance(clause.get("confidence"), (int, float)) and not isinstance(clause.get("confidence"), bool)
+        and isinstance(clause.get("original_label"), str)
+    )
+
+def _previous_clauses(document_id: Optional[str], previous_analysis: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Classified clauses of an earlier version, from the document store or a returned analysis."""
+    if document_id:
+        document = document_store.get(document_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Previous document not found or expired")
+        return [
+            {**clause, "text": clause_text}
+            for clause, clause_text in zip(document["clauses"], _stored_clause_texts(document))
+        ]
+    
+    if previous_analysis:
+        clauses_by_category = previous_analysis.get("clauses")
+        if not isinstance(clauses_by_category, dict):
+            raise HTTPException(status_code=400, detail="previous_analysis must be the data of an earlier analysis")
+        if not all(isinstance(category_clauses, list) for category_clauses in clauses_by_category.values()):
+            raise HTTPException(status_code=400, detail="previous_analysis clauses must be lists by category")
+        clauses = [clause for category_clauses in clauses_by_category.values() for clause in category_clauses]
+        if not all(_valid_previous_clause(clause) for clause in clauses):
+            raise HTTPException(status_code=400, detail="previous_analysis clauses are missing or have invalid fields")
+        return sorted(clauses, key=lambda clause: clause["start"])
+    
+    raise HTTPException(status_code=400, detail="document_id or previous_analysis is required")
+
+async def _revision_response(cache_key: str, text: str, clauses: List[Dict[str, Any]],
+                             previous_clauses: List[Dict[str, Any]], previous_document_id: Optional[str],
+                             start_time: datetime, extra_metadata: Dict[str, Any],
+                             summary_message: Callable, message: str) -> AnalysisResponse:
+    analysis_result = await legal_analyzer.areanalyze_revision(text, clauses, previous_clauses, stage_executor)
+    
+    # Reused classifications may come from the client (previous_analysis), so the result is
+    # never served from the analysis cache to plain analyses
+    response_data, metadata = await _finish_analysis(
+        cache_key, text, clauses, analysis_result, start_time, extra_metadata, summary_message, cache=False
+    )
+    
+    return AnalysisResponse(
+        status="success",
+        data={**response_data, "changes": analysis_result["changes"]},
+        metadata={**metadata, "revision_of": previous_document_id},
+        message=message
+    )
+
+def _document_summary_message(clauses: List[Dict[str, Any]], analysis_result: Dict[str, Any]) -> str:
+    return f"Analysis completed. Found {len(clauses)} clauses with {len(analysis_result['provisions_by_category'])} categories."
+
+def _text_summary_message(clauses: List[Dict[str, Any]], analysis_result: Dict[str, Any]) -> str:
+    return f"Analysis completed. Found {len(clauses)} clauses."
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return dumps(record) + b"\n"
+
+async def _stream_analysis(text: str, clauses: List[Dict[str, Any]], cache_key: str, start_time: datetime,
+                           extra_metadata: Dict[str, Any], summary_message: Callable, message: str) -> AsyncIterator[bytes]:
+    """NDJSON records: each clause as it is classified, then compliance, risk
+    and a final "result" record shaped like AnalysisResponse."""
+    try:
+        async for event in legal_analyzer.astream_analysis(text, clauses, stage_executor):
+            if event["type"] != "analysis":
+                yield _ndjson(event)
+                continue
+
+            response_data, metadata = await _finish_analysis(
+                cache_key, text, clauses, event["analysis"], start_time, extra_metadata, summary_message
+            )
+            yield _ndjson({
+                "type": "result",
+                "status": "success",
+                "data": response_data,
+                "metadata": metadata,
+                "message": message
+            })
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-band
+        logger.error(f"Streaming analysis failed: {e}")
+        yield _ndjson({"type": "error", "status": "error", "message": f"Analysis failed: {str(e)}"})
+
+def _stream_cached_analysis(cached: Dict[str, Any], start_time: datetime, message: str) -> AsyncIterator[bytes]:
+    async def replay():
+        data = cached["data"]
+        clauses = sorted(
+            (clause for category_clauses in data["clauses"].values() for clause in category_clauses),
+            key=lambda clause: clause.get("start", 0)
+        )
+        for index, clause in enumerate(clauses):
+            yield _ndjson({"type": "clause", "index": index, "clause": clause})
+        yield _ndjson({"type": "compliance", "compliance": data["compliance"]})
+        yield _ndjson({"type": "risk", "risk": data["risk"]})
+        yield _ndjson({
+            "type": "result",
+            "status": "success",
+            "data": data,
+            "metadata": _cache_hit_metadata(cached, start_time),
+            "message": message
+        })
+    return replay()
+
+def _ndjson_response(records: AsyncIterator[bytes]) -> StreamingResponse:
+    # X-Accel-Buffering stops nginx-style proxies from holding records back; an explicit
+    # identity encoding keeps GZipMiddleware from buffering records until its window fills
+    return StreamingResponse(
+        records,
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache", "Content-Encoding": "identity"}
+    )
+
+COMPACT_CLAUSE_FIELDS = ("id", "start", "end", "category", "confidence")
+CLAUSE_FIELDS = COMPACT_CLAUSE_FIELDS + ("page", "word_count", "original_label", "similarity", "text")
+
+def _clause_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return COMPACT_CLAUSE_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in CLAUSE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown clause fields: {', '.join(unknown)}")
+    return selected
+
+async def _analysis_output(response: AnalysisResponse, compact: bool, clause_fields: Tuple[str, ...],
+                           include_text: bool):
+    """The response as-is, or in compact form: clauses as a flat list of the selected
+    fields in document order, with offsets into the analyzed text included once.
+
+    Compact responses skip response-model validation and use the fast encoder.
+    """
+    if not compact:
+        return response
+
+    data = response.data
+    clauses = sorted(
+        (clause for category_clauses in data["clauses"].values() for clause in category_clauses),
+        key=lambda clause: clause["start"]
+    )
+    compact_data = {key: value for key, value in data.items() if key != "clauses"}
+    compact_data["clauses"] = [
+        {field: clause[field] for field in clause_fields if field in clause}
+        for clause in clauses
+    ]
+    if include_text:
+        document = await asyncio.to_thread(document_store.get, data["document_id"])
+        if document is not None:
+            compact_data["text"] = document["text"]
+
+    return Response(
+        dumps({
+            "status": response.status,
+            "data": compact_data,
+            "metadata": response.metadata,
+            "message": response.message
+        }),
+        media_type="application/json"
+    )
+
+def _raise_for_pipeline_error(e: Exception):
+    if isinstance(e, HTTPException):
+        raise e
+    if isinstance(e, WorkerPoolBusyError):
+        raise HTTPException(status_code=503, detail=str(e))
+    if isinstance(e, StageTimeoutError):
+        raise HTTPException(status_code=504, detail=str(e))
+    raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_contract(file: UploadFile = File(...)):
+async def analyze_contract(file: UploadFile = File(...), compact: bool = False, fields: Optional[str] = None,
+                           include_text: bool = False):
+    """Analyze an uploaded document. With compact=true clauses come back as offsets into
+    the extracted text; fields selects clause fields and include_text=true adds the text,
+    which clients can otherwise fetch once from GET /documents/{document_id}."""
     try:
         start_time = datetime.now()
+        clause_fields = _clause_fields(fields)
         
-        allowed_types = ['application/pdf', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain']
-        if file.content_type not in allowed_types:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
+        with await _read_upload(file) as upload:
+            cache_key = _upload_cache_key(upload.sha256, file.content_type)
+            cached_response = await _cached_analysis_response(cache_key, start_time, "Document analyzed successfully")
+            if cached_response is not None:
+                return await _analysis_output(cached_response, compact, clause_fields, include_text)
+            
+            text, clauses, extra_metadata = await _extract_clauses(upload.content, file.content_type)
         
-        content = await file.read()
-        if len(content) == 0:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-        
-        if file.content_type == 'application/pdf':
-            text = document_processor.extract_text_from_pdf(content)
-        elif file.content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-            text = document_processor.extract_text_from_docx(content)
-        else:
-            text = document_processor.extract_text_from_txt(content)
-        
-        if not text or len(text.strip()) < 50:
-            raise HTTPException(status_code=400, detail="Document too short for analysis")
-        
-        text = document_processor.preprocess_text(text)
-        clauses = document_processor.segment_into_clauses(text)
-        
-        analysis_result = legal_analyzer.comprehensive_analysis(text, clauses)
-        
-        processing_time = (datetime.now() - start_time).total_seconds()
-        metadata = {
-            "file_type": file.content_type,
-            "text_length": len(text),
-            "clauses_identified": len(clauses),
-            "processing_time_seconds": round(processing_time, 2),
-            "timestamp": datetime.now().isoformat()
-        }
+        analysis_result = await legal_analyzer.acomprehensive_analysis(text, clauses, stage_executor)
         
-        response_data = {
-            "summary": {
-                "message": f"Analysis completed. Found {len(clauses)} clauses with {len(analysis_result['provisions_by_category'])} categories.",
-                "total_clauses": len(clauses),
-                "categories_identified": len(analysis_result['provisions_by_category']),
-                "risk_level": analysis_result["risk_assessment"]["risk_level"]
-            },
-            "clauses": analysis_result["provisions_by_category"],
-            "compliance": analysis_result["compliance_analysis"],
-            "risk": analysis_result["risk_assessment"],
-            "document_stats": {
-                "total_words": len(text.split()),
-                "total_clauses": len(clauses),
-                "risk_level": analysis_result["risk_assessment"]["risk_level"]
-            }
-        }
+        response_data, metadata = await _finish_analysis(
+            cache_key, text, clauses, analysis_result, start_time, extra_metadata, _document_summary_message
+        )
         
-        return AnalysisResponse(
+        return await _analysis_output(AnalysisResponse(
             status="success",
             data=response_data,
             metadata=metadata,
             message="Document analyzed successfully"
-        )
+        ), compact, clause_fields, include_text)
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        _raise_for_pipeline_error(e)
+
+@app.post("/analyze/stream")
+async def analyze_contract_stream(file: UploadFile = File(...)):
+    """Streaming variant of /analyze that returns NDJSON records."""
+    try:
+        start_time = datetime.now()
+        
+        with await _read_upload(file) as upload:
+            cache_key = _upload_cache_key(upload.sha256, file.content_type)
+            cached = await _cached_analysis(cache_key)
+            if cached is not None:
+                return _ndjson_response(_stream_cached_analysis(cached, start_time, "Document analyzed successfully"))
+            
+            text, clauses, extra_metadata = await _extract_clauses(upload.content, file.content_type)
+        
+        return _ndjson_response(_stream_analysis(
+            text, clauses, cache_key, start_time, extra_metadata,
+            _document_summary_message, "Document analyzed successfully"
+        ))
+        
+    except Exception as e:
+        _raise_for_pipeline_error(e)
 
 @app.post("/analyze-text", response_model=AnalysisResponse)
-async def analyze_text(request: AnalysisRequest):
+async def analyze_text(request: AnalysisRequest, compact: bool = False, fields: Optional[str] = None,
+                       include_text: bool = False):
+    """Analyze plain text; compact, fields and include_text work as for /analyze.
+    Compact offsets refer to the whitespace-normalized text, not the text as sent."""
     try:
-        if not request.text.strip() or len(request.text.strip()) < 50:
+        if not request.text or len(request.text.strip()) < 50:
             raise HTTPException(status_code=400, detail="Text too short for analysis")
         
         start_time = datetime.now()
+        clause_fields = _clause_fields(fields)
         
-        text = document_processor.preprocess_text(request.text)
-        clauses = document_processor.segment_into_clauses(text)
-        analysis_result = legal_analyzer.comprehensive_analysis(text, clauses)
+        text = await stage_executor.run("segmentation", document_processor.preprocess_text, request.text)
         
-        processing_time = (datetime.now() - start_time).total_seconds()
-        metadata = {
-            "text_length": len(text),
-            "clauses_identified": len(clauses),
-            "processing_time_seconds": round(processing_time, 2),
-            "timestamp": datetime.now().isoformat()
-        }
+        cache_key = content_hash(ANALYSIS_CACHE_VERSION, "text", text)
+        cached_response = await _cached_analysis_response(cache_key, start_time, "Text analyzed successfully")
+        if cached_response is not None:
+            return await _analysis_output(cached_response, compact, clause_fields, include_text)
         
-        response_data = {
-            "summary": {
-                "message": f"Analysis completed. Found {len(clauses)} clauses.",
-                "total_clauses": len(clauses),
-                "categories_identified": len(analysis_result['provisions_by_category']),
-                "risk_level": analysis_result["risk_assessment"]["risk_level"]
-            },
-            "clauses": analysis_result["provisions_by_category"],
-            "compliance": analysis_result["compliance_analysis"],
-            "risk": analysis_result["risk_assessment"],
-            "document_stats": {
-                "total_words": len(text.split()),
-                "total_clauses": len(clauses),
-                "risk_level": analysis_result["risk_assessment"]["risk_level"]
-            }
-        }
+        clauses = await stage_executor.run("segmentation", document_processor.segment_into_clauses, text)
+        analysis_result = await legal_analyzer.acomprehensive_analysis(text, clauses, stage_executor)
         
-        return AnalysisResponse(
+        response_data, metadata = await _finish_analysis(
+            cache_key, text, clauses, analysis_result, start_time, {}, _text_summary_message
+        )
+        
+        return await _analysis_output(AnalysisResponse(
             status="success",
             data=response_data,
             metadata=metadata,
             message="Text analyzed successfully"
+        ), compact, clause_fields, include_text)
+        
+    except Exception as e:
+        _raise_for_pipeline_error(e)
+
+@app.post("/analyze-text/stream")
+async def analyze_text_stream(request: AnalysisRequest):
+    """Streaming variant of /analyze-text that returns NDJSON records."""
+    try:
+        if not request.text or len(request.text.strip()) < 50:
+            raise HTTPException(status_code=400, detail="Text too short for analysis")
+        
+        start_time = datetime.now()
+        
+        text = await stage_executor.run("segmentation", document_processor.preprocess_text, request.text)
+        
+        cache_key = content_hash(ANALYSIS_CACHE_VERSION, "text", text)
+        cached = await _cached_analysis(cache_key)
+        if cached is not None:
+            return _ndjson_response(_stream_cached_analysis(cached, start_time, "Text analyzed successfully"))
+        
+        clauses = await stage_executor.run("segmentation", document_processor.segment_into_clauses, text)
+        
+        return _ndjson_response(_stream_analysis(
+            text, clauses, cache_key, start_time, {},
+            _text_summary_message, "Text analyzed successfully"
+        ))
+        
+    except Exception as e:
+        _raise_for_pipeline_error(e)
+
+@app.post("/analyze/revision", response_model=AnalysisResponse)
+async def analyze_contract_revision(file: UploadFile = File(...), document_id: str = Form(...)):
+    """Analyze a new version of a stored document, reclassifying only changed clauses."""
+    try:
+        start_time = datetime.now()
+        
+        previous_clauses = await asyncio.to_thread(_previous_clauses, document_id, None)
+        with await _read_upload(file) as upload:
+            cache_key = _upload_cache_key(upload.sha256, file.content_type)
+            text, clauses, extra_metadata = await _extract_clauses(upload.content, file.content_type)
+        
+        return await _revision_response(
+            cache_key, text, clauses, previous_clauses, document_id, start_time, extra_metadata,
+            _document_summary_message, "Revision analyzed successfully"
         )
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        _raise_for_pipeline_error(e)
+
+@app.post("/analyze-text/revision", response_model=AnalysisResponse)
+async def analyze_text_revision(request: RevisionRequest):
+    """Analyze a new version of a text given the earlier document_id or previous_analysis data."""
+    try:
+        if len(request.text.strip()) < 50:
+            raise HTTPException(status_code=400, detail="Text too short for analysis")
+        
+        start_time = datetime.now()
+        
+        previous_clauses = await asyncio.to_thread(_previous_clauses, request.document_id, request.previous_analysis)
+        text = await stage_executor.run("segmentation", document_processor.preprocess_text, request.text)
+        cache_key = content_hash(ANALYSIS_CACHE_VERSION, "text", text)
+        
+        clauses = await stage_executor.run("segmentation", document_processor.segment_into_clauses, text)
+        
+        return await _revision_response(
+            cache_key, text, clauses, previous_clauses, request.document_id, start_time, {},
+            _text_summary_message, "Revision analyzed successfully"
+        )
+        
+    except Exception as e:
+        _raise_for_pipeline_error(e)
+
+async def _analyze_job_document(content: bytes, content_type: str) -> Dict[str, Any]:
+    """Job worker handler: the /analyze pipeline for one queued document."""
+    start_time = datetime.now()
+    # Each document is its own fair-queuing flow, alongside interactive requests
+    start_flow()
+    
+    cache_key = _upload_cache_key(hashlib.sha256(content).hexdigest(), content_type)
+    cached = await _cached_analysis(cache_key)
+    if cached is not None:
+        return {"data": cached["data"], "metadata": _cache_hit_metadata(cached, start_time)}
+    
+    text, clauses, extra_metadata = await _extract_clauses(content, content_type)
+    analysis_result = await legal_analyzer.acomprehensive_analysis(text, clauses, stage_executor)
+    
+    response_data, metadata = await _finish_analysis(
+        cache_key, text, clauses, analysis_result, start_time, extra_metadata, _document_summary_message
+    )
+    return {"data": response_data, "metadata": metadata}
+
+job_workers = JobWorkerPool(job_store, _analyze_job_document, workers=JOB_WORKERS)
+
+@app.post("/jobs", response_model=AnalysisResponse, status_code=202)
+async def create_job(files: List[UploadFile] = File(None), texts: List[str] = Form(None)):
+    """Queue many files and/or texts for background analysis; poll GET /jobs/{job_id}."""
+    files = files or []
+    texts = texts or []
+    if not files and not texts:
+        raise HTTPException(status_code=400, detail="At least one file or text is required")
+    if len(files) + len(texts) > JOB_MAX_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {JOB_MAX_DOCUMENTS} documents per job")
+    
+    documents = []
+    for file in files:
+        upload = await _read_upload(file, allow_mmap=False)
+        documents.append((file.filename, file.content_type, upload.content))
+    for index, text in enumerate(texts):
+        if len(text.strip()) < 50:
+            raise HTTPException(status_code=400, detail=f"Text {index} too short for analysis")
+        documents.append((f"text_{index + 1}", "text/plain", text.encode("utf-8")))
+    
+    job_id = await asyncio.to_thread(job_store.create_job, documents)
+    job_workers.notify()
+    
+    return AnalysisResponse(
+        status="success",
+        data={"job_id": job_id, "documents": len(documents)},
+        metadata={"timestamp": datetime.now().isoformat()},
+        message="Job queued"
+    )
+
+@app.get("/jobs/{job_id}", response_model=AnalysisResponse)
+async def get_job(job_id: str, include_results: bool = True):
+    job = await asyncio.to_thread(job_store.get_job, job_id, include_results)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return AnalysisResponse(
+        status="success",
+        data=job,
+        metadata={"timestamp": datetime.now().isoformat()},
+        message=f"Job {job['status']}"
+    )
 
 @app.post("/ask", response_model=AnalysisResponse)
 async def ask_question(request: AnalysisRequest):
     try:
-        if not request.text.strip():
-            raise HTTPException(status_code=400, detail="Document text is required")
-        
         if not request.question or not request.question.strip():
             raise HTTPException(status_code=400, detail="Question is required")
         
-        answer_result = legal_analyzer.answer_legal_question(request.question, request.text)
+        if request.document_id:
+            document = await asyncio.to_thread(document_store.get, request.document_id)
+            if document is None:
+                raise HTTPException(status_code=404, detail="Document not found or expired, analyze it again")
+            # Retrieval and the blocking inference call run off the event loop
+            answer_result = await asyncio.to_thread(
+                legal_analyzer.answer_legal_question, request.question, document["text"], _stored_clause_texts(document)
+            )
+        elif request.text and request.text.strip():
+            answer_result = await asyncio.to_thread(legal_analyzer.answer_legal_question, request.question, request.text)
+        else:
+            raise HTTPException(status_code=400, detail="Document text or document_id is required")
         
         metadata = {
+            "document_id": request.document_id,
             "question_answered": True,
             "answer_confidence": answer_result["confidence"],
+            "answer_source": answer_result["source"],
+            "context_clauses": answer_result.get("context_clauses", []),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -187,8 +905,46 @@ async def ask_question(request: AnalysisRequest):
             message="Question answered successfully"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Question answering failed: {str(e)}")
 
+@app.get("/documents/{document_id}", response_model=AnalysisResponse)
+async def get_document(document_id: str, include_text: bool = False):
+    """Stored analysis for a document_id returned by the analyze endpoints."""
+    document = await asyncio.to_thread(document_store.get, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found or expired")
+    
+    clause_texts = _stored_clause_texts(document)
+    data = {
+        "document_id": document_id,
+        "clauses": [{**clause, "text": clause_text} for clause, clause_text in zip(document["clauses"], clause_texts)],
+        "compliance": document["compliance"],
+        "risk": document["risk"]
+    }
+    if include_text:
+        data["text"] = document["text"]
+    
+    return AnalysisResponse(
+        status="success",
+        data=data,
+        metadata=document["metadata"],
+        message="Document retrieved successfully"
+    )
+
+@app.delete("/documents/{document_id}", response_model=AnalysisResponse)
+async def delete_document(document_id: str):
+    if not await asyncio.to_thread(document_store.delete, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return AnalysisResponse(
+        status="success",
+        data={"document_id": document_id},
+        metadata={"timestamp": datetime.now().isoformat()},
+        message="Document deleted"
+    )
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
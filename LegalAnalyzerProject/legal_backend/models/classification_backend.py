@@ -0,0 +1,103 @@
+import abc
+import asyncio
+import httpx
+from typing import Any, Dict, List
+from config import HF_API_URL, HF_TOKEN, LEGAL_MODELS, HTTP_POOL_SIZE, CLASSIFICATION_TIMEOUT
+from models.rule_engine import get_rule_engine
+
+
+class ClassificationBackend(abc.ABC):
+    """Classifies a batch of clause texts.
+
+    ``classify`` returns one prediction list (``[{"label", "score"}, ...]``,
+    best first) per input text, in order, and raises if the batch failed.
+    ``model_name`` keys the classification cache, so backends never share
+    cached answers. Subclasses must implement ``classify``.
+    """
+
+    model_name = "base"
+
+    @abc.abstractmethod
+    async def classify(self, texts: List[str]) -> List[Any]:
+        """One prediction list per text, in order."""
+
+    def warm_up(self):
+        """Set up clients before the first request; called on the serving event loop."""
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class HuggingFaceClassificationBackend(ClassificationBackend):
+    """Hosted inference API; the whole batch goes out in one request."""
+
+    def __init__(self, model: str = None):
+        self.model_name = model or LEGAL_MODELS['classification']
+        self.headers = {"Authorization": f"Bearer {HF_TOKEN}"}
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_SIZE,
+                    max_keepalive_connections=HTTP_POOL_SIZE
+                ),
+                timeout=CLASSIFICATION_TIMEOUT
+            )
+        return self._client
+
+    def warm_up(self):
+        # Building the client loads the TLS trust store, tens of milliseconds otherwise paid by a request
+        self._get_client()
+
+    async def classify(self, texts: List[str]) -> List[Any]:
+        response = await self._get_client().post(f"{HF_API_URL}{self.model_name}", json={"inputs": texts})
+        if response.status_code != 200:
+            raise Exception(f"Classification API returned {response.status_code}")
+
+        # The API returns one prediction list per input, in input order
+        result = response.json()
+        if not isinstance(result, list) or len(result) != len(texts):
+            raise Exception("Batch classification response did not match the request")
+        return result
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalClassificationBackend(ClassificationBackend):
+    """In-process stand-in model built on the rule engine, for tests and offline use.
+
+    ``latency`` adds a fixed delay per call to mimic a remote round trip.
+    """
+
+    model_name = "local-rules"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.rule_engine = get_rule_engine()
+        self.calls = 0
+
+    async def classify(self, texts: List[str]) -> List[Any]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._predict(text) for text in texts]
+
+    def _predict(self, text: str) -> List[Dict[str, Any]]:
+        classification = self.rule_engine.classify(self.rule_engine.scan(text.lower()))
+        return [{"label": classification["category"], "score": classification["confidence"]}]
+
+
+def create_classification_backend(name: str) -> ClassificationBackend:
+    if name == "huggingface":
+        return HuggingFaceClassificationBackend()
+    if name == "local":
+        return LocalClassificationBackend()
+    raise ValueError(f"Unknown classification backend: {name}")
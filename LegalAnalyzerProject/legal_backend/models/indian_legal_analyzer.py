@@ -1,17 +1,144 @@
 import requests
+import asyncio
+import difflib
 import json
-import re
+import time
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from datetime import datetime
-from config import HF_API_URL, HF_TOKEN, LEGAL_MODELS, INDIAN_CLAUSE_CATEGORIES
+from config import (
+    HF_API_URL, HF_TOKEN, LEGAL_MODELS, INDIAN_CLAUSE_CATEGORIES,
+    CLASSIFICATION_CONCURRENCY, CLASSIFICATION_TIMEOUT,
+    CLASSIFICATION_BATCH_SIZE, CLASSIFICATION_BATCH_MAX_CHARS,
+    CLASSIFICATION_BATCH_MAX_WAIT_MS, CLASSIFICATION_BACKEND,
+    CLASSIFICATION_MODE, HYBRID_MIN_CONFIDENCE, HYBRID_MIN_MARGIN,
+    CLASSIFICATION_CACHE_SIZE, CLASSIFICATION_CACHE_TTL,
+    CLASSIFICATION_CACHE_DB, CLASSIFICATION_CACHE_DB_MAX_ENTRIES,
+    NEAR_DUPLICATE_THRESHOLD, NEAR_DUPLICATE_INDEX_SIZE, NEAR_DUPLICATE_PERMUTATIONS,
+    NEAR_DUPLICATE_BANDS, NEAR_DUPLICATE_DB, NEAR_DUPLICATE_DB_MAX_ENTRIES,
+    BREAKER_FAILURE_RATE, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_OPEN_SECONDS,
+    ADAPTIVE_TIMEOUT_PERCENTILE, ADAPTIVE_TIMEOUT_MULTIPLIER, ADAPTIVE_TIMEOUT_MIN, QA_TIMEOUT,
+    QA_CONTEXT_CHARS, QA_CONTEXT_TOP_K, RETRIEVAL_INDEX_CACHE_SIZE,
+    OUTBOUND_RATE_PER_SECOND, OUTBOUND_BURST, OUTBOUND_INTERACTIVE_RESERVE, OUTBOUND_INTERACTIVE_MAX_WAIT
+)
+from models.classification_backend import ClassificationBackend, create_classification_backend
+from models.rule_engine import RuleScan, get_rule_engine, analyze_document_rules, confident_rule_classifications
+from utils.batch_scheduler import MicroBatchScheduler
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.cache import LRUCache, TieredCache, content_hash
+from utils.document_processor import IndianDocumentProcessor
+from utils.executor import StageExecutor
+from utils.metrics import Counter, Histogram, record_stage, stage_timer
+from utils.near_duplicates import NearDuplicateIndex
+from utils.outbound import RateLimitedError, TokenBucket, current_flow
+from utils.retrieval import ClauseIndex
 
 logger = logging.getLogger(__name__)
 
+INFERENCE_LATENCY = Histogram(
+    "legal_inference_request_seconds", "Latency of inference API calls", ("endpoint", "outcome")
+)
+CLASSIFICATION_BATCH_SIZES = Histogram(
+    "legal_classification_batch_size", "Clauses per classification backend call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+CLAUSES_CLASSIFIED = Counter(
+    "legal_clauses_classified_total", "Clause classifications by source", ("source",)
+)
+QA_ANSWERS = Counter("legal_qa_answers_total", "Question answers by source", ("source",))
+
+def _inference_breaker(name: str, max_timeout: float) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_rate=BREAKER_FAILURE_RATE,
+        window=BREAKER_WINDOW,
+        min_calls=BREAKER_MIN_CALLS,
+        open_seconds=BREAKER_OPEN_SECONDS,
+        max_timeout=max_timeout,
+        min_timeout=ADAPTIVE_TIMEOUT_MIN,
+        percentile=ADAPTIVE_TIMEOUT_PERCENTILE,
+        multiplier=ADAPTIVE_TIMEOUT_MULTIPLIER
+    )
+
+def _latency_kind(items: int) -> str:
+    """Breaker latency kind of a call: its input count rounded up to a power of two."""
+    return str(1 << max(items - 1, 0).bit_length())
+
 class IndianLegalAnalyzer:
-    def __init__(self):
+    def __init__(self, classification_backend: ClassificationBackend = None):
         self.headers = {"Authorization": f"Bearer {HF_TOKEN}"}
         self.session = requests.Session()
+        self.classification_backend = classification_backend or create_classification_backend(CLASSIFICATION_BACKEND)
+        # While a breaker is open, calls skip the API and use the rule-based fallbacks
+        self.classification_breaker = _inference_breaker("classification", CLASSIFICATION_TIMEOUT)
+        self.qa_breaker = _inference_breaker("qa", QA_TIMEOUT)
+        # Every call to the inference API takes a token, keeping all requests within its rate limit
+        self.rate_limiter = TokenBucket(OUTBOUND_RATE_PER_SECOND, OUTBOUND_BURST, OUTBOUND_INTERACTIVE_RESERVE)
+        # Shared by all requests so concurrent analyses are classified in the same batches,
+        # filled fairly across requests
+        self.batch_scheduler = MicroBatchScheduler(
+            self._abackend_classify,
+            max_batch_size=CLASSIFICATION_BATCH_SIZE,
+            max_wait=CLASSIFICATION_BATCH_MAX_WAIT_MS / 1000,
+            max_batch_chars=CLASSIFICATION_BATCH_MAX_CHARS,
+            max_concurrency=CLASSIFICATION_CONCURRENCY,
+            rate_limiter=self.rate_limiter
+        )
+        self.rule_engine = get_rule_engine()
+        # Retrieval indexes for /ask, keyed by document text so repeat questions reuse them
+        self.clause_indexes = LRUCache(RETRIEVAL_INDEX_CACHE_SIZE)
+        self.classification_cache = TieredCache(
+            "clause_classifications",
+            max_entries=CLASSIFICATION_CACHE_SIZE,
+            ttl_seconds=CLASSIFICATION_CACHE_TTL,
+            db_path=CLASSIFICATION_CACHE_DB or None,
+            db_max_entries=CLASSIFICATION_CACHE_DB_MAX_ENTRIES
+        )
+        # Templated clauses differing only in names, dates or numbering reuse an earlier model answer
+        self.near_duplicates = NearDuplicateIndex(
+            self.classification_backend.model_name,
+            max_entries=NEAR_DUPLICATE_INDEX_SIZE,
+            threshold=NEAR_DUPLICATE_THRESHOLD,
+            num_perm=NEAR_DUPLICATE_PERMUTATIONS,
+            bands=NEAR_DUPLICATE_BANDS,
+            db_path=NEAR_DUPLICATE_DB or None,
+            db_max_entries=NEAR_DUPLICATE_DB_MAX_ENTRIES
+        )
+
+    def warm_up(self, text: str, clause_texts: List[str]):
+        """Run a sample document through the local stages: rules, near-duplicate signatures, retrieval."""
+        confident_rule_classifications(clause_texts, HYBRID_MIN_CONFIDENCE, HYBRID_MIN_MARGIN)
+        analyze_document_rules(text)
+        for clause in clause_texts:
+            self.near_duplicates.signature(clause)
+        ClauseIndex(clause_texts).search("termination notice period", QA_CONTEXT_TOP_K)
+
+    async def awarm_up(self, clause_texts: List[str], inference: bool = True):
+        """Open the inference clients and, with ``inference``, their connections.
+
+        One sample call per client establishes the pooled connection and wakes
+        the hosted model. Failures are logged and counted by the breaker like
+        any other call; they do not stop the server from starting.
+        """
+        self.classification_backend.warm_up()
+        if not inference:
+            return
+        sample = clause_texts[:1]
+        try:
+            if self.rate_limiter.try_acquire():
+                await self._abackend_classify(sample)
+            # The blocking session used by /ask
+            await asyncio.to_thread(
+                self._guarded_post, self.classification_breaker, LEGAL_MODELS['classification'], {"inputs": sample}
+            )
+        except (CircuitOpenError, RateLimitedError):
+            pass
+        except Exception as e:
+            logger.warning(f"Inference warmup call failed: {e}")
+
+    async def aclose(self):
+        await self.batch_scheduler.aclose()
+        await self.classification_backend.aclose()
     
     def classify_legal_provision(self, text: str) -> Dict[str, Any]:
         try:
@@ -22,15 +149,17 @@ class IndianLegalAnalyzer:
                     "confidence": 0.0,
                     "original_label": "too_short"
                 }
+
+            cached = self.classification_cache.get(self._classification_cache_key(text))
+            if cached is not None:
+                return cached
+            similar = self.near_duplicates.lookup(text)
+            if similar is not None:
+                return similar
                 
             payload = {"inputs": text}
             
-            response = self.session.post(
-                f"{HF_API_URL}{LEGAL_MODELS['classification']}",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            response = self._guarded_post(self.classification_breaker, LEGAL_MODELS['classification'], payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -39,11 +168,290 @@ class IndianLegalAnalyzer:
                 logger.warning(f"Classification API returned {response.status_code}, using rule-based fallback")
                 return self._rule_based_classification(text)
                 
+        except (CircuitOpenError, RateLimitedError):
+            return self._rule_based_classification(text)
         except Exception as e:
             logger.error(f"Classification error: {e}")
             return self._rule_based_classification(text)
 
-    def _process_classification_result(self, result: Any, text: str) -> Dict[str, Any]:
+    async def aclassify_legal_provision(self, text: str) -> Dict[str, Any]:
+        results = await self.aclassify_batch([text])
+        return results[0]
+
+    def classify_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Classify several clauses with a single inference request."""
+        results = [None] * len(texts)
+        pending = self._fill_known_results(texts, results)
+        if pending:
+            batch_results = self._post_batch([texts[i] for i in pending])
+            for i, result in zip(pending, batch_results):
+                results[i] = result
+        return results
+
+    async def aclassify_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        results = [None] * len(texts)
+        pending = self._fill_known_results(texts, results)
+        if pending:
+            writes = []
+            batch_results = await asyncio.gather(*(self._ascheduled_classification(texts[i], writes) for i in pending))
+            for i, result in zip(pending, batch_results):
+                results[i] = result
+            await self._apersist_classifications(writes)
+        return results
+
+    def classify_clauses(self, texts: List[str], rule_results: List[Optional[Dict[str, Any]]] = None,
+                         summary: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        results = [None] * len(texts)
+        pending = self._fill_known_results(texts, results, rule_results, summary)
+        for batch in self._pack_batches([texts[i] for i in pending]):
+            indices = [pending[j] for j in batch]
+            for i, result in zip(indices, self._post_batch([texts[i] for i in indices])):
+                self._count_fallback(result, summary)
+                results[i] = result
+        return results
+
+    async def aclassify_clauses(self, texts: List[str], rule_results: List[Optional[Dict[str, Any]]] = None,
+                                summary: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Classify clauses through the shared batch scheduler, returning results in input order."""
+        results = [None] * len(texts)
+        async for i, result in self.aiter_classifications(texts, rule_results, summary):
+            results[i] = result
+        return results
+
+    async def aiter_classifications(self, texts: List[str], rule_results: List[Optional[Dict[str, Any]]] = None,
+                                    summary: Dict[str, Any] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, classification) pairs as soon as each one is available.
+
+        Short, cached, near-duplicate and confidently rule-classified clauses
+        come first; the rest follow in completion order as the scheduler's
+        batches return. Escalated clauses the model could not answer are
+        counted in summary as "fallback". New model answers are written to the
+        cache databases in one batch, off the event loop, once all are in.
+        """
+        results = [None] * len(texts)
+        pending = self._fill_known_results(texts, results, rule_results, summary)
+        for i, result in enumerate(results):
+            if result is not None:
+                yield i, result
+
+        writes = []
+
+        async def classify_one(i: int):
+            return i, await self._ascheduled_classification(texts[i], writes)
+
+        tasks = [asyncio.ensure_future(classify_one(i)) for i in pending]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                i, result = await next_result
+                self._count_fallback(result, summary)
+                yield i, result
+        finally:
+            # The consumer may stop early, e.g. when a streaming client disconnects; the answers
+            # so far stay in the memory tiers but are not written to disk
+            for task in tasks:
+                task.cancel()
+        await self._apersist_classifications(writes)
+
+    def _guarded_post(self, breaker: CircuitBreaker, model: str, payload: Dict[str, Any]) -> requests.Response:
+        """POST to the inference API through a circuit breaker with its adaptive timeout.
+
+        Raises CircuitOpenError without calling the API while the breaker is open.
+        Waits for an interactive token from the shared rate limit, raising
+        RateLimitedError if none comes within OUTBOUND_INTERACTIVE_MAX_WAIT;
+        callers run off the event loop (/ask uses a thread).
+        """
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+        if not self.rate_limiter.acquire(OUTBOUND_INTERACTIVE_MAX_WAIT):
+            raise RateLimitedError(f"{breaker.name} call is over the outbound rate limit")
+
+        inputs = payload["inputs"]
+        kind = _latency_kind(len(inputs) if isinstance(inputs, list) else 1)
+        start = time.monotonic()
+        try:
+            response = self.session.post(
+                f"{HF_API_URL}{model}",
+                headers=self.headers,
+                json=payload,
+                timeout=breaker.timeout(kind)
+            )
+        except Exception:
+            INFERENCE_LATENCY.observe(time.monotonic() - start, endpoint=breaker.name, outcome="exception")
+            breaker.record_failure()
+            raise
+
+        latency = time.monotonic() - start
+        if response.status_code == 200:
+            INFERENCE_LATENCY.observe(latency, endpoint=breaker.name, outcome="success")
+            breaker.record_success(latency, kind)
+        else:
+            INFERENCE_LATENCY.observe(latency, endpoint=breaker.name, outcome="http_error")
+            breaker.record_failure()
+        return response
+
+    async def _abackend_classify(self, texts: List[str]) -> List[Any]:
+        """Scheduler batch handler: the backend call, timed and recorded by the classification breaker."""
+        breaker = self.classification_breaker
+        CLASSIFICATION_BATCH_SIZES.observe(len(texts))
+        kind = _latency_kind(len(texts))
+        timeout = breaker.timeout(kind)
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self.classification_backend.classify(texts), timeout)
+        except asyncio.TimeoutError:
+            INFERENCE_LATENCY.observe(time.monotonic() - start, endpoint="classification", outcome="timeout")
+            breaker.record_failure()
+            raise Exception(f"Classification timed out after {timeout:.1f} seconds")
+        except Exception:
+            INFERENCE_LATENCY.observe(time.monotonic() - start, endpoint="classification", outcome="exception")
+            breaker.record_failure()
+            raise
+
+        latency = time.monotonic() - start
+        INFERENCE_LATENCY.observe(latency, endpoint="classification", outcome="success")
+        breaker.record_success(latency, kind)
+        return result
+
+    def _post_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        try:
+            response = self._guarded_post(self.classification_breaker, LEGAL_MODELS['classification'], {"inputs": texts})
+
+            if response.status_code == 200:
+                return self._split_batch_result(response.json(), texts)
+            else:
+                logger.warning(f"Batch classification API returned {response.status_code}, using rule-based fallback")
+                return [self._rule_based_classification(text) for text in texts]
+
+        except (CircuitOpenError, RateLimitedError):
+            return [self._rule_based_classification(text) for text in texts]
+        except Exception as e:
+            logger.error(f"Batch classification error: {e}")
+            return [self._rule_based_classification(text) for text in texts]
+
+    async def _ascheduled_classification(self, text: str, writes: List[tuple]) -> Dict[str, Any]:
+        # Checked per clause so an open breaker answers at once instead of after the batch window
+        if not self.classification_breaker.allow_request():
+            return self._rule_based_classification(text)
+        try:
+            result = await self.batch_scheduler.submit(text, current_flow())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The scheduler already logged the failed batch
+            return self._rule_based_classification(text)
+        return self._process_classification_result(result, text, writes)
+
+    def _pack_batches(self, texts: List[str], max_size: int = None, max_chars: int = None) -> List[List[int]]:
+        """Group clause indices into batches bounded by clause count and total characters."""
+        max_size = max_size or CLASSIFICATION_BATCH_SIZE
+        max_chars = max_chars or CLASSIFICATION_BATCH_MAX_CHARS
+
+        batches = []
+        current = []
+        current_chars = 0
+        for i, text in enumerate(texts):
+            if current and (len(current) >= max_size or current_chars + len(text) > max_chars):
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append(i)
+            current_chars += len(text)
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _fill_known_results(self, texts: List[str], results: List[Any],
+                            rule_results: List[Optional[Dict[str, Any]]] = None,
+                            summary: Dict[str, Any] = None) -> List[int]:
+        """Fill in results for short, cached, near-duplicate or rule-resolved texts; return indices still needing the model.
+
+        rule_results comes from confident_rule_classifications in hybrid mode.
+        Near-duplicate results carry a "similarity" score. Counts per source are
+        added to summary when one is given.
+        """
+        pending = []
+        too_short = cached_count = similar_count = rule_resolved = 0
+        for i, text in enumerate(texts):
+            if len(text.strip()) < 10:
+                results[i] = {
+                    "category": "other",
+                    "confidence": 0.0,
+                    "original_label": "too_short"
+                }
+                too_short += 1
+                continue
+
+            cached = self.classification_cache.get(self._classification_cache_key(text))
+            if cached is not None:
+                results[i] = cached
+                cached_count += 1
+                continue
+
+            similar = self.near_duplicates.lookup(text)
+            if similar is not None:
+                results[i] = similar
+                similar_count += 1
+            elif rule_results is not None and rule_results[i] is not None:
+                results[i] = rule_results[i]
+                rule_resolved += 1
+            else:
+                pending.append(i)
+
+        CLAUSES_CLASSIFIED.inc(too_short, source="too_short")
+        CLAUSES_CLASSIFIED.inc(cached_count, source="cached")
+        CLAUSES_CLASSIFIED.inc(similar_count, source="similar")
+        CLAUSES_CLASSIFIED.inc(rule_resolved, source="rule_resolved")
+        if summary is not None:
+            summary.update({
+                "too_short": too_short,
+                "cached": cached_count,
+                "similar": similar_count,
+                "rule_resolved": rule_resolved,
+                "escalated": len(pending),
+                "fallback": 0
+            })
+        return pending
+
+    @staticmethod
+    def _count_fallback(result: Dict[str, Any], summary: Optional[Dict[str, Any]]):
+        # Escalated clauses only come back rule-based when the model could not answer
+        if summary is not None and result["original_label"] == "rule_based":
+            summary["fallback"] += 1
+
+    def _classification_cache_key(self, text: str) -> str:
+        normalized = " ".join(text.split()).lower()
+        return content_hash(self.classification_backend.model_name, normalized)
+
+    def _split_batch_result(self, result: Any, texts: List[str]) -> List[Dict[str, Any]]:
+        # The API returns one prediction list per input, in input order
+        if not isinstance(result, list) or len(result) != len(texts):
+            logger.warning("Batch classification response did not match the request, using rule-based fallback")
+            return [self._rule_based_classification(text) for text in texts]
+
+        writes = []
+        classifications = [
+            self._process_classification_result(item, text, writes)
+            for item, text in zip(result, texts)
+        ]
+        self._persist_classifications(writes)
+        return classifications
+
+    def _persist_classifications(self, writes: List[tuple]):
+        """Write model answers held back by _process_classification_result, one transaction per database."""
+        self.classification_cache.persist([(key, classification) for key, classification, _ in writes])
+        self.near_duplicates.persist([row for _, _, row in writes if row is not None])
+
+    async def _apersist_classifications(self, writes: List[tuple]):
+        if writes and (self.classification_cache.persistent or self.near_duplicates.persistent):
+            await asyncio.to_thread(self._persist_classifications, writes)
+
+    def _process_classification_result(self, result: Any, text: str, writes: List[tuple] = None) -> Dict[str, Any]:
+        """Map a model prediction to a classification and remember it.
+
+        With ``writes`` the memory tiers are updated at once and the database
+        writes are appended for _persist_classifications to do in a batch.
+        """
         try:
             if isinstance(result, list):
                 top_result = result[0]
@@ -52,11 +460,20 @@ class IndianLegalAnalyzer:
                 
                 indian_category = self._map_to_indian_category(label, text)
                 
-                return {
+                classification = {
                     "category": indian_category,
                     "confidence": score,
                     "original_label": label
                 }
+                # Only model answers are cached; fallbacks should be retried later
+                cache_key = self._classification_cache_key(text)
+                persist = writes is None
+                self.classification_cache.set(cache_key, classification, persist)
+                row = self.near_duplicates.add(text, classification, persist)
+                if writes is not None:
+                    writes.append((cache_key, classification, row))
+                CLAUSES_CLASSIFIED.inc(source="model")
+                return classification
             else:
                 return self._rule_based_classification(text)
                 
@@ -68,6 +485,9 @@ class IndianLegalAnalyzer:
         label_lower = label.lower()
         text_lower = text.lower()
         
+        if label_lower in INDIAN_CLAUSE_CATEGORIES:
+            return label_lower
+        
         category_mapping = {
             'confidential': 'confidentiality',
             'terminat': 'termination',
@@ -101,228 +521,80 @@ class IndianLegalAnalyzer:
         return 'other'
 
     def _rule_based_classification(self, text: str) -> Dict[str, Any]:
-        text_lower = text.lower()
-        
-        # Define patterns for all categories we can detect
-        patterns = {
-            'confidentiality': [
-                r'\b(?:confidential|non.?disclosure|proprietary information|trade secret)\b',
-                r'\b(?:not disclose|maintain secrecy)\b'
-            ],
-            'termination': [
-                r'\b(?:terminat|expir|cancell|end of|valid until)\b',
-                r'\b(?:duration|term of|early termination)\b'
-            ],
-            'liability': [
-                r'\b(?:liability|liable|responsible|obligation)\b',
-                r'\b(?:damages|compensation|accountable)\b'
-            ],
-            'indemnification': [
-                r'\b(?:indemnif|hold harmless|make good)\b',
-                r'\b(?:reimburse|compensate for loss)\b'
-            ],
-            'intellectual_property': [
-                r'\b(?:intellectual property|copyright|patent|trademark)\b',
-                r'\b(?:ip rights|proprietary rights)\b'
-            ],
-            'governing_law': [
-                r'\b(?:governing law|applicable law)\b',
-                r'\b(?:laws of india|indian law)\b'
-            ],
-            'payment_terms': [
-                r'\b(?:payment|fee|compensation|consideration|price)\b',
-                r'\b(?:within \d+ days|upon delivery|invoice)\b'
-            ],
-            'warranties': [
-                r'\b(?:warrant|guarantee|representation)\b',
-                r'\b(?:assurance|certify)\b'
-            ],
-            'limitation_of_liability': [
-                r'\b(?:limitation of liability|cap on damages)\b',
-                r'\b(?:maximum liability|limited to)\b'
-            ],
-            'dispute_resolution': [
-                r'\b(?:dispute|arbitration|mediation|conciliation)\b',
-                r'\b(?:arbitral tribunal|arbitrator)\b'
-            ],
-            'jurisdiction': [
-                r'\b(?:jurisdiction|courts of|competent court)\b',
-                r'\b(?:territorial jurisdiction)\b'
-            ],
-            'force_majeure': [
-                r'\b(?:force majeure|act of god|unforeseen circumstances)\b',
-                r'\b(?:natural calamity)\b'
-            ],
-            'non_compete': [
-                r'\b(?:non.?compete|non.?competition)\b',
-                r'\b(?:restrictive covenant)\b'
-            ],
-            'severability': [
-                r'\b(?:severability|severable)\b',
-                r'\b(?:if any provision)\b'
-            ],
-            'assignment': [
-                r'\b(?:assignment|assign)\b',
-                r'\b(?:transfer rights)\b'
-            ]
-        }
-        
-        # Initialize all categories with zero score
-        category_scores = {}
-        for category in INDIAN_CLAUSE_CATEGORIES:
-            category_scores[category] = 0
-        
-        # Score based on pattern matches
-        for category, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                try:
-                    matches = re.findall(pattern, text_lower, re.IGNORECASE)
-                    category_scores[category] += len(matches) * 2
-                except Exception as e:
-                    logger.warning(f"Pattern error for {category}: {pattern} - {e}")
-                    continue
-        
-        # Boost scores for Indian legal specific terms
-        if 'indian contract act' in text_lower:
-            category_scores['governing_law'] += 3
-        
-        if any(court in text_lower for court in ['delhi', 'mumbai', 'chennai', 'kolkata', 'bangalore', 'hyderabad']):
-            category_scores['jurisdiction'] += 3
-        
-        if 'stamp duty' in text_lower or 'stamp act' in text_lower:
-            category_scores['other'] += 2
-        
-        # Find the best category
-        best_category = 'other'
-        best_score = 0
-        
-        for category, score in category_scores.items():
-            if score > best_score:
-                best_score = score
-                best_category = category
-        
-        # Calculate confidence (normalize score)
-        confidence = min(best_score / 10.0, 1.0) if best_score > 0 else 0.0
-        
-        return {
-            "category": best_category,
-            "confidence": confidence,
-            "original_label": "rule_based"
-        }
+        # Only reached when the model could not answer
+        CLAUSES_CLASSIFIED.inc(source="fallback")
+        return self.rule_engine.classify(self.rule_engine.scan(text.lower()))
 
-    def analyze_contract_compliance(self, text: str) -> Dict[str, Any]:
-        compliance_issues = []
-        text_lower = text.lower()
-        
-        # Indian Contract Act compliance
-        if 'consideration' not in text_lower and 'payment' not in text_lower and 'price' not in text_lower:
-            compliance_issues.append({
-                "law": "Indian Contract Act, 1872",
-                "issue": "Consideration not clearly specified",
-                "severity": "HIGH"
-            })
-        
-        # Jurisdiction compliance
-        if not any(court in text_lower for court in ['delhi', 'mumbai', 'chennai', 'kolkata', 'bangalore', 'india', 'indian']):
-            compliance_issues.append({
-                "law": "Code of Civil Procedure, 1908",
-                "issue": "Jurisdiction not specified for Indian courts",
-                "severity": "HIGH"
-            })
-        
-        # Companies Act compliance for corporate agreements
-        if any(term in text_lower for term in ['company', 'private limited', 'ltd', 'pvt']):
-            if 'board resolution' not in text_lower and 'authorized signatory' not in text_lower:
-                compliance_issues.append({
-                    "law": "Companies Act, 2013",
-                    "issue": "Corporate authorization not specified",
-                    "severity": "MEDIUM"
-                })
-        
-        return {
-            "compliance_issues": compliance_issues,
-            "overall_compliance": "COMPLIANT" if not compliance_issues else "NON-COMPLIANT"
-        }
+    def analyze_contract_compliance(self, text: str, scan: RuleScan = None) -> Dict[str, Any]:
+        if scan is None:
+            scan = self.rule_engine.scan(text.lower(), score_terms=False)
+        return self.rule_engine.compliance(scan)
 
-    def assess_contract_risk(self, text: str) -> Dict[str, Any]:
-        risk_factors = []
-        risk_score = 0
-        text_lower = text.lower()
-        
-        # High risk indicators
-        if 'unlimited liability' in text_lower:
-            risk_factors.append("Unlimited liability clause - high risk")
-            risk_score += 3
-        
-        if not any(resolution in text_lower for resolution in ['arbitration', 'mediation', 'court', 'jurisdiction']):
-            risk_factors.append("No dispute resolution mechanism - high risk")
-            risk_score += 3
-        
-        if 'foreign law' in text_lower and 'india' not in text_lower:
-            risk_factors.append("Foreign governing law without Indian jurisdiction - high risk")
-            risk_score += 3
-        
-        # Medium risk indicators
-        if 'as soon as possible' in text_lower or 'reasonable time' in text_lower:
-            risk_factors.append("Vague timeframes - medium risk")
-            risk_score += 2
-        
-        if 'penalty' in text_lower and 'liquidated damages' not in text_lower:
-            risk_factors.append("Penalty clauses without liquidated damages - medium risk")
-            risk_score += 2
-        
-        # Low risk indicators
-        if 'confidential' not in text_lower and 'proprietary' not in text_lower:
-            risk_factors.append("No confidentiality provisions - low risk")
-            risk_score += 1
-        
-        # Determine risk level
-        if risk_score >= 6:
-            risk_level = "HIGH"
-        elif risk_score >= 3:
-            risk_level = "MEDIUM"
-        else:
-            risk_level = "LOW"
-        
-        return {
-            "risk_level": risk_level,
-            "risk_score": risk_score,
-            "risk_factors": risk_factors
-        }
+    def assess_contract_risk(self, text: str, scan: RuleScan = None) -> Dict[str, Any]:
+        if scan is None:
+            scan = self.rule_engine.scan(text.lower(), score_terms=False)
+        return self.rule_engine.risk(scan)
+
+    def clause_index_for(self, text: str, clause_texts: List[str] = None) -> ClauseIndex:
+        """Cached retrieval index for a document; clause_texts skips re-segmenting it."""
+        key = content_hash(text)
+        index = self.clause_indexes.get(key)
+        if index is None:
+            if clause_texts is None:
+                _, clauses = IndianDocumentProcessor.prepare_clauses(text)
+                clause_texts = [clause["text"] for clause in clauses]
+            index = ClauseIndex(clause_texts)
+            self.clause_indexes.set(key, index)
+        return index
+
+    def _question_context(self, question: str, context: str, clause_texts: List[str] = None) -> Tuple[str, List[str]]:
+        """Clauses most relevant to the question within QA_CONTEXT_CHARS, with their ids.
 
-    def answer_legal_question(self, question: str, context: str) -> Dict[str, Any]:
+        Falls back to the start of the document when no clause matches.
+        """
+        selected_text, selected = self.clause_index_for(context, clause_texts).select_context(
+            question, QA_CONTEXT_CHARS, QA_CONTEXT_TOP_K
+        )
+        if not selected:
+            return context[:QA_CONTEXT_CHARS], []
+        # segment_into_clauses numbers clauses from 1 in document order
+        return selected_text, [f"clause_{i + 1}" for i in selected]
+
+    def answer_legal_question(self, question: str, context: str, clause_texts: List[str] = None) -> Dict[str, Any]:
         try:
-            prompt = f"Context: {context[:1000]}\nQuestion: {question}\nAnswer:"
+            with stage_timer("qa_retrieval"):
+                context, context_clauses = self._question_context(question, context, clause_texts)
+            prompt = f"Context: {context}\nQuestion: {question}\nAnswer:"
             
             payload = {
                 "inputs": prompt,
                 "parameters": {"max_length": 500}
             }
             
-            response = self.session.post(
-                f"{HF_API_URL}{LEGAL_MODELS['qa']}",
-                headers=self.headers,
-                json=payload,
-                timeout=45
-            )
+            response = self._guarded_post(self.qa_breaker, LEGAL_MODELS['qa'], payload)
             
             if response.status_code == 200:
                 result = response.json()
                 if isinstance(result, list) and len(result) > 0:
                     answer = result[0].get('generated_text', '').strip()
+                    QA_ANSWERS.inc(source="inlegalbert")
                     return {
                         "answer": answer,
                         "confidence": 0.8,
-                        "source": "inlegalbert"
+                        "source": "inlegalbert",
+                        "context_clauses": context_clauses
                     }
             
             return self._fallback_legal_answer(question)
             
+        except (CircuitOpenError, RateLimitedError):
+            return self._fallback_legal_answer(question)
         except Exception as e:
             logger.error(f"Question answering error: {e}")
             return self._fallback_legal_answer(question)
 
     def _fallback_legal_answer(self, question: str) -> Dict[str, Any]:
+        QA_ANSWERS.inc(source="fallback_knowledge")
         question_lower = question.lower()
         
         if any(term in question_lower for term in ['termination', 'end contract']):
@@ -346,12 +618,158 @@ class IndianLegalAnalyzer:
             "source": "fallback_knowledge"
         }
 
-    def comprehensive_analysis(self, text: str, clauses: List[Dict]) -> Dict[str, Any]:
-        classified_clauses = []
-        for clause in clauses:
-            classification = self.classify_legal_provision(clause["text"])
-            classified_clauses.append({**clause, **classification})
+    def comprehensive_analysis(self, text: str, clauses: List[Dict], mode: str = None) -> Dict[str, Any]:
+        """Classify clauses and run the document rules.
+
+        In "hybrid" mode clauses the rule engine is confident about skip the
+        model; the returned classification_summary says how many were escalated.
+        """
+        texts = [clause["text"] for clause in clauses]
+        summary = {"mode": mode or CLASSIFICATION_MODE, "total": len(clauses)}
+        rule_results = None
+        if summary["mode"] == "hybrid":
+            rule_results = confident_rule_classifications(texts, HYBRID_MIN_CONFIDENCE, HYBRID_MIN_MARGIN)
+
+        with stage_timer("classification"):
+            classifications = self.classify_clauses(texts, rule_results, summary)
+        classified_clauses = [
+            {**clause, **classification}
+            for clause, classification in zip(clauses, classifications)
+        ]
         
+        return self._assemble_analysis(classified_clauses, self._document_rules(text), summary)
+
+    async def acomprehensive_analysis(self, text: str, clauses: List[Dict], executor: StageExecutor = None,
+                                      mode: str = None) -> Dict[str, Any]:
+        async for event in self.astream_analysis(text, clauses, executor, mode):
+            if event["type"] == "analysis":
+                return event["analysis"]
+
+    async def astream_analysis(self, text: str, clauses: List[Dict], executor: StageExecutor = None,
+                               mode: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield analysis events: one "clause" event per classified clause as it
+        completes, then "compliance" and "risk", then the full "analysis".
+
+        With an executor the document rules, and the hybrid-mode rule pass over
+        clauses, run on the worker pool.
+        """
+        texts = [clause["text"] for clause in clauses]
+        summary = {"mode": mode or CLASSIFICATION_MODE, "total": len(clauses)}
+        rules_task = None
+        if executor is not None:
+            rules_task = asyncio.ensure_future(executor.run("rules", analyze_document_rules, text))
+
+        try:
+            rule_results = await self._ahybrid_rule_results(texts, summary["mode"], executor)
+
+            classified_clauses = [None] * len(clauses)
+            start = time.perf_counter()
+            async for i, classification in self.aiter_classifications(texts, rule_results, summary):
+                classified_clauses[i] = {**clauses[i], **classification}
+                yield {"type": "clause", "index": i, "clause": classified_clauses[i]}
+            record_stage("classification", time.perf_counter() - start)
+
+            document_rules = await rules_task if rules_task else self._document_rules(text)
+        finally:
+            if rules_task is not None and not rules_task.done():
+                rules_task.cancel()
+
+        yield {"type": "compliance", "compliance": document_rules["compliance_analysis"]}
+        yield {"type": "risk", "risk": document_rules["risk_assessment"]}
+        yield {"type": "analysis", "analysis": self._assemble_analysis(classified_clauses, document_rules, summary)}
+
+    async def areanalyze_revision(self, text: str, clauses: List[Dict], previous_clauses: List[Dict],
+                                  executor: StageExecutor = None, mode: str = None) -> Dict[str, Any]:
+        """Analyze a revised document, reusing classifications of clauses unchanged since previous_clauses.
+
+        previous_clauses are the classified clauses of the earlier version, in
+        document order. The clause sequences are diffed by text; only inserted
+        or modified clauses are classified. Compliance and risk are recomputed
+        for the whole document. The result has the comprehensive analysis shape
+        plus a clause-level "changes" summary.
+        """
+        summary = {"mode": mode or CLASSIFICATION_MODE, "total": len(clauses)}
+        rules_task = None
+        if executor is not None:
+            rules_task = asyncio.ensure_future(executor.run("rules", analyze_document_rules, text))
+
+        try:
+            matcher = difflib.SequenceMatcher(
+                None, [clause["text"] for clause in previous_clauses], [clause["text"] for clause in clauses],
+                autojunk=False
+            )
+            classified_clauses = [None] * len(clauses)
+            changed = []
+            changes = []
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == "equal":
+                    for i, j in zip(range(i1, i2), range(j1, j2)):
+                        previous = previous_clauses[i]
+                        classified_clauses[j] = {
+                            **clauses[j],
+                            "category": previous["category"],
+                            "confidence": previous["confidence"],
+                            "original_label": previous["original_label"]
+                        }
+                    continue
+
+                # Paired clauses in a replaced run count as modified, the rest as inserted or removed
+                changed.extend(range(j1, j2))
+                for offset in range(max(i2 - i1, j2 - j1)):
+                    i = i1 + offset if i1 + offset < i2 else None
+                    j = j1 + offset if j1 + offset < j2 else None
+                    changes.append({
+                        "type": "modified" if i is not None and j is not None else ("inserted" if i is None else "removed"),
+                        "previous_clause": previous_clauses[i]["id"] if i is not None else None,
+                        "previous_category": previous_clauses[i]["category"] if i is not None else None,
+                        "clause": clauses[j]["id"] if j is not None else None,
+                        "_index": j
+                    })
+
+            changed_texts = [clauses[j]["text"] for j in changed]
+            rule_results = await self._ahybrid_rule_results(changed_texts, summary["mode"], executor)
+            with stage_timer("classification"):
+                classifications = await self.aclassify_clauses(changed_texts, rule_results, summary)
+            for j, classification in zip(changed, classifications):
+                classified_clauses[j] = {**clauses[j], **classification}
+
+            document_rules = await rules_task if rules_task else self._document_rules(text)
+        finally:
+            if rules_task is not None and not rules_task.done():
+                rules_task.cancel()
+
+        for change in changes:
+            j = change.pop("_index")
+            change["category"] = classified_clauses[j]["category"] if j is not None else None
+
+        summary["reused"] = len(clauses) - len(changed)
+        analysis = self._assemble_analysis(classified_clauses, document_rules, summary)
+        analysis["changes"] = {
+            "unchanged": summary["reused"],
+            "modified": sum(change["type"] == "modified" for change in changes),
+            "inserted": sum(change["type"] == "inserted" for change in changes),
+            "removed": sum(change["type"] == "removed" for change in changes),
+            "clauses": changes
+        }
+        return analysis
+
+    def _document_rules(self, text: str) -> Dict[str, Any]:
+        # The executor times the "rules" stage itself when one is used
+        with stage_timer("rules"):
+            return analyze_document_rules(text)
+
+    async def _ahybrid_rule_results(self, texts: List[str], mode: str,
+                                    executor: StageExecutor = None) -> Optional[List[Optional[Dict[str, Any]]]]:
+        if mode != "hybrid":
+            return None
+        if executor is not None:
+            return await executor.run(
+                "rules", confident_rule_classifications, texts, HYBRID_MIN_CONFIDENCE, HYBRID_MIN_MARGIN
+            )
+        return confident_rule_classifications(texts, HYBRID_MIN_CONFIDENCE, HYBRID_MIN_MARGIN)
+
+    def _assemble_analysis(self, classified_clauses: List[Dict], document_rules: Dict[str, Any],
+                           classification_summary: Dict[str, Any]) -> Dict[str, Any]:
         provisions_by_category = {}
         for clause in classified_clauses:
             category = clause["category"]
@@ -359,12 +777,10 @@ class IndianLegalAnalyzer:
                 provisions_by_category[category] = []
             provisions_by_category[category].append(clause)
         
-        compliance_analysis = self.analyze_contract_compliance(text)
-        risk_assessment = self.assess_contract_risk(text)
-        
         return {
             "provisions_analysis": classified_clauses,
             "provisions_by_category": provisions_by_category,
-            "compliance_analysis": compliance_analysis,
-            "risk_assessment": risk_assessment
+            "compliance_analysis": document_rules["compliance_analysis"],
+            "risk_assessment": document_rules["risk_assessment"],
+            "classification_summary": classification_summary
         }
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""Bulk risk and compliance scoring for a portfolio of contracts.
+
+Run from legal_backend:
+
+    python -m models.portfolio contracts/                  # summary for a directory
+    python -m models.portfolio contracts/ --recursive --workers 8 --output summary.json --documents scores.jsonl
+
+Each document is scanned once for the rule engine's keywords and, unless
+--no-categories is given, its clause category terms. The keyword hits form a document x keyword matrix, and the
+compliance issues, risk factors, risk scores and levels are computed for all
+documents at once from the shared indicator tables in models.rule_engine, so
+every document gets exactly what analyze_document_rules would report for it.
+The matrix is a dense boolean array: with a few dozen keyword columns it takes
+less memory than a sparse matrix's index arrays.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.rule_engine import (
+    COMPLIANCE_INDICATORS, KEYWORDS, RISK_INDICATORS, RISK_LEVELS, Indicator, get_rule_engine
+)
+from utils.document_processor import IndianDocumentProcessor
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_COLUMNS = sorted(set(KEYWORDS))
+_KEYWORD_INDEX = {keyword: j for j, keyword in enumerate(KEYWORD_COLUMNS)}
+RISK_LEVEL_NAMES = [level for _, level in RISK_LEVELS] + ["LOW"]
+# (keyword columns found, term score per category or None)
+DocumentScan = Tuple[List[int], Optional[List[int]]]
+EXTRACTORS = {
+    ".txt": IndianDocumentProcessor.extract_text_from_txt,
+    ".pdf": IndianDocumentProcessor.extract_text_from_pdf,
+    ".docx": IndianDocumentProcessor.extract_text_from_docx,
+}
+
+
+def scan_document(text: str, score_terms: bool = True) -> DocumentScan:
+    """One rule-engine pass over a document: (keyword columns found, term score per category).
+
+    score_terms=False skips the category term patterns, which cost several
+    times the keyword tests; the category scores are then None.
+    """
+    engine = get_rule_engine()
+    scan = engine.scan(text.lower(), score_terms)
+    return (
+        [_KEYWORD_INDEX[keyword] for keyword in scan.keywords],
+        [scan.category_scores[category] for category in engine.categories] if score_terms else None
+    )
+
+
+def _fires(keyword_matrix: np.ndarray, indicator: Indicator) -> np.ndarray:
+    """Vectorized Indicator.fires over every row of the keyword matrix."""
+    fires = np.ones(keyword_matrix.shape[0], dtype=bool)
+    if indicator.present:
+        fires &= keyword_matrix[:, [_KEYWORD_INDEX[keyword] for keyword in indicator.present]].any(axis=1)
+    if indicator.absent:
+        fires &= ~keyword_matrix[:, [_KEYWORD_INDEX[keyword] for keyword in indicator.absent]].any(axis=1)
+    return fires
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    if not values.size:
+        return {"mean": 0.0, "p50": 0.0, "p90": 0.0, "max": 0.0}
+    p50, p90 = np.percentile(values, [50, 90])
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": float(p50),
+        "p90": float(p90),
+        "max": float(values.max())
+    }
+
+
+class PortfolioScores:
+    """Rule-based scores for many documents, computed column-wise.
+
+    ``keywords`` is the document x KEYWORD_COLUMNS boolean matrix and
+    ``category_scores`` the document x category term score matrix (None when
+    terms were not scored), both in ``names`` order. The derived arrays hold
+    one row or value per document.
+    """
+
+    def __init__(self, names: List[str], keywords: np.ndarray, category_scores: Optional[np.ndarray] = None):
+        self.names = names
+        self.keywords = keywords
+        self.category_scores = category_scores
+        self.categories = get_rule_engine().categories
+
+        self.compliance_flags = np.column_stack(
+            [_fires(keywords, indicator) for _, indicator in COMPLIANCE_INDICATORS]
+        ) if len(names) else np.zeros((0, len(COMPLIANCE_INDICATORS)), dtype=bool)
+        self.compliant = ~self.compliance_flags.any(axis=1)
+
+        self.risk_flags = np.column_stack(
+            [_fires(keywords, indicator) for _, _, indicator in RISK_INDICATORS]
+        ) if len(names) else np.zeros((0, len(RISK_INDICATORS)), dtype=bool)
+        points = np.array([points for _, points, _ in RISK_INDICATORS], dtype=np.int64)
+        self.risk_scores = self.risk_flags.astype(np.int64) @ points
+        self.risk_levels = np.select(
+            [self.risk_scores >= threshold for threshold, _ in RISK_LEVELS],
+            [level for _, level in RISK_LEVELS],
+            default="LOW"
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def document(self, i: int) -> Dict[str, Any]:
+        """Document i in the shape analyze_document_rules returns."""
+        compliance_issues = [
+            dict(issue) for (issue, _), flag in zip(COMPLIANCE_INDICATORS, self.compliance_flags[i]) if flag
+        ]
+        return {
+            "compliance_analysis": {
+                "compliance_issues": compliance_issues,
+                "overall_compliance": "COMPLIANT" if self.compliant[i] else "NON-COMPLIANT"
+            },
+            "risk_assessment": {
+                "risk_level": str(self.risk_levels[i]),
+                "risk_score": int(self.risk_scores[i]),
+                "risk_factors": [
+                    factor for (factor, _, _), flag in zip(RISK_INDICATORS, self.risk_flags[i]) if flag
+                ]
+            }
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Portfolio-wide distributions of risk, compliance and clause categories.
+
+        Per category, when terms were scored: how many documents mention it,
+        their term hits, and the risk levels and compliance of those documents.
+        """
+        scores, levels = self.risk_scores, self.risk_levels
+        level_matrix = np.column_stack([levels == level for level in RISK_LEVEL_NAMES]).astype(np.int64) \
+            if len(self) else np.zeros((0, len(RISK_LEVEL_NAMES)), dtype=np.int64)
+        score_values, score_counts = np.unique(scores, return_counts=True)
+        summary = {
+            "documents": len(self),
+            "risk_levels": dict(zip(RISK_LEVEL_NAMES, level_matrix.sum(axis=0).tolist())),
+            "risk_score": {
+                **_percentiles(scores),
+                "histogram": {str(value): int(count) for value, count in zip(score_values, score_counts)}
+            },
+            "risk_factors": {
+                factor: int(count) for (factor, _, _), count in zip(RISK_INDICATORS, self.risk_flags.sum(axis=0))
+            },
+            "compliance": {
+                "COMPLIANT": int(self.compliant.sum()),
+                "NON-COMPLIANT": int(len(self) - self.compliant.sum())
+            },
+            "compliance_issues": {
+                issue["issue"]: int(count)
+                for (issue, _), count in zip(COMPLIANCE_INDICATORS, self.compliance_flags.sum(axis=0))
+            }
+        }
+        if self.category_scores is None:
+            return summary
+
+        # Each category term match scores 2 points
+        hits = self.category_scores // 2
+        mentions = hits > 0
+        level_by_category = mentions.T.astype(np.int64) @ level_matrix
+        compliant_by_category = mentions.T.astype(np.int64) @ self.compliant.astype(np.int64)
+        summary["categories"] = {}
+        for c, category in enumerate(self.categories):
+            documents = int(mentions[:, c].sum())
+            summary["categories"][category] = {
+                "documents": documents,
+                "share": round(documents / len(self), 4) if len(self) else 0.0,
+                "term_hits": _percentiles(hits[mentions[:, c], c]),
+                "risk_levels": dict(zip(RISK_LEVEL_NAMES, level_by_category[c].tolist())),
+                "compliant": int(compliant_by_category[c])
+            }
+        return summary
+
+
+def _build(names: List[str], scans: Iterable[DocumentScan], score_terms: bool) -> PortfolioScores:
+    rows, columns, category_scores = [], [], []
+    for i, (keyword_columns, scores) in enumerate(scans):
+        rows.extend([i] * len(keyword_columns))
+        columns.extend(keyword_columns)
+        category_scores.append(scores)
+
+    keywords = np.zeros((len(names), len(KEYWORD_COLUMNS)), dtype=bool)
+    keywords[rows, columns] = True
+    if not score_terms:
+        return PortfolioScores(names, keywords)
+    category_count = len(get_rule_engine().categories)
+    return PortfolioScores(
+        names, keywords, np.array(category_scores, dtype=np.int64).reshape(-1, category_count)
+    )
+
+
+def score_portfolio(texts: Sequence[str], names: Optional[List[str]] = None,
+                    score_terms: bool = True) -> PortfolioScores:
+    """Score already-extracted document texts; names default to their positions."""
+    names = names if names is not None else [str(i) for i in range(len(texts))]
+    return _build(names, (scan_document(text, score_terms) for text in texts), score_terms)
+
+
+def _scan_file(path: str, score_terms: bool = True) -> Tuple[Optional[DocumentScan], Optional[str]]:
+    """(scan, None) for a readable file, (None, error) otherwise; run in worker processes."""
+    try:
+        extractor = EXTRACTORS[os.path.splitext(path)[1].lower()]
+        with open(path, "rb") as f:
+            text = extractor(f.read())
+        # The same text the API runs the document rules on
+        return scan_document(IndianDocumentProcessor.preprocess_text(text), score_terms), None
+    except Exception as e:
+        return None, str(e)
+
+
+def find_documents(directory: str, recursive: bool = False) -> List[str]:
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        paths.extend(
+            os.path.join(root, name) for name in files if os.path.splitext(name)[1].lower() in EXTRACTORS
+        )
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def score_files(paths: List[str], workers: int = 1,
+                score_terms: bool = True) -> Tuple[PortfolioScores, List[Dict[str, str]]]:
+    """Extract and score TXT/PDF/DOCX files, in worker processes when workers > 1.
+
+    Returns the scores of the files that could be read and an error entry for
+    each that could not.
+    """
+    names, scans, errors = [], [], []
+    scan_file = partial(_scan_file, score_terms=score_terms)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(scan_file, paths, chunksize=16))
+    else:
+        results = map(scan_file, paths)
+
+    for path, (scan, error) in zip(paths, results):
+        if error is not None:
+            logger.warning(f"Skipping {path}: {error}")
+            errors.append({"file": path, "error": error})
+        else:
+            names.append(path)
+            scans.append(scan)
+
+    return _build(names, scans, score_terms), errors
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--recursive", action="store_true", help="include subdirectories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="extraction processes")
+    parser.add_argument("--output", help="write the summary as JSON instead of printing it")
+    parser.add_argument("--documents", help="write per-document results as JSON lines")
+    parser.add_argument("--no-categories", action="store_true",
+                        help="skip clause category term scoring and its distributions")
+    args = parser.parse_args(argv)
+
+    paths = find_documents(args.directory, args.recursive)
+    if not paths:
+        print(f"No TXT, PDF or DOCX files in {args.directory}", file=sys.stderr)
+        return 1
+
+    scores, errors = score_files(paths, args.workers, score_terms=not args.no_categories)
+    summary = scores.summary()
+    summary["errors"] = errors
+
+    if args.documents:
+        with open(args.documents, "w") as f:
+            for i, name in enumerate(scores.names):
+                f.write(json.dumps({"file": name, **scores.document(i)}) + "\n")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
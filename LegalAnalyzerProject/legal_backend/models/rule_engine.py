@@ -0,0 +1,319 @@
+import re
+from typing import Dict, Any, FrozenSet, List, NamedTuple, Optional, Tuple
+from config import INDIAN_CLAUSE_CATEGORIES
+
+# Word-bounded scoring terms per category. Each inner list is one pattern whose
+# matches add 2 points; terms are regex fragments matched against lowered text.
+CATEGORY_TERMS = {
+    'confidentiality': [
+        ['confidential', 'non.?disclosure', 'proprietary information', 'trade secret'],
+        ['not disclose', 'maintain secrecy']
+    ],
+    'termination': [
+        ['terminat', 'expir', 'cancell', 'end of', 'valid until'],
+        ['duration', 'term of', 'early termination']
+    ],
+    'liability': [
+        ['liability', 'liable', 'responsible', 'obligation'],
+        ['damages', 'compensation', 'accountable']
+    ],
+    'indemnification': [
+        ['indemnif', 'hold harmless', 'make good'],
+        ['reimburse', 'compensate for loss']
+    ],
+    'intellectual_property': [
+        ['intellectual property', 'copyright', 'patent', 'trademark'],
+        ['ip rights', 'proprietary rights']
+    ],
+    'governing_law': [
+        ['governing law', 'applicable law'],
+        ['laws of india', 'indian law']
+    ],
+    'payment_terms': [
+        ['payment', 'fee', 'compensation', 'consideration', 'price'],
+        [r'within \d+ days', 'upon delivery', 'invoice']
+    ],
+    'warranties': [
+        ['warrant', 'guarantee', 'representation'],
+        ['assurance', 'certify']
+    ],
+    'limitation_of_liability': [
+        ['limitation of liability', 'cap on damages'],
+        ['maximum liability', 'limited to']
+    ],
+    'dispute_resolution': [
+        ['dispute', 'arbitration', 'mediation', 'conciliation'],
+        ['arbitral tribunal', 'arbitrator']
+    ],
+    'jurisdiction': [
+        ['jurisdiction', 'courts of', 'competent court'],
+        ['territorial jurisdiction']
+    ],
+    'force_majeure': [
+        ['force majeure', 'act of god', 'unforeseen circumstances'],
+        ['natural calamity']
+    ],
+    'non_compete': [
+        ['non.?compete', 'non.?competition'],
+        ['restrictive covenant']
+    ],
+    'severability': [
+        ['severability', 'severable'],
+        ['if any provision']
+    ],
+    'assignment': [
+        ['assignment', 'assign'],
+        ['transfer rights']
+    ]
+}
+
+INDIAN_CITIES = ['delhi', 'mumbai', 'chennai', 'kolkata', 'bangalore', 'hyderabad']
+COMPLIANCE_COURT_TERMS = ['delhi', 'mumbai', 'chennai', 'kolkata', 'bangalore', 'india', 'indian']
+CORPORATE_TERMS = ['company', 'private limited', 'ltd', 'pvt']
+DISPUTE_MECHANISM_TERMS = ['arbitration', 'mediation', 'court', 'jurisdiction']
+
+# Plain substring keywords used by the boosts, compliance checks and risk indicators
+KEYWORDS = (
+    ['indian contract act', 'stamp duty', 'stamp act'] + INDIAN_CITIES
+    + ['consideration', 'payment', 'price'] + COMPLIANCE_COURT_TERMS + CORPORATE_TERMS
+    + ['board resolution', 'authorized signatory']
+    + ['unlimited liability', 'foreign law', 'as soon as possible', 'reasonable time',
+       'penalty', 'liquidated damages', 'confidential', 'proprietary']
+    + DISPUTE_MECHANISM_TERMS
+)
+
+
+class Indicator(NamedTuple):
+    """A keyword rule over a scan's keywords: it fires when any ``present``
+    keyword was found (always, if there are none) and no ``absent`` one was."""
+    present: Tuple[str, ...]
+    absent: Tuple[str, ...]
+
+    def fires(self, keywords: FrozenSet[str]) -> bool:
+        if self.present and not any(keyword in keywords for keyword in self.present):
+            return False
+        return not any(keyword in keywords for keyword in self.absent)
+
+
+# Compliance issues in report order. Shared with the bulk scorer in models.portfolio,
+# so both report the same issues for the same keywords.
+COMPLIANCE_INDICATORS = [
+    # Indian Contract Act compliance
+    ({
+        "law": "Indian Contract Act, 1872",
+        "issue": "Consideration not clearly specified",
+        "severity": "HIGH"
+    }, Indicator((), ('consideration', 'payment', 'price'))),
+    # Jurisdiction compliance
+    ({
+        "law": "Code of Civil Procedure, 1908",
+        "issue": "Jurisdiction not specified for Indian courts",
+        "severity": "HIGH"
+    }, Indicator((), tuple(COMPLIANCE_COURT_TERMS))),
+    # Companies Act compliance for corporate agreements
+    ({
+        "law": "Companies Act, 2013",
+        "issue": "Corporate authorization not specified",
+        "severity": "MEDIUM"
+    }, Indicator(tuple(CORPORATE_TERMS), ('board resolution', 'authorized signatory'))),
+]
+
+# (risk factor, points, indicator) in report order
+RISK_INDICATORS = [
+    # High risk indicators
+    ("Unlimited liability clause - high risk", 3, Indicator(('unlimited liability',), ())),
+    ("No dispute resolution mechanism - high risk", 3, Indicator((), tuple(DISPUTE_MECHANISM_TERMS))),
+    ("Foreign governing law without Indian jurisdiction - high risk", 3, Indicator(('foreign law',), ('india',))),
+    # Medium risk indicators
+    ("Vague timeframes - medium risk", 2, Indicator(('as soon as possible', 'reasonable time'), ())),
+    ("Penalty clauses without liquidated damages - medium risk", 2, Indicator(('penalty',), ('liquidated damages',))),
+    # Low risk indicators
+    ("No confidentiality provisions - low risk", 1, Indicator((), ('confidential', 'proprietary'))),
+]
+
+# Minimum risk score for each level, highest first; lower scores are LOW
+RISK_LEVELS = [(6, "HIGH"), (3, "MEDIUM")]
+
+
+class RuleScan(NamedTuple):
+    category_scores: Dict[str, int]
+    keywords: FrozenSet[str]
+
+
+class LegalRuleEngine:
+    """Rules compiled once at startup and applied with one scan per text.
+
+    A single combined regex finds each position where a scoring term starts;
+    the search restarts one character later so overlapping terms from
+    different categories are all counted. At a hit only the patterns that can
+    start with that character are tried, which gives the same scores as
+    running every category pattern with re.findall. Keyword checks for
+    boosts, compliance and risk are plain substring tests on the same lowered
+    text, which CPython runs faster than any regex alternation.
+    """
+
+    def __init__(self):
+        self.categories = list(INDIAN_CLAUSE_CATEGORIES) + ['other']
+
+        self._patterns = []
+        patterns_by_first_char = {}
+        for category, term_groups in CATEGORY_TERMS.items():
+            for terms in term_groups:
+                index = len(self._patterns)
+                self._patterns.append((category, re.compile(r'\b(?:' + '|'.join(terms) + r')\b')))
+                for term in terms:
+                    patterns_by_first_char.setdefault(term[0], []).append(index)
+        self._patterns_by_first_char = {
+            char: sorted(set(indices)) for char, indices in patterns_by_first_char.items()
+        }
+
+        self._term_scanner = re.compile(r'\b(?:' + '|'.join(
+            term for term_groups in CATEGORY_TERMS.values() for terms in term_groups for term in terms
+        ) + ')')
+        self._keywords = sorted(set(KEYWORDS))
+
+    def scan(self, text_lower: str, score_terms: bool = True) -> RuleScan:
+        """Scan already-lowered text for category scores and keywords.
+
+        Whole-document checks only need keywords, so score_terms=False skips
+        the category patterns entirely.
+        """
+        scores = dict.fromkeys(self.categories, 0)
+        keywords = frozenset(keyword for keyword in self._keywords if keyword in text_lower)
+        if not score_terms:
+            return RuleScan(scores, keywords)
+
+        # Matches of one pattern do not overlap, mirroring re.findall
+        pattern_ends = [0] * len(self._patterns)
+        position = 0
+        while True:
+            match = self._term_scanner.search(text_lower, position)
+            if match is None:
+                break
+            position = match.start()
+
+            for index in self._patterns_by_first_char[text_lower[position]]:
+                if position < pattern_ends[index]:
+                    continue
+                category, pattern = self._patterns[index]
+                hit = pattern.match(text_lower, position)
+                if hit:
+                    scores[category] += 2
+                    pattern_ends[index] = hit.end()
+
+            position += 1
+
+        return RuleScan(scores, keywords)
+
+    def classify(self, scan: RuleScan) -> Dict[str, Any]:
+        return self.classify_with_margin(scan)[0]
+
+    def classify_with_margin(self, scan: RuleScan) -> Tuple[Dict[str, Any], float]:
+        """Classification plus the confidence gap between the top two categories.
+
+        A tie for first place has a margin of 0.
+        """
+        category_scores = self.boosted_scores(scan)
+
+        best_category = 'other'
+        best_score = 0
+        runner_up_score = 0
+        for category, score in category_scores.items():
+            if score > best_score:
+                runner_up_score = best_score
+                best_score = score
+                best_category = category
+            elif score > runner_up_score:
+                runner_up_score = score
+
+        confidence = min(best_score / 10.0, 1.0) if best_score > 0 else 0.0
+
+        classification = {
+            "category": best_category,
+            "confidence": confidence,
+            "original_label": "rule_based"
+        }
+        return classification, (best_score - runner_up_score) / 10.0
+
+    def boosted_scores(self, scan: RuleScan) -> Dict[str, int]:
+        """Per-category scores after the Indian-specific boosts."""
+        category_scores = dict(scan.category_scores)
+        keywords = scan.keywords
+
+        # Boost scores for Indian legal specific terms
+        if 'indian contract act' in keywords:
+            category_scores['governing_law'] += 3
+
+        if any(city in keywords for city in INDIAN_CITIES):
+            category_scores['jurisdiction'] += 3
+
+        if 'stamp duty' in keywords or 'stamp act' in keywords:
+            category_scores['other'] += 2
+
+        return category_scores
+
+    def compliance(self, scan: RuleScan) -> Dict[str, Any]:
+        compliance_issues = [
+            dict(issue) for issue, indicator in COMPLIANCE_INDICATORS if indicator.fires(scan.keywords)
+        ]
+        return {
+            "compliance_issues": compliance_issues,
+            "overall_compliance": "COMPLIANT" if not compliance_issues else "NON-COMPLIANT"
+        }
+
+    def risk(self, scan: RuleScan) -> Dict[str, Any]:
+        risk_factors = []
+        risk_score = 0
+        for factor, points, indicator in RISK_INDICATORS:
+            if indicator.fires(scan.keywords):
+                risk_factors.append(factor)
+                risk_score += points
+
+        return {
+            "risk_level": risk_level(risk_score),
+            "risk_score": risk_score,
+            "risk_factors": risk_factors
+        }
+
+
+def risk_level(risk_score: int) -> str:
+    for threshold, level in RISK_LEVELS:
+        if risk_score >= threshold:
+            return level
+    return "LOW"
+
+
+_default_engine = None
+
+
+def get_rule_engine() -> LegalRuleEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = LegalRuleEngine()
+    return _default_engine
+
+
+def analyze_document_rules(text: str) -> Dict[str, Any]:
+    """Compliance and risk for a whole document from one scan of its lowered text."""
+    engine = get_rule_engine()
+    scan = engine.scan(text.lower(), score_terms=False)
+    return {
+        "compliance_analysis": engine.compliance(scan),
+        "risk_assessment": engine.risk(scan)
+    }
+
+
+def confident_rule_classifications(texts: List[str], min_confidence: float,
+                                   min_margin: float) -> List[Optional[Dict[str, Any]]]:
+    """Rule-based classification for each text, or None where the rules are unsure.
+
+    Unsure means a confidence below min_confidence or a gap to the runner-up
+    category below min_margin; those clauses are left for the model.
+    """
+    engine = get_rule_engine()
+    results = []
+    for text in texts:
+        classification, margin = engine.classify_with_margin(engine.scan(text.lower()))
+        confident = classification["confidence"] >= min_confidence and margin >= min_margin
+        results.append(classification if confident else None)
+    return results
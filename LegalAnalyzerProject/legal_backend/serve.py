@@ -0,0 +1,153 @@
+"""Production server: uvicorn workers forked from one preloaded process.
+
+Run from legal_backend (main.py's own entry point stays the single-process reloading dev server):
+
+    python -m serve                                  # SERVER_WORKERS workers on SERVER_HOST:SERVER_PORT
+    python -m serve --workers 4 --port 8080
+
+The app is imported and warmed up here once: compiled rules, the near-duplicate
+index loaded from SQLite, caches primed from SQLite and the sample run through
+every local stage. The workers are then forked from this process, so they
+share that memory copy-on-write instead of each importing and loading it
+again. SQLite connections are closed before forking and each worker opens its
+own. PDF and DOCX parsers are imported by the workers that first need them.
+
+A follow-up request by document_id can land on any worker, so more than one
+worker needs DOCUMENT_STORE_DB, where every worker writes its documents and
+reads the others'. Set ANALYSIS_CACHE_DB too, or each worker caches analyses
+only for itself.
+
+Each worker finishes warming up in the background (stage pool, inference
+clients, and with WARMUP_INFERENCE their connections); GET /ready on a worker
+answers 503 until it has, and again once its shutdown begins. A worker that
+dies is replaced, unless it died within MIN_WORKER_UPTIME of starting, which
+stops the server instead of forking in a loop. Needs a platform with fork().
+"""
+import argparse
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Dict, List
+
+import uvicorn
+
+from config import DOCUMENT_STORE_DB, SERVER_HOST, SERVER_PORT, SERVER_WORKERS
+
+logger = logging.getLogger("serve")
+
+MIN_WORKER_UPTIME = 5.0
+
+
+def _run_worker(config: uvicorn.Config, sock, worker_flags, slot: int):
+    """Body of a forked worker; never returns."""
+    import main
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    main.readiness.share(worker_flags, slot)
+    # The parent requeued interrupted documents once; a worker must not requeue its siblings'
+    main.job_workers.requeue_on_start = False
+    for database in main.databases():
+        database.reopen()
+
+    code = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception(f"Worker {os.getpid()} crashed")
+        code = 1
+    finally:
+        logging.shutdown()
+    os._exit(code)
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info") -> int:
+    start = time.perf_counter()
+    import main
+
+    main.warm_up()
+    main.job_store.open()
+    requeued = main.job_store.requeue_interrupted()
+    if requeued:
+        logger.info(f"Requeued {requeued} interrupted job documents")
+    for database in main.databases():
+        database.close()
+
+    config = uvicorn.Config(main.app, host=host, port=port, log_level=log_level)
+    config.load()
+    sock = config.bind_socket()
+    # One readiness flag per worker in shared memory, set once that worker is warmed up
+    worker_flags = multiprocessing.RawArray("b", workers)
+    # Objects allocated so far are never collected, so the GC doesn't touch (and copy) their pages
+    gc.freeze()
+    logger.info(f"Preloaded in {(time.perf_counter() - start) * 1000:.0f}ms; forking {workers} workers")
+
+    children: Dict[int, int] = {}
+    started_at: Dict[int, float] = {}
+    stopping = False
+
+    def spawn(slot: int):
+        worker_flags[slot] = 0
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(config, sock, worker_flags, slot)
+        children[pid] = slot
+        started_at[pid] = time.monotonic()
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for slot in range(workers):
+        spawn(slot)
+
+    exit_code = 0
+    while children:
+        pid, status = os.wait()
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        worker_flags[slot] = 0
+        if stopping:
+            continue
+
+        code = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started_at.pop(pid) < MIN_WORKER_UPTIME:
+            logger.error(f"Worker {pid} exited with {code} right after starting; shutting down")
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+        else:
+            logger.warning(f"Worker {pid} exited with {code}; starting a replacement")
+            spawn(slot)
+
+    sock.close()
+    return exit_code
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not DOCUMENT_STORE_DB:
+        parser.error("more than one worker needs DOCUMENT_STORE_DB, or a document_id only resolves on its own worker")
+
+    logging.basicConfig(level=args.log_level.upper())
+    return serve(args.host, args.port, max(1, args.workers), args.log_level)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# main reads its settings on import: classify with the in-process rule-based backend so
+# tests never call the inference API, and keep the job queue out of the working directory
+_JOBS_DIR = tempfile.TemporaryDirectory(prefix="legal-backend-tests-")
+os.environ.setdefault("CLASSIFICATION_BACKEND", "local")
+os.environ.setdefault("JOBS_DB", os.path.join(_JOBS_DIR.name, "jobs.db"))
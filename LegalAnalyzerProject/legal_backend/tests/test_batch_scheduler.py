@@ -0,0 +1,112 @@
+import asyncio
+
+from models.classification_backend import LocalClassificationBackend
+from utils.batch_scheduler import MicroBatchScheduler
+
+_CLAUSES = [
+    "The Receiving Party shall keep all proprietary information strictly confidential.",
+    "Either party may terminate this Agreement by giving thirty days written notice.",
+    "The Company shall pay the fee within 30 days of receiving an invoice.",
+    "Any dispute shall be referred to arbitration under the Arbitration Act.",
+]
+
+
+def _recording(backend, batches):
+    async def process_batch(texts):
+        batches.append(list(texts))
+        return await backend.classify(texts)
+    return process_batch
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_submissions_share_batches():
+    backend = LocalClassificationBackend(latency=0.01)
+    batches = []
+
+    async def scenario():
+        scheduler = MicroBatchScheduler(_recording(backend, batches), max_batch_size=4, max_wait=1.0,
+                                        max_concurrency=1)
+        texts = [f"{_CLAUSES[i % 4]} Item {i}." for i in range(8)]
+        # Full batches go out without waiting for max_wait
+        results = await asyncio.wait_for(asyncio.gather(*(scheduler.submit(text) for text in texts)), 0.5)
+        return texts, results
+
+    texts, results = _run(scenario())
+    assert [len(batch) for batch in batches] == [4, 4]
+    assert backend.calls == 2
+    assert results == [backend._predict(text) for text in texts]
+
+
+def test_partial_batch_is_sent_after_max_wait():
+    backend = LocalClassificationBackend()
+    batches = []
+
+    async def scenario():
+        scheduler = MicroBatchScheduler(_recording(backend, batches), max_batch_size=16, max_wait=0.02)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await scheduler.submit(_CLAUSES[0])
+        return result, loop.time() - start
+
+    result, elapsed = _run(scenario())
+    assert batches == [[_CLAUSES[0]]]
+    assert result == backend._predict(_CLAUSES[0])
+    assert elapsed >= 0.015
+
+
+def test_batches_alternate_between_flows():
+    backend = LocalClassificationBackend(latency=0.02)
+    batches = []
+
+    async def scenario():
+        scheduler = MicroBatchScheduler(_recording(backend, batches), max_batch_size=4, max_wait=0,
+                                        max_concurrency=1)
+        # Holds the only batch slot while both flows queue up behind it
+        first = asyncio.ensure_future(scheduler.submit("blocker", flow="c"))
+        await asyncio.sleep(0)
+        big = [scheduler.submit(f"a{i}", flow="a") for i in range(8)]
+        small = [scheduler.submit(f"b{i}", flow="b") for i in range(2)]
+        await asyncio.gather(first, *big, *small)
+
+    _run(scenario())
+    assert batches == [
+        ["blocker"],
+        ["a0", "b0", "a1", "b1"],
+        ["a2", "a3", "a4", "a5"],
+        ["a6", "a7"],
+    ]
+
+
+def test_batch_character_budget():
+    backend = LocalClassificationBackend()
+    batches = []
+
+    async def scenario():
+        scheduler = MicroBatchScheduler(_recording(backend, batches), max_batch_size=16, max_wait=0.01,
+                                        max_batch_chars=100)
+        await asyncio.gather(*(scheduler.submit(text) for text in _CLAUSES))
+
+    _run(scenario())
+    assert [text for batch in batches for text in batch] == _CLAUSES
+    assert all(sum(map(len, batch)) <= 100 or len(batch) == 1 for batch in batches)
+    assert len(batches) > 1
+
+
+def test_failed_batch_fails_every_caller():
+    async def process_batch(texts):
+        raise RuntimeError("backend down")
+
+    async def scenario():
+        scheduler = MicroBatchScheduler(process_batch, max_batch_size=2, max_wait=0.01)
+        results = await asyncio.gather(
+            scheduler.submit(_CLAUSES[0]), scheduler.submit(_CLAUSES[1]), return_exceptions=True
+        )
+        return scheduler, results
+
+    scheduler, results = _run(scenario())
+    assert [str(result) for result in results] == ["backend down", "backend down"]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert scheduler.stats()["failed_batches"] == 1
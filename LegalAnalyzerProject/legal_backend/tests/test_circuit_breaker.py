@@ -0,0 +1,91 @@
+import time
+
+from utils.circuit_breaker import CircuitBreaker
+
+
+def _breaker(**kwargs):
+    settings = dict(failure_rate=0.5, window=10, min_calls=4, open_seconds=0.05, max_timeout=10, min_timeout=0.1)
+    settings.update(kwargs)
+    return CircuitBreaker("test", **settings)
+
+
+def _trip(breaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_closed_open_half_open_closed():
+    breaker = _breaker()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    # Under min_calls the failure rate is not judged yet
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["rejected"] == 1
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only the single probe goes through
+    assert not breaker.allow_request()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_failed_probe_reopens():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_outcomes_while_open_are_ignored():
+    breaker = _breaker(open_seconds=0.1)
+    _trip(breaker)
+    time.sleep(0.06)
+    # Calls started before it opened keep failing; they must not extend the open period
+    for _ in range(10):
+        breaker.record_failure()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["times_opened"] == 1
+
+    time.sleep(0.05)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_timeouts_are_kept_per_kind():
+    breaker = _breaker(multiplier=3, percentile=95)
+    assert breaker.timeout("1") == 10
+    for _ in range(5):
+        breaker.record_success(0.2, "1")
+        breaker.record_success(2.0, "32")
+
+    assert abs(breaker.timeout("1") - 0.6) < 1e-9
+    assert abs(breaker.timeout("32") - 6.0) < 1e-9
+    # Kinds without enough samples stay at max_timeout
+    assert breaker.timeout("8") == 10
+    assert breaker.stats()["timeout_seconds"] == {"1": 0.6, "32": 6.0}
+
+
+def test_timeout_is_clamped():
+    breaker = _breaker(max_timeout=1, min_timeout=0.5)
+    for _ in range(5):
+        breaker.record_success(0.01)
+        breaker.record_success(5.0, "slow")
+    assert breaker.timeout() == 0.5
+    assert breaker.timeout("slow") == 1
@@ -0,0 +1,144 @@
+import io
+import tracemalloc
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+from utils.document_processor import IndianDocumentProcessor, _iter_docx_lines
+
+_W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def _paragraph(text):
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def _table(index, rows, cells=3):
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(
+            f"<w:tc>{_paragraph(f'Table {index} row {row} cell {cell}')}</w:tc>" for cell in range(cells)
+        ) + "</w:tr>"
+        for row in range(rows)
+    ) + "</w:tbl>"
+
+
+def _document_xml(body):
+    return f'<?xml version="1.0"?><w:document {_W}><w:body>{body}</w:body></w:document>'.encode()
+
+
+def _docx(document_xml):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", document_xml)
+    return buffer.getvalue()
+
+
+def _peak_bytes(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_docx_paragraphs_and_table_rows_in_document_order():
+    body = (
+        _paragraph("1. The Company shall pay the fee.")
+        + _table(0, 2, cells=2)
+        + _paragraph("2. Either party may terminate.")
+    )
+    text = IndianDocumentProcessor.extract_text_from_docx(_docx(_document_xml(body)))
+    assert text.splitlines() == [
+        "1. The Company shall pay the fee.",
+        "Table 0 row 0 cell 0 | Table 0 row 0 cell 1",
+        "Table 0 row 1 cell 0 | Table 0 row 1 cell 1",
+        "2. Either party may terminate.",
+    ]
+
+
+def test_docx_nested_table_rows_join_their_cell():
+    inner = _table(1, 2, cells=1)
+    body = f"<w:tbl><w:tr><w:tc>{_paragraph('Outer')}{inner}</w:tc><w:tc>{_paragraph('Next')}</w:tc></w:tr></w:tbl>"
+    assert list(_iter_docx_lines(_docx(_document_xml(body)))) == [
+        "Outer Table 1 row 0 cell 0 Table 1 row 1 cell 0 | Next"
+    ]
+
+
+def test_docx_table_heavy_document_streams_in_flat_memory():
+    # Back-to-back tables with no paragraph between them, and one very long table
+    for body in (
+        _paragraph("Schedules") + "".join(_table(index, 50) for index in range(200)),
+        _paragraph("Schedule") + _table(0, 5000),
+    ):
+        document_xml = _document_xml(body)
+        content = _docx(document_xml)
+        lines = []
+        streaming_peak = _peak_bytes(lambda: lines.extend(_iter_docx_lines(content)))
+        tree_peak = _peak_bytes(lambda: ElementTree.fromstring(document_xml))
+
+        assert len(lines) == 1 + document_xml.count(b"<w:tr>")
+        # Holding every table would cost about as much as the whole tree; the extracted lines
+        # themselves are a small fraction of it
+        assert streaming_peak < tree_peak / 5
+
+
+def _clause_texts(text):
+    text = IndianDocumentProcessor.preprocess_text(text)
+    clauses = IndianDocumentProcessor.segment_into_clauses(text)
+    for clause in clauses:
+        assert text[clause["start"]:clause["end"]] == clause["text"]
+    return [clause["text"] for clause in clauses]
+
+
+def test_numbered_headings_start_clauses():
+    assert _clause_texts(
+        "1. Payment. The Company shall pay the Consultant a fee of Rs. 50,000 every month. "
+        "2. Termination. Either party may terminate with thirty days notice."
+    ) == [
+        "1. Payment. The Company shall pay the Consultant a fee of Rs. 50,000 every month.",
+        "2. Termination. Either party may terminate with thirty days notice."
+    ]
+    assert _clause_texts(
+        "2.3 Confidential Information means all information disclosed by one party to the other. "
+        "2.4 Exclusions do not include public information known to all."
+    ) == [
+        "2.3 Confidential Information means all information disclosed by one party to the other.",
+        "2.4 Exclusions do not include public information known to all."
+    ]
+
+
+def test_lettered_items_split_at_colons_and_semicolons():
+    assert _clause_texts(
+        "The obligations are as follows: (a) the Vendor shall deliver the goods on time; "
+        "(b) the Buyer shall pay the price within 30 days of delivery."
+    ) == [
+        "The obligations are as follows: (a) the Vendor shall deliver the goods on time;",
+        "(b) the Buyer shall pay the price within 30 days of delivery."
+    ]
+    assert _clause_texts(
+        "The parties agree to the following terms: 12. The Lessee shall pay rent on the first day of each month."
+    ) == [
+        "The parties agree to the following terms:",
+        "12. The Lessee shall pay rent on the first day of each month."
+    ]
+
+
+def test_numbers_inside_sentences_are_not_boundaries():
+    assert _clause_texts(
+        "The Vendor shall supply goods as per clause 4.2 of this Agreement; the schedule is attached hereto."
+    ) == ["The Vendor shall supply goods as per clause 4.2 of this Agreement; the schedule is attached hereto."]
+
+
+def test_short_clauses_merge_or_drop():
+    assert _clause_texts("Recitals. 1. The Lessee shall pay rent on the first day of each month.") == [
+        "Recitals. 1. The Lessee shall pay rent on the first day of each month."
+    ]
+    assert _clause_texts("Short one. 1. Tiny.") == []
+
+
+def test_sentences_pack_up_to_max_clause_chars():
+    text = " ".join(f"Sentence number {i} says the parties agree to many things." for i in range(40))
+    spans = IndianDocumentProcessor.segment_into_spans(text)
+    assert len(spans) > 1
+    assert all(span.end - span.start <= 500 for span in spans)
+    assert " ".join(text[span.start:span.end] for span in spans) == text
@@ -0,0 +1,82 @@
+from utils.near_duplicates import NearDuplicateIndex, shingles
+
+_DEPOSIT = (
+    "12. The Lessee shall pay a security deposit of Rs. 50,000 to the Lessor within 30 days of signing "
+    "this lease, refundable on expiry."
+)
+# The same template with different numbering, amount and period
+_DEPOSIT_VARIANT = (
+    "4.2 The Lessee shall pay a security deposit of Rs. 75,000 to the Lessor within 45 days of signing "
+    "this lease, refundable on expiry."
+)
+# Shares its opening with _DEPOSIT but says something else
+_DEPOSIT_RETENTION = (
+    "The Lessee shall pay a security deposit to the Lessor within days of signing this lease and the "
+    "Lessor may retain it for any damage caused."
+)
+_CONFIDENTIALITY = (
+    "The Consultant shall keep all proprietary information of the Company strictly confidential during "
+    "and after the term of engagement."
+)
+_PAYMENT = {"category": "payment_terms", "confidence": 0.9, "original_label": "LABEL_6"}
+
+
+def test_shingles_mask_numbers_and_numbering():
+    assert shingles("12. Pay Rs. 500 now") == ["pay rs #", "rs # now"]
+    assert shingles(_DEPOSIT) == shingles(_DEPOSIT_VARIANT)
+
+
+def test_template_variants_hit():
+    index = NearDuplicateIndex("model", max_entries=100)
+    assert index.lookup(_DEPOSIT) is None
+    index.add(_DEPOSIT, _PAYMENT)
+
+    assert index.lookup(_DEPOSIT_VARIANT) == {**_PAYMENT, "similarity": 1.0}
+    assert index.stats()["hits"] == 1
+
+
+def test_different_clauses_miss():
+    index = NearDuplicateIndex("model", max_entries=100)
+    index.add(_DEPOSIT, _PAYMENT)
+
+    assert index.lookup(_CONFIDENTIALITY) is None
+    assert index.lookup(_DEPOSIT_RETENTION) is None
+    # Too short to match safely, so not looked up at all
+    assert index.lookup("The Lessee shall pay.") is None
+    assert index.stats()["lookups"] == 2
+    assert index.stats()["hits"] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    index = NearDuplicateIndex("model", max_entries=2)
+    index.add(_DEPOSIT, _PAYMENT)
+    index.add(_CONFIDENTIALITY, {"category": "confidentiality"})
+    assert index.lookup(_DEPOSIT_VARIANT) is not None
+    index.add(_DEPOSIT_RETENTION, {"category": "payment_terms"})
+
+    assert index.stats()["entries"] == 2
+    assert index.lookup(_CONFIDENTIALITY) is None
+    assert index.lookup(_DEPOSIT) is not None
+
+
+def test_disabled_index_never_matches():
+    index = NearDuplicateIndex("model", max_entries=0)
+    assert index.add(_DEPOSIT, _PAYMENT) is None
+    assert index.lookup(_DEPOSIT) is None
+
+
+def test_persisted_entries_load_in_their_scope(tmp_path):
+    db_path = str(tmp_path / "near_duplicates.db")
+    index = NearDuplicateIndex("model", max_entries=100, db_path=db_path)
+    row = index.add(_DEPOSIT, _PAYMENT, persist=False)
+    index.persist([row])
+    index.close()
+
+    reloaded = NearDuplicateIndex("model", max_entries=100, db_path=db_path)
+    assert reloaded.persistent
+    assert reloaded.lookup(_DEPOSIT_VARIANT) == {**_PAYMENT, "similarity": 1.0}
+    reloaded.close()
+
+    other_model = NearDuplicateIndex("other-model", max_entries=100, db_path=db_path)
+    assert other_model.lookup(_DEPOSIT_VARIANT) is None
+    other_model.close()
@@ -0,0 +1,78 @@
+from benchmarks.corpus import ContractGenerator
+from models.portfolio import score_files, score_portfolio
+from models.rule_engine import analyze_document_rules, get_rule_engine
+
+_EDGE_CASES = [
+    "",
+    "The Contractor shall deliver as soon as possible. A penalty applies under foreign law with unlimited liability.",
+    "Acme Pvt Ltd, a company, appoints its authorized signatory. Disputes go to the courts of Delhi.",
+    "The price is payable on delivery. Any dispute shall be settled by mediation in Chennai. All proprietary "
+    "data is confidential.",
+]
+
+
+def _texts():
+    generator = ContractGenerator(seed=3)
+    return _EDGE_CASES + [generator.text(index, 20) for index in range(25)]
+
+
+def test_documents_match_analyze_document_rules():
+    texts = _texts()
+    scores = score_portfolio(texts)
+    assert len(scores) == len(texts)
+    for i, text in enumerate(texts):
+        assert scores.document(i) == analyze_document_rules(text), i
+
+
+def test_keyword_only_scan_gives_the_same_documents():
+    texts = _texts()
+    full = score_portfolio(texts)
+    keywords_only = score_portfolio(texts, score_terms=False)
+    assert keywords_only.category_scores is None
+    assert "categories" not in keywords_only.summary()
+    for i in range(len(texts)):
+        assert keywords_only.document(i) == full.document(i)
+
+
+def test_summary_counts_documents():
+    texts = _texts()
+    scores = score_portfolio(texts)
+    summary = scores.summary()
+    documents = [analyze_document_rules(text) for text in texts]
+
+    assert summary["documents"] == len(texts)
+    assert sum(summary["risk_levels"].values()) == len(texts)
+    for level in ("HIGH", "MEDIUM", "LOW"):
+        assert summary["risk_levels"][level] == sum(
+            document["risk_assessment"]["risk_level"] == level for document in documents
+        )
+    assert summary["compliance"]["COMPLIANT"] == sum(
+        document["compliance_analysis"]["overall_compliance"] == "COMPLIANT" for document in documents
+    )
+
+    engine = get_rule_engine()
+    for category, entry in summary["categories"].items():
+        assert entry["documents"] == sum(engine.scan(text.lower()).category_scores[category] > 0 for text in texts)
+
+
+def test_empty_portfolio():
+    summary = score_portfolio([]).summary()
+    assert summary["documents"] == 0
+    assert summary["compliance"] == {"COMPLIANT": 0, "NON-COMPLIANT": 0}
+
+
+def test_score_files_skips_unreadable_files(tmp_path):
+    texts = _texts()[1:4]
+    paths = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"contract_{i}.txt"
+        path.write_text(text)
+        paths.append(str(path))
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    scores, errors = score_files(paths + [str(broken)])
+    assert scores.names == paths
+    assert [error["file"] for error in errors] == [str(broken)]
+    for i, text in enumerate(texts):
+        assert scores.document(i) == analyze_document_rules(text)
@@ -0,0 +1,66 @@
+from config import QA_CONTEXT_CHARS
+from models.classification_backend import LocalClassificationBackend
+from models.indian_legal_analyzer import IndianLegalAnalyzer
+from utils.retrieval import ClauseIndex, tokenize
+
+_CLAUSES = [
+    "The Company shall pay the Consultant a fee of Rs. 50,000 within 30 days of receiving an invoice.",
+    "Either party may terminate this Agreement by giving thirty days written notice to the other party.",
+    "The Consultant shall keep all proprietary information of the Company strictly confidential.",
+    "This Agreement shall be governed by the laws of India and the courts of Mumbai shall have jurisdiction.",
+    "Any dispute shall be referred to arbitration under the Arbitration and Conciliation Act, 1996.",
+    "On termination the Consultant shall return all documents and the Company shall pay fees accrued to the "
+    "date of termination.",
+]
+
+
+def test_tokenize_drops_stop_words_and_stems():
+    assert tokenize("What happens when the Agreement is terminated?") == ["happen", "termin"]
+    assert tokenize("termination") == tokenize("terminated") == tokenize("terminates")
+
+
+def test_search_ranks_matching_clauses():
+    index = ClauseIndex(_CLAUSES)
+    results = index.search("How can the agreement be terminated?")
+    assert [i for i, _ in results] == [5, 1]
+    assert results[0][1] > results[1][1] > 0
+
+    assert index.search("arbitration dispute")[0][0] == 4
+    assert [i for i, _ in index.search("fee", k=1)] == [0]
+    assert index.search("what is this agreement") == []
+
+
+def test_select_context_keeps_document_order_within_budget():
+    index = ClauseIndex(_CLAUSES)
+    context, selected = index.select_context("terminate notice fees", max_chars=1000)
+    assert selected == sorted(selected)
+    assert {1, 5} <= set(selected)
+    assert context == " ".join(_CLAUSES[i] for i in selected)
+
+    # The best clause fits; the runner-up would take it over the budget
+    context, selected = index.select_context("terminate notice fees", max_chars=len(_CLAUSES[5]) + 10)
+    assert selected == [5]
+    assert context == _CLAUSES[5]
+
+
+def test_select_context_truncates_an_oversized_best_clause():
+    index = ClauseIndex(_CLAUSES)
+    context, selected = index.select_context("arbitration", max_chars=20)
+    assert selected == [4]
+    assert context == _CLAUSES[4][:20]
+
+    assert index.select_context("nothing relevant here", max_chars=1000) == ("", [])
+
+
+def test_question_context_falls_back_to_document_start():
+    analyzer = IndianLegalAnalyzer(LocalClassificationBackend())
+    text = " ".join(_CLAUSES)
+
+    context, clause_ids = analyzer._question_context("Which courts have jurisdiction?", text, _CLAUSES)
+    assert clause_ids == ["clause_4"]
+    assert context == _CLAUSES[3]
+    assert analyzer.clause_index_for(text) is analyzer.clause_index_for(text, _CLAUSES)
+
+    context, clause_ids = analyzer._question_context("What is this?", text, _CLAUSES)
+    assert clause_ids == []
+    assert context == text[:QA_CONTEXT_CHARS]
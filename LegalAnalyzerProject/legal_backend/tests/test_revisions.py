@@ -0,0 +1,86 @@
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.corpus import ContractGenerator
+
+_TEXT = ContractGenerator(seed=5).text(0, 12)
+_ADDED_CLAUSE = " 99. The parties shall cooperate in good faith at all times during the term."
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def previous(client):
+    response = client.post("/analyze-text", json={"text": _TEXT})
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+def _first_clause(analysis):
+    return next(clause for clauses in analysis["clauses"].values() for clause in clauses)
+
+
+def _revise(client, **request):
+    return client.post("/analyze-text/revision", json={"text": _TEXT + _ADDED_CLAUSE, **request})
+
+
+def test_revision_reuses_previous_analysis(client, previous):
+    response = _revise(client, previous_analysis=previous)
+    assert response.status_code == 200
+    changes = response.json()["data"]["changes"]
+    assert changes["unchanged"] > 0
+
+    response = _revise(client, document_id=previous["document_id"])
+    assert response.status_code == 200
+    assert response.json()["data"]["changes"] == changes
+
+
+@pytest.mark.parametrize("field, value", [
+    ("start", None),
+    ("start", "0"),
+    ("start", True),
+    ("id", 1),
+    ("text", None),
+    ("category", "not_a_category"),
+    ("confidence", "high"),
+    ("confidence", True),
+    ("original_label", None),
+])
+def test_invalid_previous_clause_is_rejected(client, previous, field, value):
+    analysis = copy.deepcopy(previous)
+    clause = _first_clause(analysis)
+    if value is None:
+        del clause[field]
+    else:
+        clause[field] = value
+
+    response = _revise(client, previous_analysis=analysis)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "previous_analysis clauses are missing or have invalid fields"
+
+
+@pytest.mark.parametrize("previous_analysis, detail", [
+    ({"clauses": [{"text": "x"}]}, "previous_analysis must be the data of an earlier analysis"),
+    ({"summary": "no clauses"}, "previous_analysis must be the data of an earlier analysis"),
+    ({"clauses": {"termination": {"text": "x"}}}, "previous_analysis clauses must be lists by category"),
+    ({"clauses": {"termination": ["x"]}}, "previous_analysis clauses are missing or have invalid fields"),
+])
+def test_malformed_previous_analysis_is_rejected(client, previous_analysis, detail):
+    response = _revise(client, previous_analysis=previous_analysis)
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+def test_revision_needs_a_previous_version(client):
+    response = _revise(client)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "document_id or previous_analysis is required"
+
+    assert _revise(client, document_id="0" * 32).status_code == 404
@@ -0,0 +1,221 @@
+import re
+
+from benchmarks.corpus import ContractGenerator
+from config import INDIAN_CLAUSE_CATEGORIES
+from models.rule_engine import analyze_document_rules, get_rule_engine
+
+# The regex classifier the engine replaced, kept verbatim as the reference except that
+# 'other' starts at zero (the original raised KeyError on stamp duty clauses)
+_BASELINE_PATTERNS = {
+    'confidentiality': [
+        r'\b(?:confidential|non.?disclosure|proprietary information|trade secret)\b',
+        r'\b(?:not disclose|maintain secrecy)\b'
+    ],
+    'termination': [
+        r'\b(?:terminat|expir|cancell|end of|valid until)\b',
+        r'\b(?:duration|term of|early termination)\b'
+    ],
+    'liability': [
+        r'\b(?:liability|liable|responsible|obligation)\b',
+        r'\b(?:damages|compensation|accountable)\b'
+    ],
+    'indemnification': [
+        r'\b(?:indemnif|hold harmless|make good)\b',
+        r'\b(?:reimburse|compensate for loss)\b'
+    ],
+    'intellectual_property': [
+        r'\b(?:intellectual property|copyright|patent|trademark)\b',
+        r'\b(?:ip rights|proprietary rights)\b'
+    ],
+    'governing_law': [
+        r'\b(?:governing law|applicable law)\b',
+        r'\b(?:laws of india|indian law)\b'
+    ],
+    'payment_terms': [
+        r'\b(?:payment|fee|compensation|consideration|price)\b',
+        r'\b(?:within \d+ days|upon delivery|invoice)\b'
+    ],
+    'warranties': [
+        r'\b(?:warrant|guarantee|representation)\b',
+        r'\b(?:assurance|certify)\b'
+    ],
+    'limitation_of_liability': [
+        r'\b(?:limitation of liability|cap on damages)\b',
+        r'\b(?:maximum liability|limited to)\b'
+    ],
+    'dispute_resolution': [
+        r'\b(?:dispute|arbitration|mediation|conciliation)\b',
+        r'\b(?:arbitral tribunal|arbitrator)\b'
+    ],
+    'jurisdiction': [
+        r'\b(?:jurisdiction|courts of|competent court)\b',
+        r'\b(?:territorial jurisdiction)\b'
+    ],
+    'force_majeure': [
+        r'\b(?:force majeure|act of god|unforeseen circumstances)\b',
+        r'\b(?:natural calamity)\b'
+    ],
+    'non_compete': [
+        r'\b(?:non.?compete|non.?competition)\b',
+        r'\b(?:restrictive covenant)\b'
+    ],
+    'severability': [
+        r'\b(?:severability|severable)\b',
+        r'\b(?:if any provision)\b'
+    ],
+    'assignment': [
+        r'\b(?:assignment|assign)\b',
+        r'\b(?:transfer rights)\b'
+    ]
+}
+
+_CLAUSES = [
+    "The Receiving Party shall keep all proprietary information and trade secrets strictly confidential.",
+    "Either party may terminate this Agreement on expiry of the term of two years or by early termination.",
+    "The Vendor shall indemnify and hold harmless the Company and reimburse any loss.",
+    "The Company shall pay the fee within 30 days of receiving an invoice, upon delivery of the goods.",
+    "This Agreement is governed by the laws of India and the Indian Contract Act, 1872.",
+    "The courts of Mumbai shall have exclusive territorial jurisdiction over any dispute.",
+    "Any dispute shall be referred to arbitration before a sole arbitrator under the Conciliation rules.",
+    "The Supplier's maximum liability is limited to the fees paid; this limitation of liability is a cap on damages.",
+    "Neither party is liable for delay caused by force majeure, an act of god or a natural calamity.",
+    "The Employee agrees to a non-compete and non competition restrictive covenant for one year.",
+    "If any provision of this Agreement is held invalid, it shall be severable from the remainder.",
+    "Neither party may assign or transfer rights under this Agreement without prior written consent.",
+    "The stamp duty payable on this Agreement under the Indian Stamp Act shall be borne by the Lessee.",
+    "Stamp duty shall be borne equally by both parties.",
+    "The Licensor warrants and gives its guarantee and assurance that the software does not infringe any patent, "
+    "copyright or trademark, and will certify compliance with ip rights.",
+    "Nothing here.",
+    "",
+]
+
+
+def _baseline_classification(text):
+    text_lower = text.lower()
+    category_scores = {category: 0 for category in INDIAN_CLAUSE_CATEGORIES}
+    category_scores['other'] = 0
+    for category, pattern_list in _BASELINE_PATTERNS.items():
+        for pattern in pattern_list:
+            category_scores[category] += len(re.findall(pattern, text_lower, re.IGNORECASE)) * 2
+
+    if 'indian contract act' in text_lower:
+        category_scores['governing_law'] += 3
+    if any(court in text_lower for court in ['delhi', 'mumbai', 'chennai', 'kolkata', 'bangalore', 'hyderabad']):
+        category_scores['jurisdiction'] += 3
+    if 'stamp duty' in text_lower or 'stamp act' in text_lower:
+        category_scores['other'] += 2
+
+    best_category = 'other'
+    best_score = 0
+    for category, score in category_scores.items():
+        if score > best_score:
+            best_score = score
+            best_category = category
+
+    return {
+        "category": best_category,
+        "confidence": min(best_score / 10.0, 1.0) if best_score > 0 else 0.0,
+        "original_label": "rule_based"
+    }
+
+
+def _baseline_compliance(text):
+    compliance_issues = []
+    text_lower = text.lower()
+    if 'consideration' not in text_lower and 'payment' not in text_lower and 'price' not in text_lower:
+        compliance_issues.append({
+            "law": "Indian Contract Act, 1872",
+            "issue": "Consideration not clearly specified",
+            "severity": "HIGH"
+        })
+    if not any(court in text_lower for court in ['delhi', 'mumbai', 'chennai', 'kolkata', 'bangalore', 'india', 'indian']):
+        compliance_issues.append({
+            "law": "Code of Civil Procedure, 1908",
+            "issue": "Jurisdiction not specified for Indian courts",
+            "severity": "HIGH"
+        })
+    if any(term in text_lower for term in ['company', 'private limited', 'ltd', 'pvt']):
+        if 'board resolution' not in text_lower and 'authorized signatory' not in text_lower:
+            compliance_issues.append({
+                "law": "Companies Act, 2013",
+                "issue": "Corporate authorization not specified",
+                "severity": "MEDIUM"
+            })
+    return {
+        "compliance_issues": compliance_issues,
+        "overall_compliance": "COMPLIANT" if not compliance_issues else "NON-COMPLIANT"
+    }
+
+
+def _baseline_risk(text):
+    risk_factors = []
+    risk_score = 0
+    text_lower = text.lower()
+    if 'unlimited liability' in text_lower:
+        risk_factors.append("Unlimited liability clause - high risk")
+        risk_score += 3
+    if not any(resolution in text_lower for resolution in ['arbitration', 'mediation', 'court', 'jurisdiction']):
+        risk_factors.append("No dispute resolution mechanism - high risk")
+        risk_score += 3
+    if 'foreign law' in text_lower and 'india' not in text_lower:
+        risk_factors.append("Foreign governing law without Indian jurisdiction - high risk")
+        risk_score += 3
+    if 'as soon as possible' in text_lower or 'reasonable time' in text_lower:
+        risk_factors.append("Vague timeframes - medium risk")
+        risk_score += 2
+    if 'penalty' in text_lower and 'liquidated damages' not in text_lower:
+        risk_factors.append("Penalty clauses without liquidated damages - medium risk")
+        risk_score += 2
+    if 'confidential' not in text_lower and 'proprietary' not in text_lower:
+        risk_factors.append("No confidentiality provisions - low risk")
+        risk_score += 1
+
+    if risk_score >= 6:
+        risk_level = "HIGH"
+    elif risk_score >= 3:
+        risk_level = "MEDIUM"
+    else:
+        risk_level = "LOW"
+    return {"risk_level": risk_level, "risk_score": risk_score, "risk_factors": risk_factors}
+
+
+def _generated_clauses(documents=20, clause_count=30):
+    generator = ContractGenerator(seed=7)
+    return [
+        clause["text"]
+        for index in range(documents)
+        for clause in generator.clauses(index, clause_count)
+    ]
+
+
+def _classify(text):
+    engine = get_rule_engine()
+    return engine.classify(engine.scan(text.lower()))
+
+
+def test_classification_matches_baseline():
+    for text in _CLAUSES + _generated_clauses():
+        assert _classify(text) == _baseline_classification(text), text
+
+
+def test_stamp_duty_clause_is_other():
+    assert _classify("Stamp duty shall be borne equally by both parties.") == {
+        "category": "other",
+        "confidence": 0.2,
+        "original_label": "rule_based"
+    }
+
+
+def test_document_rules_match_baseline():
+    generator = ContractGenerator(seed=11)
+    texts = _CLAUSES + [" ".join(_CLAUSES)] + [generator.text(index, 25) for index in range(10)]
+    texts += [
+        "The Contractor shall deliver as soon as possible. A penalty applies under foreign law.",
+        "Pvt Ltd company with unlimited liability; the authorized signatory will sign within a reasonable time.",
+    ]
+    for text in texts:
+        assert analyze_document_rules(text) == {
+            "compliance_analysis": _baseline_compliance(text),
+            "risk_assessment": _baseline_risk(text)
+        }, text
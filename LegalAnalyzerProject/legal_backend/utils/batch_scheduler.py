@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Tuple
+
+from utils.outbound import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchScheduler:
+    """Coalesces single-item submissions from concurrent callers into batches.
+
+    Items wait in one FIFO queue per ``flow`` (a request, job or API key). A
+    batch is sent as soon as ``max_batch_size`` items or ``max_batch_chars``
+    characters are queued, or ``max_wait`` seconds after the oldest queued
+    item arrived, but only while fewer than ``max_concurrency`` batches are
+    running and ``rate_limiter``, if given, grants a token. Batches are filled
+    round-robin, one item per flow per turn, so a flow with hundreds of
+    clauses queued does not hold back one with a handful.
+    ``process_batch(items)`` must return one result per item in order; if it
+    raises, every caller in that batch gets the exception.
+
+    Instances bind to the event loop they are first used on.
+    """
+
+    def __init__(self, process_batch: Callable[[List[str]], Awaitable[List[Any]]],
+                 max_batch_size: int = 16, max_wait: float = 0.01,
+                 max_batch_chars: int = 0, max_concurrency: int = 8,
+                 rate_limiter: TokenBucket = None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        # flow -> (item, future, arrival time); flows rotate to the back after each turn
+        self._flows: "OrderedDict[Hashable, Deque[Tuple[str, asyncio.Future, float]]]" = OrderedDict()
+        self._queued = 0
+        self._queued_chars = 0
+        self._running = 0
+        self._timer = None
+        self._timer_due = None
+        self._throttled_until = 0.0
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.rate_limited = 0
+
+    @property
+    def queued(self) -> int:
+        """Items waiting for a batch, including callers that already gave up."""
+        return self._queued
+
+    async def submit(self, item: str, flow: Hashable = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._flows.get(flow)
+        if queue is None:
+            queue = self._flows[flow] = deque()
+        queue.append((item, future, loop.time()))
+        self._queued += 1
+        self._queued_chars += len(item)
+
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        """Send batches while there is a full one, or one that has waited long enough, and capacity."""
+        loop = asyncio.get_running_loop()
+        while self._queued and self._running < self.max_concurrency:
+            now = loop.time()
+            full = self._queued >= self.max_batch_size or (
+                self.max_batch_chars and self._queued_chars >= self.max_batch_chars
+            )
+            if not full:
+                wait = self._oldest_arrival() + self.max_wait - now
+                if wait > 0:
+                    self._schedule(wait)
+                    return
+            if self.rate_limiter is not None:
+                if now < self._throttled_until:
+                    self._schedule(self._throttled_until - now)
+                    return
+                wait = self.rate_limiter.reserve()
+                if wait > 0:
+                    self.rate_limited += 1
+                    self._throttled_until = now + wait
+                    self._schedule(wait)
+                    return
+
+            batch = self._take_batch()
+            # Empty when every caller taken had given up (e.g. a disconnected stream)
+            if batch:
+                self._running += 1
+                task = asyncio.ensure_future(self._run(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    def _oldest_arrival(self) -> float:
+        return min(queue[0][2] for queue in self._flows.values())
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._on_timer)
+        self._timer_due = due
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _take_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = []
+        chars = 0
+        while self._flows and len(batch) < self.max_batch_size:
+            flow, queue = next(iter(self._flows.items()))
+            item, future, arrived = queue[0]
+            if future.done():
+                pass
+            elif batch and self.max_batch_chars and chars + len(item) > self.max_batch_chars:
+                # Keep batches under the character budget; the item leads the next batch
+                break
+            else:
+                batch.append((item, future))
+                chars += len(item)
+
+            queue.popleft()
+            self._queued -= 1
+            self._queued_chars -= len(item)
+            if queue:
+                self._flows.move_to_end(flow)
+            else:
+                del self._flows[flow]
+        return batch
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await self.process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"Batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                self.failed_batches += 1
+                logger.warning(f"Batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Only reached with unresolved futures when the scheduler is closed mid-batch
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+            self._running -= 1
+            if self._queued:
+                self._dispatch()
+
+    async def aclose(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for queue in self._flows.values():
+            for _, future, _ in queue:
+                future.cancel()
+        self._flows.clear()
+        self._queued = 0
+        self._queued_chars = 0
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failed_batches": self.failed_batches,
+            "average_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queued,
+            "flows": len(self._flows),
+            "running": self._running,
+            "rate_limited": self.rate_limited
+        }
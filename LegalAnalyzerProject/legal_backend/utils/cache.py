@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(*parts: str) -> str:
+    """Stable SHA-256 key over one or more string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with optional TTL (0 disables expiry)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, stored_at: float = None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, stored_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TieredCache:
+    """LRU memory tier in front of an optional SQLite tier that survives restarts.
+
+    Values must be JSON-serializable when the SQLite tier is enabled.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float = 0,
+                 db_path: str = None, db_max_entries: int = 0):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.db_max_entries = db_max_entries
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.db_path = db_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._open()
+
+    def _open(self):
+        if not self.db_path:
+            return
+        name = self.name
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {name}_accessed ON {name} (accessed_at)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open cache database {self.db_path}: {e}")
+            self._db = None
+
+    def reopen(self):
+        """Connect again after close(), e.g. in a worker forked from the process that opened it."""
+        if self._db is None:
+            self._open()
+
+    def prime(self, limit: int = None) -> int:
+        """Load the most recently used unexpired entries from SQLite into memory."""
+        if self._db is None:
+            return 0
+        limit = limit or self.memory.max_entries
+        now = time.time()
+        try:
+            with self._db_lock:
+                rows = self._db.execute(
+                    f"SELECT key, value, stored_at FROM {self.name} WHERE stored_at >= ? "
+                    "ORDER BY accessed_at DESC LIMIT ?",
+                    (now - self.ttl_seconds if self.ttl_seconds else 0, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache prime failed for {self.name}: {e}")
+            return 0
+        # Oldest first, so the most recently used end up at the LRU's fresh end
+        for key, value, stored_at in reversed(rows):
+            self.memory.set(key, json.loads(value), stored_at=stored_at)
+        return len(rows)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self._db is not None:
+            value = self._db_get(key)
+            if value is not None:
+                self.disk_hits += 1
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def set(self, key: str, value: Any, persist: bool = True):
+        """Store a value; persist=False leaves the SQLite write to a later persist() call."""
+        self.memory.set(key, value)
+        if persist and self._db is not None:
+            self._db_set([(key, value)])
+
+    def persist(self, items: List[Tuple[str, Any]]):
+        """Write (key, value) pairs already set in memory to SQLite in one transaction."""
+        if items and self._db is not None:
+            self._db_set(items)
+
+    def _db_get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    f"SELECT value, stored_at FROM {self.name} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    self._db.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None
+                self._db.execute(f"UPDATE {self.name} SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed for {self.name}: {e}")
+            return None
+
+        value = json.loads(row[0])
+        self.memory.set(key, value, stored_at=row[1])
+        return value
+
+    def _db_set(self, items: List[Tuple[str, Any]]):
+        now = time.time()
+        try:
+            with self._db_lock:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO {self.name} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    [(key, json.dumps(value), now, now) for key, value in items]
+                )
+                self._writes_since_prune += len(items)
+                # Pruning every write would cost a COUNT(*) per insert
+                if self._writes_since_prune >= 100:
+                    self._prune()
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed for {self.name}: {e}")
+
+    def _prune(self):
+        self._writes_since_prune = 0
+        if self.ttl_seconds:
+            self._db.execute(f"DELETE FROM {self.name} WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+        if self.db_max_entries:
+            self._db.execute(
+                f"DELETE FROM {self.name} WHERE key IN ("
+                f"SELECT key FROM {self.name} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.db_max_entries,)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "persistent": self.persistent
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
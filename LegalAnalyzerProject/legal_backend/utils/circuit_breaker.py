@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with a latency-derived timeout.
+
+    Closed: calls go through and their outcomes fill a sliding window. Once
+    the window holds ``min_calls`` outcomes and the failure rate reaches
+    ``failure_rate``, the breaker opens and refuses calls for ``open_seconds``.
+    It then turns half-open and lets a single probe through; the probe's
+    outcome closes or re-opens it. Outcomes reported while open come from
+    calls started before it opened and are ignored, so a backlog of them
+    failing cannot keep extending the open period.
+
+    ``timeout(kind)`` is the ``percentile`` of recent successful latencies of
+    calls of that kind times ``multiplier``, clamped to [min_timeout,
+    max_timeout]. Until enough successes of the kind are seen it is
+    max_timeout. Kinds keep calls of very different cost, such as single
+    clauses and large batches, from setting each other's timeouts.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30, max_timeout: float = 30, min_timeout: float = 2,
+                 percentile: float = 95, multiplier: float = 3, latency_window: int = 100):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.latency_window = latency_window
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._latencies: Dict[str, deque] = {}
+        self._timeouts: Dict[str, float] = {}
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                # A probe that never reported back (e.g. cancelled) must not wedge the breaker
+                if self._probe_in_flight and time.monotonic() - self._probe_started < self.max_timeout:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+            return True
+
+    def timeout(self, kind: str = "") -> float:
+        return self._timeouts.get(kind, self.max_timeout)
+
+    def record_success(self, latency: float, kind: str = ""):
+        with self._lock:
+            latencies = self._latencies.get(kind)
+            if latencies is None:
+                latencies = self._latencies[kind] = deque(maxlen=self.latency_window)
+            latencies.append(latency)
+            if len(latencies) >= self.min_calls:
+                ordered = sorted(latencies)
+                index = min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)
+                self._timeouts[kind] = min(max(ordered[index] * self.multiplier, self.min_timeout), self.max_timeout)
+
+            if self.state == self.OPEN:
+                return
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                return
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            outcomes = len(self._outcomes)
+            return {
+                "state": self.state,
+                "failure_rate": round(self._outcomes.count(False) / outcomes, 4) if outcomes else 0.0,
+                "timeout_seconds": {kind: round(timeout, 3) for kind, timeout in self._timeouts.items()},
+                "rejected": self.rejected,
+                "times_opened": self.times_opened
+            }
@@ -1,30 +1,292 @@
-import PyPDF2
-import docx
+import bisect
 import io
+import mmap
 import re
 import logging
-from typing import List, Dict, Any
+import os
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Dict, Any, Iterator, NamedTuple, Tuple, Union
+from config import PDF_EXTRACTION_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_PAGES_PER_TASK, PDF_MAX_PAGES
+from utils.executor import in_pool_worker, process_pool
 
 logger = logging.getLogger(__name__)
 
+# Group 1 is the whitespace between two pieces. ":" and ";" only end a piece
+# when a numbered heading follows, which segment_into_spans checks itself
+_CLAUSE_BOUNDARY = re.compile(r'[.!?:;](\s+)')
+_HEADING = re.compile(
+    r'(?:\d+(?:\.\d+)*\.\s|\d+(?:\.\d+)+\s+(?=[A-Z])|\((?:[a-z]|[ivx]{1,4}|\d{1,3})\)\s)'
+)
+_BARE_NUMBERING = re.compile(r'\d+(?:\.\d+)*\.')
+
+class ClauseSpan(NamedTuple):
+    """A clause as offsets into the preprocessed document text."""
+    id: str
+    start: int
+    end: int
+    word_count: int
+
+    def text_of(self, text: str) -> str:
+        return text[self.start:self.end]
+
+# Uploads arrive as bytes, or as a read-only mmap of the spool file when large
+FileContent = Union[bytes, mmap.mmap]
+
+class _MappedFile(io.RawIOBase):
+    """Read-only raw stream over an mmap with its own position, so readers never share one."""
+
+    def __init__(self, mapping: mmap.mmap):
+        self._mapping = mapping
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._mapping[self._position:self._position + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._mapping)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+def _as_stream(file_content: FileContent) -> io.BufferedIOBase:
+    """A seekable stream over the content without copying it up front.
+
+    BytesIO shares a bytes object's buffer until written to; an mmap is read
+    through a buffered reader a chunk at a time.
+    """
+    if isinstance(file_content, mmap.mmap):
+        return io.BufferedReader(_MappedFile(file_content))
+    return io.BytesIO(file_content)
+
+def _open_pdf(file_content: Union[FileContent, BinaryIO]) -> "PyPDF2.PdfReader":
+    # Imported on first use so processes that never see a PDF don't load it
+    import PyPDF2
+
+    stream = file_content if hasattr(file_content, "read") else _as_stream(file_content)
+    pdf_reader = PyPDF2.PdfReader(stream)
+    if pdf_reader.is_encrypted:
+        try:
+            pdf_reader.decrypt('')
+        except:
+            raise Exception("PDF is encrypted and cannot be read")
+    return pdf_reader
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Worker task: extract pages [start, stop) of the PDF at path as (1-based page number, text)."""
+    with open(path, "rb") as pdf_file:
+        pdf_reader = _open_pdf(pdf_file)
+        pages = []
+        for index in range(start, stop):
+            page_text = pdf_reader.pages[index].extract_text()
+            if page_text.strip():
+                pages.append((index + 1, page_text))
+    return pages
+
+def _spool_pdf(file_content: FileContent) -> str:
+    """Write the PDF to a temporary file once, so workers get its path rather than a pickled copy."""
+    with tempfile.NamedTemporaryFile(prefix="legal-pdf-", suffix=".pdf", delete=False) as spool:
+        spool.write(file_content)
+    return spool.name
+
+_page_pool = None
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = process_pool(PDF_EXTRACTION_WORKERS)
+    return _page_pool
+
+def shutdown_page_pool():
+    global _page_pool
+    if _page_pool is not None:
+        _page_pool.shutdown(wait=False, cancel_futures=True)
+        _page_pool = None
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY, _W_P, _W_T, _W_TBL, _W_TR, _W_TC = (_W + name for name in ("body", "p", "t", "tbl", "tr", "tc"))
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+_DOCX_BREAKS = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n"}
+_DOCX_OPENERS = frozenset((_W_BODY, _W_P, _W_TBL, _W_TR, _W_TC, _MC_FALLBACK))
+
+def _iter_docx_lines(file_content: FileContent) -> Iterator[str]:
+    """Yield the text of a DOCX body in document order, streaming word/document.xml.
+
+    Each non-empty paragraph is one line; each table row is one line with its
+    cells joined by " | ". Processed elements are cleared as parsing goes, and
+    table rows are dropped from their table once read, so memory stays flat
+    however long the document or any one table is.
+    """
+    with zipfile.ZipFile(_as_stream(file_content)) as archive:
+        with archive.open("word/document.xml") as document_xml:
+            paragraphs = []  # text parts of the open paragraphs, innermost last (text boxes nest)
+            rows = []        # cell texts of the open table rows
+            cells = []       # paragraph texts of the open table cells
+            tables = []      # the open table elements, innermost last
+            fallback_depth = 0
+            body = None
+
+            for event, element in ElementTree.iterparse(document_xml, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag not in _DOCX_OPENERS:
+                        continue
+                    if tag == _MC_FALLBACK:
+                        fallback_depth += 1
+                    elif fallback_depth:
+                        pass
+                    elif tag == _W_P:
+                        paragraphs.append([])
+                    elif tag == _W_TC:
+                        cells.append([])
+                    elif tag == _W_TR:
+                        rows.append([])
+                    elif tag == _W_TBL:
+                        tables.append(element)
+                    else:
+                        body = element
+                    continue
+
+                if tag == _W_T:
+                    if paragraphs and element.text and not fallback_depth:
+                        paragraphs[-1].append(element.text)
+                    continue
+                if tag == _MC_FALLBACK:
+                    # Fallback repeats the text of the preceding Choice for older readers
+                    fallback_depth -= 1
+                    continue
+                if fallback_depth:
+                    continue
+
+                if tag in _DOCX_BREAKS:
+                    if paragraphs:
+                        paragraphs[-1].append(_DOCX_BREAKS[tag])
+                elif tag == _W_P:
+                    text = "".join(paragraphs.pop())
+                    if text.strip():
+                        if cells:
+                            cells[-1].append(text)
+                        else:
+                            yield text
+                elif tag == _W_TC:
+                    if rows:
+                        rows[-1].append(" ".join(cells.pop()))
+                elif tag == _W_TR:
+                    row = [cell for cell in rows.pop() if cell]
+                    if row:
+                        line = " | ".join(row)
+                        if cells:
+                            cells[-1].append(line)
+                        else:
+                            yield line
+                    # The row's text is taken, so only the row being parsed stays in the table
+                    tables[-1].remove(element)
+                    continue
+                elif tag == _W_TBL:
+                    tables.pop()
+                else:
+                    continue
+
+                if body is not None and not paragraphs and not cells and (tag == _W_P or tag == _W_TBL):
+                    # A top-level block is done; drop it and everything parsed before it
+                    body.clear()
+
 class IndianDocumentProcessor:
     @staticmethod
-    def extract_text_from_pdf(file_content: bytes) -> str:
-        try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            if pdf_reader.is_encrypted:
-                try:
-                    pdf_reader.decrypt('')
-                except:
-                    raise Exception("PDF is encrypted and cannot be read")
-            
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
+    def iter_pdf_pages(file_content: FileContent, max_pages: int = None) -> Iterator[Tuple[int, str]]:
+        """Yield (page number, text) for non-empty pages, optionally stopping after max_pages.
+
+        Large documents are split into contiguous page ranges extracted in
+        parallel worker processes reading a temporary copy of the file; pages
+        are still yielded in order. Inside a process-pool worker, such as a
+        process stage executor, pages are extracted inline instead.
+        """
+        pdf_reader = _open_pdf(file_content)
+        page_count = len(pdf_reader.pages)
+        if max_pages:
+            page_count = min(page_count, max_pages)
+
+        if PDF_EXTRACTION_WORKERS <= 1 or page_count < PDF_PARALLEL_MIN_PAGES or in_pool_worker():
+            for index in range(page_count):
+                page_text = pdf_reader.pages[index].extract_text()
                 if page_text.strip():
-                    text += page_text + "\n"
+                    yield index + 1, page_text
+            return
+
+        # One range per worker keeps the number of PDF re-parses low
+        range_size = max(PDF_PAGES_PER_TASK, -(-page_count // PDF_EXTRACTION_WORKERS))
+        pool = _get_page_pool()
+        path = _spool_pdf(file_content)
+        try:
+            futures = [
+                pool.submit(_extract_page_range, path, start, min(start + range_size, page_count))
+                for start in range(0, page_count, range_size)
+            ]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+        finally:
+            # Workers still running a range keep their open handle; the file goes when they close it
+            os.unlink(path)
+
+    @staticmethod
+    def extract_pdf_pages(file_content: FileContent, max_pages: int = None) -> Tuple[str, List[int], List[int]]:
+        """Extract preprocessed PDF text with the offset where each page starts.
+
+        Returns (text, page_numbers, page_offsets); offsets index into the
+        returned text, which is already whitespace-normalized, so clause
+        offsets from segment_into_clauses map straight back to pages.
+        """
+        try:
+            pieces = []
+            page_numbers = []
+            page_offsets = []
+            offset = 0
+            for page_number, page_text in IndianDocumentProcessor.iter_pdf_pages(
+                file_content, max_pages or PDF_MAX_PAGES or None
+            ):
+                page_text = IndianDocumentProcessor.preprocess_text(page_text)
+                if not page_text:
+                    continue
+                if pieces:
+                    offset += 1
+                page_numbers.append(page_number)
+                page_offsets.append(offset)
+                pieces.append(page_text)
+                offset += len(page_text)
+
+            if not pieces:
+                raise Exception("No extractable text found in PDF")
+
+            return " ".join(pieces), page_numbers, page_offsets
+        except Exception as e:
+            logger.error(f"PDF extraction error: {str(e)}")
+            raise Exception(f"Error reading PDF: {str(e)}")
+
+    @staticmethod
+    def extract_text_from_pdf(file_content: FileContent, max_pages: int = None) -> str:
+        try:
+            text = "\n".join(
+                page_text for _, page_text in IndianDocumentProcessor.iter_pdf_pages(
+                    file_content, max_pages or PDF_MAX_PAGES or None
+                )
+            )
             
             if not text.strip():
                 raise Exception("No extractable text found in PDF")
@@ -35,7 +297,27 @@ class IndianDocumentProcessor:
             raise Exception(f"Error reading PDF: {str(e)}")
 
     @staticmethod
-    def extract_text_from_docx(file_content: bytes) -> str:
+    def page_for_offset(page_numbers: List[int], page_offsets: List[int], offset: int) -> int:
+        """Page number containing a character offset from extract_pdf_pages."""
+        return page_numbers[max(bisect.bisect_right(page_offsets, offset) - 1, 0)]
+
+    @staticmethod
+    def extract_text_from_docx(file_content: FileContent) -> str:
+        """Paragraph and table text of a DOCX, in document order."""
+        try:
+            return "\n".join(_iter_docx_lines(file_content)).strip()
+        except Exception as e:
+            logger.error(f"DOCX extraction error: {str(e)}")
+            raise Exception(f"Error reading DOCX: {str(e)}")
+
+    @staticmethod
+    def extract_text_from_docx_object_model(file_content: bytes) -> str:
+        """Paragraph text via the python-docx object model; tables are not included.
+
+        The previous extraction path, kept as a reference for benchmarks.
+        """
+        import docx
+
         try:
             doc_file = io.BytesIO(file_content)
             doc = docx.Document(doc_file)
@@ -51,43 +333,87 @@ class IndianDocumentProcessor:
             raise Exception(f"Error reading DOCX: {str(e)}")
 
     @staticmethod
-    def extract_text_from_txt(file_content: bytes) -> str:
+    def extract_text_from_txt(file_content: FileContent) -> str:
+        # str() decodes any buffer, so an mmap is decoded without an intermediate bytes copy
         try:
-            return file_content.decode('utf-8').strip()
+            return str(file_content, 'utf-8').strip()
         except UnicodeDecodeError:
             try:
-                return file_content.decode('latin-1').strip()
+                return str(file_content, 'latin-1').strip()
             except UnicodeDecodeError:
                 raise Exception("Unable to decode text file")
 
+    @staticmethod
+    def segment_into_spans(text: str, max_clause_chars: int = 500) -> List[ClauseSpan]:
+        """Segment preprocessed text into clause spans without copying any text.
+
+        Sentences are packed into clauses of at most max_clause_chars; a
+        numbered heading ("1.", "2.3", "(a)") starts a new clause once the
+        current one has more than five words. Word counts assume the single
+        spaces left by preprocess_text.
+        """
+        spans = []
+        clause_start = clause_end = None
+
+        def flush():
+            if clause_start is not None:
+                word_count = text.count(' ', clause_start, clause_end) + 1
+                if word_count > 5:
+                    spans.append(ClauseSpan(f"clause_{len(spans) + 1}", clause_start, clause_end, word_count))
+
+        text_length = len(text)
+        piece_start = 0
+        boundaries = [match.span(1) for match in _CLAUSE_BOUNDARY.finditer(text)]
+        boundaries.append((text_length, text_length))
+        for boundary_start, boundary_end in boundaries:
+            if (boundary_end < text_length and text[boundary_start - 1] in ':;'
+                    and not _HEADING.match(text, boundary_end)):
+                continue
+            if boundary_start <= piece_start:
+                piece_start = boundary_end
+                continue
+
+            # Only pieces opening with a digit or "(" can be numbered headings
+            first_char = text[piece_start]
+            numbered = first_char == '(' or first_char.isdigit()
+            # A bare "2." before a sentence boundary belongs to the next sentence
+            if (numbered and boundary_end < text_length
+                    and _BARE_NUMBERING.fullmatch(text, piece_start, boundary_start)):
+                continue
+
+            if clause_start is None:
+                clause_start = piece_start
+            elif (boundary_start - clause_start > max_clause_chars
+                  or (numbered and _HEADING.match(text, piece_start)
+                      and text.count(' ', clause_start, clause_end) >= 5)):
+                flush()
+                clause_start = piece_start
+            clause_end = boundary_start
+            piece_start = boundary_end
+
+        flush()
+        return spans
+
     @staticmethod
     def segment_into_clauses(text: str) -> List[Dict[str, Any]]:
-        clauses = []
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        current_clause = ""
-        for sentence in sentences:
-            if len(current_clause + sentence) < 500:
-                current_clause += " " + sentence if current_clause else sentence
-            else:
-                if current_clause:
-                    clauses.append({
-                        "text": current_clause.strip(),
-                        "word_count": len(current_clause.split()),
-                        "id": f"clause_{len(clauses) + 1}"
-                    })
-                current_clause = sentence
-        
-        if current_clause:
-            clauses.append({
-                "text": current_clause.strip(),
-                "word_count": len(current_clause.split()),
-                "id": f"clause_{len(clauses) + 1}"
-            })
-        
-        return [clause for clause in clauses if clause['word_count'] > 5]
+        return [
+            {
+                "text": text[span.start:span.end],
+                "word_count": span.word_count,
+                "id": span.id,
+                "start": span.start,
+                "end": span.end
+            }
+            for span in IndianDocumentProcessor.segment_into_spans(text)
+        ]
 
     @staticmethod
     def preprocess_text(text: str) -> str:
         text = re.sub(r'\s+', ' ', text)
-        return text.strip()
\ No newline at end of file
+        return text.strip()
+
+    @staticmethod
+    def prepare_clauses(text: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Preprocess and segment in one call so both run in the same worker."""
+        text = IndianDocumentProcessor.preprocess_text(text)
+        return text, IndianDocumentProcessor.segment_into_clauses(text)
\ No newline at end of file
@@ -0,0 +1,198 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentStore:
+    """Analyzed documents kept for follow-up requests, bounded by approximate memory use.
+
+    Each document is a JSON-serializable dict; its size is taken as the length
+    of its JSON encoding. Least recently used documents are evicted once the
+    total passes ``max_bytes``. With ``db_path`` set, SQLite is the store of
+    record: documents are written through on put, read back on a memory miss,
+    and a memory hit is only served while the row still exists. Sessions
+    then survive restarts and evictions, and processes sharing the database
+    (serve.py's workers) see each other's documents and deletions.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float = 0, db_path: str = None, db_max_entries: int = 0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.db_max_entries = db_max_entries
+        self._documents = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._db = None
+        self.spilled = 0
+        self.disk_hits = 0
+        self._writes_since_prune = 0
+        self._open()
+
+    def _open(self):
+        if not self.db_path:
+            return
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS documents_accessed ON documents (accessed_at)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open document store database {self.db_path}: {e}")
+            self._db = None
+
+    def reopen(self):
+        """Connect again after close(), e.g. in a worker forked from the process that opened it."""
+        if self._db is None:
+            self._open()
+
+    def put(self, document_id: str, document: Dict[str, Any]):
+        encoded = json.dumps(document)
+        stored_at = time.time()
+        with self._lock:
+            if self._db is not None:
+                self._db_put(document_id, encoded, stored_at)
+            self._remove_from_memory(document_id)
+            self._documents[document_id] = (document, len(encoded), stored_at)
+            self._bytes += len(encoded)
+            self._evict()
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None:
+                document, _, stored_at = entry
+                if self._expired(stored_at) or (self._db is not None and not self._db_touch(document_id)):
+                    # Expired, or deleted through another process sharing the database
+                    self._remove_from_memory(document_id)
+                    return None
+                self._documents.move_to_end(document_id)
+                return document
+
+        if self._db is None:
+            return None
+        row = self._db_get(document_id)
+        if row is None:
+            return None
+
+        encoded, stored_at = row
+        document = json.loads(encoded)
+        with self._lock:
+            self.disk_hits += 1
+            self._remove_from_memory(document_id)
+            self._documents[document_id] = (document, len(encoded), stored_at)
+            self._bytes += len(encoded)
+            self._evict()
+        return document
+
+    def __contains__(self, document_id: str) -> bool:
+        return self.get(document_id) is not None
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            removed = self._remove_from_memory(document_id)
+            if self._db is not None:
+                try:
+                    cursor = self._db.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+                    self._db.commit()
+                    removed = removed or cursor.rowcount > 0
+                except sqlite3.Error as e:
+                    logger.warning(f"Document delete failed: {e}")
+        return removed
+
+    def _expired(self, stored_at: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - stored_at > self.ttl_seconds
+
+    def _remove_from_memory(self, document_id: str) -> bool:
+        entry = self._documents.pop(document_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def _evict(self):
+        # Called with the lock held; the newest document stays even if it alone is over budget.
+        # With a database every document is already on disk, so eviction only frees memory
+        while self._bytes > self.max_bytes and len(self._documents) > 1:
+            _, (_, size, _) = self._documents.popitem(last=False)
+            self._bytes -= size
+            if self._db is not None:
+                self.spilled += 1
+
+    def _db_put(self, document_id: str, encoded: str, stored_at: float):
+        # Called with the lock held
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (id, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (document_id, encoded, stored_at, stored_at)
+            )
+            self._writes_since_prune += 1
+            # Pruning every write would cost a scan of the index per insert
+            if self.db_max_entries and self._writes_since_prune >= 100:
+                self._writes_since_prune = 0
+                self._db.execute(
+                    "DELETE FROM documents WHERE id IN ("
+                    "SELECT id FROM documents ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.db_max_entries,)
+                )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Document write failed: {e}")
+
+    def _db_touch(self, document_id: str) -> bool:
+        # Called with the lock held; whether the row still exists, refreshing its access time
+        try:
+            cursor = self._db.execute("UPDATE documents SET accessed_at = ? WHERE id = ?", (time.time(), document_id))
+            self._db.commit()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning(f"Document read failed: {e}")
+            # Serve what is in memory rather than fail the request
+            return True
+
+    def _db_get(self, document_id: str) -> Optional[tuple]:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM documents WHERE id = ?", (document_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if self._expired(row[1]):
+                    self._db.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+                    self._db.commit()
+                    return None
+                self._db.execute("UPDATE documents SET accessed_at = ? WHERE id = ?", (time.time(), document_id))
+                self._db.commit()
+                return row
+        except sqlite3.Error as e:
+            logger.warning(f"Document read failed: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents_in_memory": len(self._documents),
+            "memory_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "spilled": self.spilled,
+            "disk_hits": self.disk_hits,
+            "persistent": self._db is not None
+        }
+
+    def close(self):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from utils.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# True in worker processes of pools made by process_pool(), which run their work inline
+# rather than starting process pools of their own
+_in_pool_worker = False
+
+
+def _mark_pool_worker():
+    global _in_pool_worker
+    _in_pool_worker = True
+
+
+def in_pool_worker() -> bool:
+    return _in_pool_worker
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """A process pool whose workers see in_pool_worker() as True."""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_mark_pool_worker)
+
+
+class WorkerPoolBusyError(Exception):
+    """Raised when the worker pool queue is full."""
+
+
+class StageTimeoutError(Exception):
+    """Raised when a pipeline stage exceeds its timeout."""
+
+
+class StageExecutor:
+    """Runs CPU-bound pipeline stages off the event loop.
+
+    ``kind`` selects a thread or process pool. At most ``max_workers +
+    max_queue`` stages may be pending at once; further submissions are
+    rejected rather than queued without bound. A stage that times out keeps
+    its slot until the worker actually finishes, since running work cannot be
+    interrupted. Functions must be picklable module-level callables when
+    using a process pool.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = None, max_queue: int = 32,
+                 stage_timeouts: Dict[str, float] = None, default_timeout: float = 120):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.stage_timeouts = stage_timeouts or {}
+        self.default_timeout = default_timeout
+        self._pool: Executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = process_pool(self.max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        logger.info(f"Started {self.kind} pool with {self.max_workers} workers")
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, stage: str, fn: Callable, *args) -> Any:
+        if self._pool is None:
+            self.start()
+
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise WorkerPoolBusyError(f"Worker pool is busy, cannot run {stage}")
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        timeout = self.stage_timeouts.get(stage, self.default_timeout)
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(f"{stage} timed out after {timeout} seconds")
+        finally:
+            # Timed here, in the caller, so process-pool stages are recorded too; includes queue wait
+            record_stage(stage, time.perf_counter() - start)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "capacity": self.max_workers + self.max_queue
+        }
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """SQLite-backed queue of analysis jobs, one row per submitted document.
+
+    Document payloads stay in the database until they are processed, so a
+    restart resumes from whatever was still pending or running. Nothing is
+    connected or created on disk until open() is called.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _open(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                total INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_documents (
+                job_id TEXT NOT NULL,
+                doc_index INTEGER NOT NULL,
+                name TEXT,
+                content_type TEXT NOT NULL,
+                content BLOB,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, doc_index)
+            );
+            CREATE INDEX IF NOT EXISTS job_documents_status ON job_documents (status, updated_at);
+        """)
+        self._db.commit()
+
+    def open(self):
+        """Connect, creating the database if needed; does nothing when already connected."""
+        if self._db is None:
+            self._open()
+
+    def reopen(self):
+        """Connect again after close(), e.g. in a worker forked from the process that opened it."""
+        self.open()
+
+    def create_job(self, documents: List[Tuple[str, str, bytes]]) -> str:
+        """Queue (name, content_type, content) documents and return the job id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT INTO jobs (id, created_at, total) VALUES (?, ?, ?)", (job_id, now, len(documents)))
+            self._db.executemany(
+                "INSERT INTO job_documents (job_id, doc_index, name, content_type, content, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                [(job_id, i, name, content_type, content, now) for i, (name, content_type, content) in enumerate(documents)]
+            )
+            self._db.commit()
+        return job_id
+
+    def requeue_interrupted(self) -> int:
+        """Put documents left running by a previous process back in the queue."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE job_documents SET status = 'pending', updated_at = ? WHERE status = 'running'",
+                (time.time(),)
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest pending document as running and return it, or None.
+
+        Safe across processes sharing the database: a document another
+        process claimed first is skipped.
+        """
+        with self._lock:
+            while True:
+                row = self._db.execute(
+                    "SELECT job_id, doc_index, content_type, content, attempts FROM job_documents "
+                    "WHERE status = 'pending' ORDER BY updated_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+
+                job_id, doc_index, content_type, content, attempts = row
+                if attempts < self.max_attempts:
+                    claimed = self._db.execute(
+                        "UPDATE job_documents SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                        "WHERE job_id = ? AND doc_index = ? AND status = 'pending'",
+                        (time.time(), job_id, doc_index)
+                    ).rowcount
+                    self._db.commit()
+                    if claimed:
+                        break
+                    continue
+                # Documents that keep getting interrupted mid-run are given up on
+                self._db.execute(
+                    "UPDATE job_documents SET status = 'failed', content = NULL, error = ?, updated_at = ? "
+                    "WHERE job_id = ? AND doc_index = ? AND status = 'pending'",
+                    (f"Gave up after {attempts} attempts", time.time(), job_id, doc_index)
+                )
+                self._db.commit()
+
+        return {"job_id": job_id, "doc_index": doc_index, "content_type": content_type, "content": content}
+
+    def complete(self, job_id: str, doc_index: int, result: Dict[str, Any]):
+        self._finish(job_id, doc_index, "completed", json.dumps(result), None)
+
+    def fail(self, job_id: str, doc_index: int, error: str):
+        self._finish(job_id, doc_index, "failed", None, error)
+
+    def _finish(self, job_id: str, doc_index: int, status: str, result: Optional[str], error: Optional[str]):
+        # Payloads are dropped once processed to keep the database small
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_documents SET status = ?, result = ?, error = ?, content = NULL, updated_at = ? "
+                "WHERE job_id = ? AND doc_index = ?",
+                (status, result, error, time.time(), job_id, doc_index)
+            )
+            self._db.commit()
+
+    def get_job(self, job_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._db.execute("SELECT created_at, total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = self._db.execute(
+                "SELECT doc_index, name, content_type, status, attempts, result, error FROM job_documents "
+                "WHERE job_id = ? ORDER BY doc_index",
+                (job_id,)
+            ).fetchall()
+
+        documents = []
+        counts = {"pending": 0, "running": 0, "completed": 0, "failed": 0}
+        for doc_index, name, content_type, status, attempts, result, error in rows:
+            counts[status] += 1
+            document = {
+                "index": doc_index,
+                "name": name,
+                "content_type": content_type,
+                "status": status,
+                "attempts": attempts
+            }
+            if error:
+                document["error"] = error
+            if include_results and result:
+                document["result"] = json.loads(result)
+            documents.append(document)
+
+        finished = counts["completed"] + counts["failed"]
+        return {
+            "job_id": job_id,
+            "status": "completed" if finished == job[1] else ("running" if finished or counts["running"] else "pending"),
+            "created_at": job[0],
+            "progress": {"total": job[1], **counts},
+            "documents": documents
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class JobWorkerPool:
+    """Background asyncio workers that drain a JobStore.
+
+    ``handler(content, content_type)`` performs the analysis and returns a
+    JSON-serializable result; exceptions mark the document as failed.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[bytes, str], Awaitable[Dict[str, Any]]],
+                 workers: int = 2, poll_interval: float = 1.0):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup = None
+        # Off in pre-forked workers, where another process may be running those documents
+        self.requeue_on_start = True
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        if self.requeue_on_start:
+            requeued = self.store.requeue_interrupted()
+            if requeued:
+                logger.info(f"Requeued {requeued} interrupted job documents")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after new documents were queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            item = await asyncio.to_thread(self.store.claim_next)
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = await self.handler(item["content"], item["content_type"])
+                await asyncio.to_thread(self.store.complete, item["job_id"], item["doc_index"], result)
+            except asyncio.CancelledError:
+                # Left as running; requeued on the next start
+                raise
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                logger.warning(f"Job {item['job_id']} document {item['doc_index']} failed: {detail}")
+                await asyncio.to_thread(self.store.fail, item["job_id"], item["doc_index"], str(detail))
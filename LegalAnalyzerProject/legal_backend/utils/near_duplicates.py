@@ -0,0 +1,296 @@
+import hashlib
+import json
+import logging
+import operator
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from utils.cache import LRUCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_DIGIT = re.compile(r'[0-9]')
+# Clause numbering such as "12.", "4.2", "(a)" or "(iv)" at the start of a clause
+_NUMBERING = re.compile(r'^\s*(?:\(?[0-9]+(?:\.[0-9]+)*[.)]?|\([a-z]{1,4}\)|[a-z][.)])\s+')
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Word shingles of a clause with numbering dropped and every number masked.
+
+    Clauses from the same template that differ only in dates, amounts, notice
+    periods or numbering therefore share all but a few shingles.
+    """
+    tokens = [
+        '#' if _DIGIT.search(token) else token
+        for token in _TOKEN.findall(_NUMBERING.sub('', text.lower()))
+    ]
+    if len(tokens) < size:
+        return [' '.join(tokens)] if tokens else []
+    return [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of classified clauses, bucketed by LSH bands.
+
+    lookup() returns the stored value of the most similar clause whose
+    estimated Jaccard similarity over shingles reaches ``threshold``, so
+    templated boilerplate is classified once per corpus rather than once per
+    exact wording. At most ``max_entries`` signatures are held in memory,
+    least recently used first out (0 disables the index). With ``db_path``
+    entries are also written to SQLite and the most recently used are loaded
+    back at startup; ``scope`` keeps entries from other models or signature
+    settings apart. Values must be JSON-serializable.
+    """
+
+    def __init__(self, scope: str, max_entries: int, threshold: float = 0.8,
+                 num_perm: int = 32, bands: int = 8, shingle_size: int = 3, min_shingles: int = 8,
+                 db_path: str = None, db_max_entries: int = 0, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.db_max_entries = db_max_entries
+        self.scope = f"{scope}:{num_perm}:{shingle_size}:{seed}"
+        self._salt = seed.to_bytes(4, 'little')
+        # Signatures of clauses looked up and missed, so add() does not hash them a second time
+        self._missed = LRUCache(4096)
+        self._entries = OrderedDict()
+        # One dict per band from band hash to the key, or list of keys, sharing it
+        self._buckets: List[Dict[int, Union[str, List[str]]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.db_path = db_path if max_entries > 0 else None
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._touched = set()
+        self._writes_since_prune = 0
+        self._open(load=True)
+
+    def _open(self, load: bool = False):
+        if not self.db_path:
+            return
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicate_clauses ("
+                "scope TEXT NOT NULL, key TEXT NOT NULL, signature BLOB NOT NULL, value TEXT NOT NULL, "
+                "accessed_at REAL NOT NULL, PRIMARY KEY (scope, key))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS near_duplicate_clauses_accessed "
+                "ON near_duplicate_clauses (scope, accessed_at)"
+            )
+            self._db.commit()
+            if load:
+                self._load()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open near-duplicate database {self.db_path}: {e}")
+            self._db = None
+
+    def reopen(self):
+        """Connect again after close(), keeping the in-memory index, e.g. in a forked worker."""
+        if self._db is None:
+            self._open()
+
+    def signature(self, text: str) -> Optional[array]:
+        """MinHash signature of a clause, or None when it is too short to match safely."""
+        clause_shingles = set(shingles(text, self.shingle_size))
+        if len(clause_shingles) < self.min_shingles:
+            return None
+        # One extendable-output digest per shingle gives all num_perm 32-bit hash functions at once
+        digest_size = self.num_perm * 4
+        rows = [
+            array('I', hashlib.shake_128(self._salt + shingle.encode('utf-8')).digest(digest_size))
+            for shingle in clause_shingles
+        ]
+        return array('I', map(min, zip(*rows)))
+
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """The best match's value plus its "similarity", or None below the threshold."""
+        if self.max_entries <= 0:
+            return None
+        signature = self.signature(text)
+        if signature is None:
+            return None
+
+        self.lookups += 1
+        match = self._best_match(signature)
+        if match is None:
+            self._missed.set(text, signature)
+            return None
+        value, score = match
+        self.hits += 1
+        return {**value, "similarity": round(score, 4)}
+
+    def _best_match(self, signature: array) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            candidates = set()
+            for bucket, band_hash in zip(self._buckets, self._band_hashes(signature)):
+                members = bucket.get(band_hash)
+                if isinstance(members, str):
+                    candidates.add(members)
+                elif members:
+                    candidates.update(members)
+
+            best_key, best_score = None, 0.0
+            for key in candidates:
+                other = self._entries[key][0]
+                score = sum(map(operator.eq, signature, other)) / self.num_perm
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is None or best_score < self.threshold:
+                return None
+
+            self._entries.move_to_end(best_key)
+            if self._db is not None:
+                self._touched.add(best_key)
+            return self._entries[best_key][1], best_score
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def add(self, text: str, value: Dict[str, Any], persist: bool = True) -> Optional[Tuple[str, array, Dict[str, Any]]]:
+        """Index a classified clause and return its (key, signature, value) row, or None if it is too short.
+
+        persist=False leaves the SQLite write to a later persist() call with the row.
+        """
+        if self.max_entries <= 0:
+            return None
+        signature = self._missed.pop(text) or self.signature(text)
+        if signature is None:
+            return None
+        row = (content_hash(' '.join(shingles(text, 1))), signature, value)
+        self._insert(*row)
+        if persist:
+            self.persist([row])
+        return row
+
+    def persist(self, rows: List[Tuple[str, array, Dict[str, Any]]]):
+        """Write rows returned by add() to SQLite in one transaction."""
+        if not rows or self._db is None:
+            return
+        now = time.time()
+        try:
+            with self._db_lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO near_duplicate_clauses (scope, key, signature, value, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(self.scope, key, signature.tobytes(), json.dumps(value), now) for key, signature, value in rows]
+                )
+                self._writes_since_prune += len(rows)
+                # Touched entries and pruning are batched rather than paid per clause
+                if self._writes_since_prune >= 100:
+                    self._flush_touched()
+                    self._prune()
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Near-duplicate index write failed: {e}")
+
+    def _band_hashes(self, signature: array) -> List[int]:
+        # Hash collisions between bands only add candidates, which are scored anyway
+        data = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [hash(data[start:start + width]) for start in range(0, len(data), width)]
+
+    def _insert(self, key: str, signature: array, value: Dict[str, Any]):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, value)
+            # Most buckets hold a single clause, so a list is only made on the second
+            for bucket, band_hash in zip(self._buckets, self._band_hashes(signature)):
+                members = bucket.get(band_hash)
+                if members is None:
+                    bucket[band_hash] = key
+                elif isinstance(members, str):
+                    bucket[band_hash] = [members, key]
+                else:
+                    members.append(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        signature, _ = self._entries.pop(key)
+        for bucket, band_hash in zip(self._buckets, self._band_hashes(signature)):
+            members = bucket.get(band_hash)
+            if members == key:
+                del bucket[band_hash]
+            elif isinstance(members, list) and key in members:
+                members.remove(key)
+                if len(members) == 1:
+                    bucket[band_hash] = members[0]
+
+    def _load(self):
+        # Oldest first, so the most recently used rows end up at the LRU's fresh end
+        rows = self._db.execute(
+            "SELECT key, signature, value FROM near_duplicate_clauses WHERE scope = ? "
+            "ORDER BY accessed_at DESC LIMIT ?",
+            (self.scope, self.max_entries)
+        ).fetchall()
+        for key, signature, value in reversed(rows):
+            self._insert(key, array('I', signature), json.loads(value))
+        if rows:
+            logger.info(f"Loaded {len(rows)} near-duplicate clause signatures")
+
+    def _flush_touched(self):
+        with self._lock:
+            touched, self._touched = self._touched, set()
+        if touched:
+            now = time.time()
+            self._db.executemany(
+                "UPDATE near_duplicate_clauses SET accessed_at = ? WHERE scope = ? AND key = ?",
+                [(now, self.scope, key) for key in touched]
+            )
+
+    def _prune(self):
+        self._writes_since_prune = 0
+        if self.db_max_entries:
+            self._db.execute(
+                "DELETE FROM near_duplicate_clauses WHERE scope = ? AND key IN ("
+                "SELECT key FROM near_duplicate_clauses WHERE scope = ? "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.scope, self.scope, self.db_max_entries)
+            )
+
+    def clear(self):
+        """Empty the in-memory index; persisted entries are kept."""
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "persistent": self.persistent
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                try:
+                    self._flush_touched()
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Near-duplicate index flush failed: {e}")
+                self._db.close()
+            self._db = None
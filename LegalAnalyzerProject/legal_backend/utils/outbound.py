@@ -0,0 +1,161 @@
+import itertools
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Fair-queuing flow of the current request or job, read when clauses are queued for the API
+_current_flow: ContextVar[Optional[str]] = ContextVar("outbound_flow", default=None)
+_flow_ids = itertools.count(1)
+
+
+class RateLimitedError(Exception):
+    """Raised instead of calling the inference API when no rate token is available."""
+
+
+def current_flow() -> Optional[str]:
+    return _current_flow.get()
+
+
+def start_flow(key: str = None) -> str:
+    """Make later outbound calls in this context one flow: ``key``'s, or a new one of their own."""
+    flow = f"key:{key}" if key else f"request:{next(_flow_ids)}"
+    _current_flow.set(flow)
+    return flow
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, at most ``burst`` saved up.
+
+    A rate of 0 disables limiting. Shared by the async batch scheduler and
+    interactive calls such as /ask. Batch callers leave ``reserved`` tokens in
+    the bucket, so a queue of analyses that drains every refill cannot starve
+    interactive calls; the steady batch rate is unchanged, only its burst is
+    smaller.
+    """
+
+    def __init__(self, rate: float, burst: int, reserved: int = 0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.reserved = max(0, min(reserved, self.burst - 1))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, interactive: bool = False) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        if not self.rate:
+            self.granted += 1
+            return 0.0
+        needed = 1 if interactive else 1 + self.reserved
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= needed:
+                self._tokens -= 1
+                self.granted += 1
+                return 0.0
+            self.throttled += 1
+            return (needed - self._tokens) / self.rate
+
+    def try_acquire(self, interactive: bool = False) -> bool:
+        return self.reserve(interactive) == 0.0
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for an interactive token; blocks, so never call it on the event loop."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.reserve(interactive=True)
+            if wait == 0.0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.rate:
+                self._refill(time.monotonic())
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "reserved": self.reserved,
+                "tokens": round(self._tokens, 2),
+                "granted": self.granted,
+                "throttled": self.throttled
+            }
+
+
+class OutboundAdmission:
+    """Turns away new inference-bound requests while the outbound queue is too long.
+
+    ``scheduler`` is the MicroBatchScheduler the requests would queue on;
+    while it holds ``max_queued`` clauses or more, POSTs to ``paths`` get 429
+    with a Retry-After estimated from the queue and the rate limit. Every
+    request starts its own fair-queuing flow, shared by requests carrying the
+    same ``key_header`` value.
+    """
+
+    def __init__(self, scheduler, rate_limiter: TokenBucket, max_queued: int, paths: Iterable[str],
+                 key_header: str = None):
+        self.scheduler = scheduler
+        self.rate_limiter = rate_limiter
+        self.max_queued = max_queued
+        self.paths = frozenset(paths)
+        self.key_header = key_header.lower() if key_header else None
+        self.rejected = 0
+
+    def overloaded(self) -> bool:
+        return bool(self.max_queued) and self.scheduler.queued >= self.max_queued
+
+    def retry_after(self) -> int:
+        if not self.rate_limiter.rate:
+            return 1
+        batches = self.scheduler.queued / self.scheduler.max_batch_size
+        return max(1, math.ceil(batches / self.rate_limiter.rate))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.scheduler.queued,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+            "rate_limit": self.rate_limiter.stats()
+        }
+
+
+class OutboundAdmissionMiddleware:
+    """ASGI middleware applying an OutboundAdmission and starting each request's flow."""
+
+    def __init__(self, app: ASGIApp, admission: OutboundAdmission):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        admission = self.admission
+        if scope["method"] == "POST" and scope["path"] in admission.paths and admission.overloaded():
+            admission.rejected += 1
+            response = JSONResponse(
+                {"detail": "Server is busy with other analyses, retry shortly"},
+                status_code=429,
+                headers={"Retry-After": str(admission.retry_after())}
+            )
+            await response(scope, receive, send)
+            return
+
+        key = Headers(scope=scope).get(admission.key_header) if admission.key_header else None
+        start_flow(key)
+        await self.app(scope, receive, send)
@@ -0,0 +1,53 @@
+import time
+from typing import Any, Dict, Optional
+
+
+class Readiness:
+    """Whether the server should be sent traffic, as reported by GET /ready.
+
+    A process is ready once its warmup has finished and until shutdown
+    begins. Each worker pre-forked by serve.py answers for itself, so one
+    worker restarting does not take the others out of rotation; they also
+    share one flag per worker (a multiprocessing array created before
+    forking) so stats can show how many workers are ready.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.warmup_seconds: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.stopping = False
+        self._worker_flags = None
+        self._slot = None
+
+    def share(self, worker_flags, slot: int):
+        """Report through ``worker_flags[slot]``; called in a newly forked worker."""
+        self._worker_flags = worker_flags
+        self._slot = slot
+        self.started = time.monotonic()
+
+    def mark_ready(self, warmup_seconds: float):
+        self.warmup_seconds = warmup_seconds
+        self.startup_seconds = time.monotonic() - self.started
+        if self._worker_flags is not None:
+            self._worker_flags[self._slot] = 1
+
+    def mark_stopping(self):
+        self.stopping = True
+        if self._worker_flags is not None:
+            self._worker_flags[self._slot] = 0
+
+    @property
+    def ready(self) -> bool:
+        return not self.stopping and self.warmup_seconds is not None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "ready": self.ready,
+            "warmup_ms": round(self.warmup_seconds * 1000, 1) if self.warmup_seconds is not None else None,
+            "startup_ms": round(self.startup_seconds * 1000, 1) if self.startup_seconds is not None else None
+        }
+        if self._worker_flags is not None:
+            stats["workers_ready"] = sum(self._worker_flags)
+            stats["workers"] = len(self._worker_flags)
+        return stats
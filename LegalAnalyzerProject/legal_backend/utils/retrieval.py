@@ -0,0 +1,77 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Words too common in contracts and questions to help ranking
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'has',
+    'have', 'how', 'if', 'in', 'is', 'it', 'its', 'may', 'of', 'on', 'or', 'shall', 'such', 'that',
+    'the', 'their', 'there', 'this', 'to', 'under', 'was', 'what', 'when', 'where', 'which', 'who',
+    'will', 'with', 'would', 'any', 'all', 'party', 'parties', 'agreement', 'contract'
+])
+
+# Longest first; a light stemmer so "terminated" and "termination" share a term
+_SUFFIXES = ('ations', 'ation', 'ating', 'ated', 'ates', 'ions', 'ing', 'ion', 'ate', 'ies', 'ed', 'es', 's')
+
+def _stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+class ClauseIndex:
+    """BM25 inverted index over a document's clauses, built in one pass."""
+
+    def __init__(self, clause_texts: List[str], k1: float = 1.2, b: float = 0.75):
+        self.clause_texts = clause_texts
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths = []
+        for i, text in enumerate(clause_texts):
+            tokens = tokenize(text)
+            self.lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((i, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (clause index, score) pairs with a positive score, best first."""
+        clause_count = len(self.clause_texts)
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (clause_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.average_length)
+                scores[i] = scores.get(i, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def select_context(self, query: str, max_chars: int, k: int = 5) -> Tuple[str, List[int]]:
+        """Best-matching clauses that fit in max_chars, joined in document order.
+
+        Returns (context, clause indices); the context is empty when no clause
+        shares a term with the query.
+        """
+        selected = []
+        used = 0
+        for i, _ in self.search(query, k):
+            length = len(self.clause_texts[i])
+            if used + length + len(selected) <= max_chars:
+                selected.append(i)
+                used += length
+            elif not selected:
+                # Even the best clause is over budget, so send as much of it as fits
+                return self.clause_texts[i][:max_chars], [i]
+
+        selected.sort()
+        return " ".join(self.clause_texts[i] for i in selected), selected
@@ -0,0 +1,14 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the standard library encoder is the fallback
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
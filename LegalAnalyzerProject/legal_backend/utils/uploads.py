@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import mmap
+from typing import Any, Dict, Optional, Union
+
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload is larger than the per-file limit."""
+
+
+class SpooledUpload:
+    """An upload read once in fixed-size chunks, hashed as it streams.
+
+    Files under ``mmap_min_bytes`` are kept as bytes; larger ones are
+    memory-mapped read-only from the spool file the multipart parser already
+    wrote, so the extractors read pages straight from disk instead of from a
+    second in-memory copy. ``mmap_min_bytes=None`` never maps (needed when
+    content is pickled to worker processes). Use as a context manager, or
+    call close(), to release the mapping.
+    """
+
+    def __init__(self, content: Union[bytes, mmap.mmap], sha256: str, size: int):
+        self.content = content
+        self.sha256 = sha256
+        self.size = size
+
+    @classmethod
+    async def read(cls, upload: UploadFile, max_bytes: int, mmap_min_bytes: Optional[int],
+                   chunk_size: int = 1024 * 1024) -> "SpooledUpload":
+        digest = hashlib.sha256()
+        size = 0
+        chunks = []
+        await upload.seek(0)
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"File exceeds the {max_bytes} byte upload limit")
+            digest.update(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+                if mmap_min_bytes is not None and size >= mmap_min_bytes:
+                    chunks = None
+
+        if chunks is not None:
+            return cls(b"".join(chunks), digest.hexdigest(), size)
+
+        # fileno() rolls an in-memory spool over to disk; flush so the mapping sees every byte
+        upload.file.flush()
+        content = mmap.mmap(upload.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(content, digest.hexdigest(), size)
+
+    def close(self):
+        if isinstance(self.content, mmap.mmap):
+            try:
+                self.content.close()
+            except BufferError:
+                # A timed-out extraction can still hold a view; the mapping goes when it does
+                logger.warning("Upload mapping still in use, leaving it to be released later")
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class UploadAdmission:
+    """Byte budgets for uploads, checked from Content-Length before the body is read when it is sent.
+
+    ``limits`` maps upload paths to the largest request body each accepts;
+    larger requests get 413. Requests whose bytes would push the total of
+    uploads in flight past ``max_inflight_bytes`` get 429 with Retry-After,
+    except when nothing else is in flight. Uploads without a Content-Length
+    (chunked transfer) cannot be checked up front: they are admitted, their
+    bytes count towards the total as they arrive, and they get 413 as soon as
+    they pass the limit.
+    """
+
+    def __init__(self, limits: Dict[str, int], max_inflight_bytes: int, retry_after: int = 1):
+        self.limits = limits
+        self.max_inflight_bytes = max_inflight_bytes
+        self.retry_after = retry_after
+        self.inflight_bytes = 0
+        self.inflight_requests = 0
+        self.rejected_too_large = 0
+        self.rejected_busy = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight_bytes": self.inflight_bytes,
+            "inflight_requests": self.inflight_requests,
+            "max_inflight_bytes": self.max_inflight_bytes,
+            "rejected_too_large": self.rejected_too_large,
+            "rejected_busy": self.rejected_busy
+        }
+
+
+class UploadAdmissionMiddleware:
+    """ASGI middleware applying an UploadAdmission to POSTs on its upload paths."""
+
+    def __init__(self, app: ASGIApp, admission: UploadAdmission):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        admission = self.admission
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in admission.limits:
+            await self.app(scope, receive, send)
+            return
+
+        limit = min(admission.limits[scope["path"]], admission.max_inflight_bytes)
+        length = Headers(scope=scope).get("content-length")
+        if length is None or not length.isdigit():
+            await self._call_counting(scope, receive, send, limit)
+            return
+
+        length = int(length)
+        if length > limit:
+            admission.rejected_too_large += 1
+            await _reject(scope, receive, send, 413, f"Upload exceeds the {limit} byte limit")
+            return
+        # No await between the check and the reservation, so the event loop cannot interleave them
+        if admission.inflight_requests and admission.inflight_bytes + length > admission.max_inflight_bytes:
+            admission.rejected_busy += 1
+            await _reject(
+                scope, receive, send, 429, "Too many uploads in progress, retry shortly",
+                {"Retry-After": str(admission.retry_after)}
+            )
+            return
+
+        admission.inflight_bytes += length
+        admission.inflight_requests += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.inflight_bytes -= length
+            admission.inflight_requests -= 1
+
+    async def _call_counting(self, scope: Scope, receive: Receive, send: Send, limit: int):
+        """Run an upload of unknown length, counting its body as it streams in.
+
+        Past ``limit`` the next read raises; the app's error response to that
+        is dropped and a 413 sent in its place.
+        """
+        admission = self.admission
+        received = 0
+        too_large = False
+
+        async def counting_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = len(message.get("body", b""))
+                received += chunk
+                admission.inflight_bytes += chunk
+                if received > limit:
+                    too_large = True
+                    raise UploadTooLargeError(f"Upload exceeds the {limit} byte limit")
+            return message
+
+        async def checked_send(message):
+            if not too_large:
+                await send(message)
+
+        admission.inflight_requests += 1
+        try:
+            await self.app(scope, counting_receive, checked_send)
+        except UploadTooLargeError:
+            pass
+        finally:
+            admission.inflight_bytes -= received
+            admission.inflight_requests -= 1
+
+        if too_large:
+            admission.rejected_too_large += 1
+            await _reject(scope, receive, send, 413, f"Upload exceeds the {limit} byte limit")
+
+
+async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str,
+                  headers: Dict[str, str] = None):
+    # Same body shape as FastAPI's HTTPException responses
+    await JSONResponse({"detail": detail}, status_code=status_code, headers=headers)(scope, receive, send)